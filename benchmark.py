@@ -0,0 +1,2015 @@
+"""Movie Bot বেঞ্চমার্ক
+
+ব্যবহার:
+    python benchmark.py db [--movies N] [--handlers N] [--rate N]
+    python benchmark.py search [--sizes 10000,100000,1000000] [--queries N]
+    python benchmark.py fuzzy [--movies N] [--queries N]
+    python benchmark.py webhook [--updates N] [--concurrency N] [--flood-control]
+    python benchmark.py outbound [--broadcast N] [--interactive N] [--api-limit N]
+    python benchmark.py fanout [--requesters N] [--pending N]
+    python benchmark.py persistence [--agents N]
+    python benchmark.py routes [--iterations N]
+    python benchmark.py logging [--events N] [--write-ms N]
+    python benchmark.py metrics [--updates N]
+    python benchmark.py concurrency [--slow N] [--fast N] [--agents N] [--photo-latency S] [--concurrency N]
+    python benchmark.py startup [--sizes 0,10000,100000]
+    python benchmark.py inline [--movies N] [--users N] [--keystroke-ms N]
+    python benchmark.py views [--iterations N]
+    python benchmark.py details
+    python benchmark.py search-cache [--movies N] [--queries N] [--upload-every N] [--cache-mb N]
+    python benchmark.py replay [--sizes 10000,100000] [--sessions N] [--zipf S] [--flood-control]
+    python benchmark.py links [--movies N] [--concurrency N] [--per-host N] [--timeout S] [--latency-ms N]
+"""
+import os
+import sys
+import json
+import math
+import time
+import logging
+import threading
+import random
+import re
+import asyncio
+import argparse
+import socket
+import subprocess
+import tempfile
+import sqlite3
+import statistics
+from collections import Counter, defaultdict, deque
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+# বট ইমপোর্টের আগে আলাদা টেম্প ডাটাবেস সেট করুন
+_TMP_DIR = tempfile.mkdtemp(prefix='moviebot-bench-')
+os.environ.setdefault('MOVIE_DB_PATH', os.path.join(_TMP_DIR, 'bench.db'))
+# on_startup এর লিংক চেক লুপ আসল ইন্টারনেটে যেত - links বেঞ্চমার্ক চেকার সরাসরি চালায়
+os.environ.setdefault('LINK_CHECK_INTERVAL_HOURS', '0')
+
+import bot  # noqa: E402
+
+# প্রতিটি ফেক API কলের লগ বেঞ্চমার্ক আউটপুট ঢেকে দেয়
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+TITLES = [
+    'Avatar', 'Avatar: The Way of Water', 'KGF Chapter 1', 'KGF Chapter 2', 'Pathaan',
+    'Jawan', 'Salaar Part 1', 'Animal', 'Pushpa', 'RRR', 'Dunki', 'Tiger 3',
+    'Interstellar', 'Inception', 'Oppenheimer', 'The Dark Knight', 'Hawa', 'Poran',
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name, latencies, elapsed=None):
+    ms = [v * 1000 for v in latencies]
+    line = (f"{name:<28} n={len(ms):<6} p50={percentile(ms, 50):8.2f}ms "
+            f"p95={percentile(ms, 95):8.2f}ms p99={percentile(ms, 99):8.2f}ms "
+            f"mean={statistics.fmean(ms) if ms else 0:8.2f}ms")
+    if elapsed:
+        line += f" throughput={len(ms) / elapsed:8.1f}/s"
+    print(line)
+
+
+SYLLABLES = ['ka', 'ri', 'mo', 'ta', 'na', 'sho', 'bi', 'la', 'du', 'ra', 'pa', 'the',
+             'ja', 'go', 'mi', 'ro', 'sa', 've', 'ni', 'ku', 'de', 'ho', 'ma', 'tu']
+
+
+def make_title(i):
+    # প্রতি ২০টিতে একটি জনপ্রিয় নাম, বাকিগুলো ছদ্ম-শব্দের জোড়া (ইউনিক ক্যাটালগের মতো)
+    if i % 20 == 0:
+        return f"{TITLES[(i // 20) % len(TITLES)]} {i // 20 // len(TITLES) + 1}"
+    rng = random.Random(i)
+    words = [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+             for _ in range(rng.randint(1, 3))]
+    return ' '.join(words).title()
+
+
+def seed_movies(database, count):
+    existing = database.conn.execute('SELECT COUNT(*) FROM movies').fetchone()[0]
+    rows = []
+    for i in range(existing, count):
+        title = make_title(i)
+        rows.append((title, str(1990 + i % 35), '1080p', 'Bangla', '1.5GB',
+                     f'https://drive.google.com/file/{i}', '', 0))
+        if len(rows) >= 50000:
+            database.conn.executemany(
+                'INSERT INTO movies (title, year, quality, language, size, download_link, thumbnail, uploader_id) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            rows.clear()
+    if rows:
+        database.conn.executemany(
+            'INSERT INTO movies (title, year, quality, language, size, download_link, thumbnail, uploader_id) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    database.conn.commit()
+
+
+# ==================== db: সিঙ্ক বনাম অ্যাসিঙ্ক হ্যান্ডলার লেটেন্সি ====================
+class LegacyDatabase:
+    """আগের Database এর কুয়েরি হুবহু: একটা কানেকশন, রোল ক্যাশ নেই, প্রতি রাইটে কমিট, LIKE সার্চ।
+    স্কিমা (FTS/ডিমান্ড ট্রিগার) নতুনটাই - INSERT এ সেই খরচ দুই পাশেই"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+
+    def get_user_role(self, user_id):
+        self.cursor.execute('SELECT role FROM users WHERE user_id = ?', (user_id,))
+        result = self.cursor.fetchone()
+        if result:
+            return result[0]
+        self.cursor.execute('INSERT INTO users (user_id, role) VALUES (?, ?)', (user_id, 'user'))
+        self.conn.commit()
+        return 'user'
+
+    def add_request(self, user_id, movie_name):
+        self.cursor.execute('INSERT INTO requests (user_id, movie_name) VALUES (?, ?)', (user_id, movie_name))
+        self.conn.commit()
+        return True
+
+    def search_movies(self, query):
+        self.cursor.execute('SELECT * FROM movies WHERE title LIKE ? ORDER BY id DESC', (f'%{query}%',))
+        return self.cursor.fetchall()
+
+
+def _sync_handler(legacy):
+    async def handler(i):
+        # আগের মতো: লুপের উপর সরাসরি sqlite কল
+        user_id = 1000 + i % 500
+        legacy.get_user_role(user_id)
+        if i % 10 == 0:
+            legacy.add_request(user_id, f'request {i}')
+        else:
+            legacy.search_movies(TITLES[i % len(TITLES)])
+        await asyncio.sleep(0)
+    return handler
+
+
+async def _async_handler(i):
+    user_id = 1000 + i % 500
+    await bot.adb.get_user_role(user_id)
+    if i % 10 == 0:
+        await bot.adb.add_request(user_id, f'request {i}')
+    else:
+        await bot.adb.search_movies(TITLES[i % len(TITLES)])
+    await asyncio.sleep(0)
+
+
+async def _drive(handler, total, rate):
+    # ওপেন-লুপ লোড: আপডেট নির্দিষ্ট সময়ে আসে, লুপ আটকে থাকলেও ঘড়ি থামে না
+    latencies = []
+
+    async def one(i, arrived):
+        await handler(i)
+        latencies.append(time.perf_counter() - arrived)
+
+    started = time.perf_counter()
+    tasks = []
+    for i in range(total):
+        arrival = started + i / rate
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i, arrival)))
+    await asyncio.gather(*tasks)
+    return latencies, time.perf_counter() - started
+
+
+def bench_db(args):
+    seed_movies(bot.db, args.movies)
+    print(f"movies={args.movies} handlers={args.handlers} rate={args.rate}/s")
+    legacy = LegacyDatabase(bot.db.path)
+    latencies, elapsed = asyncio.run(_drive(_sync_handler(legacy), args.handlers, args.rate))
+    report('before (sync sqlite)', latencies, elapsed)
+    legacy.conn.close()
+    # আগের রানের ইউজাররা ডাটাবেসে আছে - নতুন রেঞ্জে, যাতে দুই পাশেই প্রথম দেখা ইউজার রেজিস্টার হয়
+    bot.db.conn.execute('DELETE FROM users WHERE user_id BETWEEN 1000 AND 1499')
+    bot.db.conn.commit()
+    latencies, elapsed = asyncio.run(_drive(_async_handler, args.handlers, args.rate))
+    report('after (AsyncDatabase)', latencies, elapsed)
+
+
+# ==================== search: LIKE বনাম FTS5 ====================
+SEARCH_QUERIES = ['avatar', 'kgf', 'kgf chapter', 'pathaan', 'salaar part', 'dark knight',
+                  'inter', 'hawa', 'tiger 3', 'oppen', 'karimo', 'shobi la', 'nothing matches this']
+
+
+def _like_search(database, query, limit=bot.SEARCH_LIMIT):
+    # আগের কুয়েরি: পুরো টেবিল স্ক্যান, তারপর হ্যান্ডলারে স্লাইস
+    rows = database.conn.execute(
+        'SELECT * FROM movies WHERE title LIKE ? ORDER BY id DESC', (f'%{query}%',)
+    ).fetchall()
+    return rows[:limit]
+
+
+def bench_search(args):
+    for size in [int(s) for s in args.sizes.split(',')]:
+        seed_movies(bot.db, size)
+        for name, search in (('LIKE %q%', _like_search), ('FTS5 bm25', lambda d, q: d.search_movies(q))):
+            latencies = []
+            for i in range(args.queries):
+                query = SEARCH_QUERIES[i % len(SEARCH_QUERIES)]
+                started = time.perf_counter()
+                search(bot.db, query)
+                latencies.append(time.perf_counter() - started)
+            report(f'{size:>8} rows {name}', latencies)
+
+
+# ==================== fuzzy: ট্রাইগ্রাম সার্চ ====================
+FUZZY_QUERIES = ['pathan', 'KGF2', 'avtar', 'intersteller', 'opeinhemer', 'salar part1',
+                 'পাঠান', 'অবতার', 'dark nite', 'karimo shobi', 'jwan', 'xyzzy qq']
+# (কুয়েরি, প্রথম হিট) - None মানে কোনো হিট নয়, তাই সার্চ মিস হয়ে রিকোয়েস্ট সেভ হয়
+FUZZY_CASES = [
+    ('avtar', 'Avatar'), ('pathan', 'Pathaan'), ('kgf2', 'KGF Chapter 2'), ('salar part1', 'Salaar Part 1'),
+    ('avatar 2009', 'Avatar'), ('Avatar 3', None), ('Salaar Part 2', None), ('Animal 2', None),
+    ('KGF 3', None), ('avtar ৩', None),
+]
+
+
+def check_fuzzy_sequels():
+    # আসল নামের ছোট ক্যাটালগ: বড় ক্যাটালগে "Avatar 3" নামে ছদ্ম-টাইটেল থেকে যায়
+    database = bot.Database(os.path.join(_TMP_DIR, 'fuzzy-sequels.db'))
+    for i, title in enumerate(TITLES):
+        database.add_movie({'title': title, 'year': '2009' if title == 'Avatar' else str(2010 + i),
+                            'quality': '1080p', 'language': 'Bangla', 'size': '1.5GB',
+                            'download_link': f'https://drive.google.com/file/{i}', 'uploader_id': 0})
+    failures = 0
+    for query, expected in FUZZY_CASES:
+        rows = database.fuzzy_search_movies(query)
+        got = rows[0][1] if rows else None
+        if got != expected:
+            failures += 1
+            print(f"  WRONG: {query!r} -> {got!r}, expected {expected!r}")
+    database.conn.close()
+    print(f"fuzzy sequel/typo cases: {len(FUZZY_CASES) - failures}/{len(FUZZY_CASES)} correct")
+    return not failures
+
+
+def bench_fuzzy(args):
+    ok = check_fuzzy_sequels()
+    seed_movies(bot.db, args.movies)
+    started = time.perf_counter()
+    bot.db.fuzzy = bot.FuzzyIndex()
+    bot.db.load_fuzzy_index()
+    print(f"index build: {len(bot.db.fuzzy)} titles in {time.perf_counter() - started:.2f}s")
+    for name, search in (('index only', lambda q: bot.db.fuzzy.search(q)),
+                         ('index + row fetch', bot.db.fuzzy_search_movies)):
+        latencies = []
+        for i in range(args.queries):
+            started = time.perf_counter()
+            search(FUZZY_QUERIES[i % len(FUZZY_QUERIES)])
+            latencies.append(time.perf_counter() - started)
+        report(f'fuzzy {name}', latencies)
+    return 0 if ok else 1
+
+
+# ==================== ফেক Bot API ও সিন্থেটিক আপডেট ====================
+class FakeBotAPI:
+    """টেলিগ্রামে না গিয়ে লোকালি Bot API মেথডের সফল রেসপন্স দেয়
+
+    flood_limit দিলে আসল টেলিগ্রামের মতো: শেষ ১ সেকেন্ডে এর বেশি মেসেজ হলে 429 + retry_after
+    latency = {মেথড: সেকেন্ড} দিলে সেই মেথডের রেসপন্স দেরিতে (যেমন ধীর sendPhoto)
+    strict=True দিলে টেলিগ্রামের মতো ভাঙা Markdown বা সীমার বেশি লেখায় 400 (rejected এ জমা);
+    তখন মেসেজ আইডি আলাদা, ছবির মেসেজে editMessageText আর 'dead' দিয়ে শুরু file_id তেও 400
+    start(process=True): আলাদা প্রসেসে, যাতে বড় পেলোড পার্স করতে বটের সাথে GIL ভাগ না হয়;
+    তখন calls/inline_answers পড়তে remote()
+
+    সার্ভার নিজস্ব asyncio লুপে, keep-alive সহ: থ্রেড-প্রতি-কানেকশন সার্ভারে শত শত থ্রেড GIL নিয়ে
+    কাড়াকাড়ি করে, তখন বটের চেয়ে ফেক API-ই ধীর হয়ে যায়
+    """
+
+    BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Movie Bot', 'username': 'movie_bench_bot'}
+    MESSAGE_METHODS = {'sendMessage', 'sendPhoto', 'editMessageText', 'editMessageCaption',
+                       'editMessageMedia', 'editMessageReplyMarkup'}
+
+    def __init__(self, host='127.0.0.1', port=0, flood_limit=None, latency=None, strict=False):
+        self.calls = Counter()
+        self.flood_limit = flood_limit
+        self.latency = latency or {}
+        self.strict = strict
+        self.rejected = []
+        self._message_ids = iter(range(1000, 10 ** 9))
+        self.photo_messages = set()
+        # chat_id -> (message_id, ছবি কিনা): ইউজারের চোখে সবশেষ মেসেজ
+        self.last_message = {}
+        # inline_query_id -> উত্তর আসার সময় (perf_counter, লিনাক্সে প্রসেস জুড়ে একই ঘড়ি)
+        self.inline_answers = {}
+        self.flooded = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._process = None
+        self._thread = None
+        self._loop = None
+        # ডিফল্ট listen backlog ছোট - একসাথে অনেক কানেকশনে SYN ড্রপ হয়ে ~১ সেকেন্ড রিট্রাই
+        self._sock = socket.create_server((host, port), backlog=1024)
+        self.url = f'http://{host}:{self._sock.getsockname()[1]}'
+
+    async def _serve_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length') or 0))
+                path = request_line.split()[1].decode()
+                method = path.rstrip('/').rsplit('/', 1)[-1]
+                if method in self.latency:
+                    await asyncio.sleep(self.latency[method])
+                response = self.respond(method, self.parse_params(headers.get('content-type', ''), body.decode()))
+                payload = json.dumps(response).encode()
+                writer.write(b'HTTP/1.1 %d OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n'
+                             % (response.get('error_code', 200), len(payload)) + payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # স্টপের সময় অলস keep-alive কানেকশন বাতিল হয় - স্বাভাবিক শেষ, নইলে asyncio ট্রেসব্যাক লগ করে
+            pass
+        finally:
+            writer.close()
+
+    def _serve_forever(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(asyncio.start_server(self._serve_connection, sock=self._sock))
+        try:
+            self._loop.run_forever()
+        finally:
+            server.close()
+            # keep-alive কানেকশনের হ্যান্ডলার তখনো চলমান - লুপ বন্ধের আগে শেষ করা
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+
+    @staticmethod
+    def parse_params(content_type, body):
+        if not body:
+            return {}
+        if 'json' in content_type:
+            return json.loads(body)
+        params = {}
+        for key, values in parse_qs(body).items():
+            try:
+                params[key] = json.loads(values[0])
+            except ValueError:
+                params[key] = values[0]
+        return params
+
+    def respond(self, method, params):
+        with self._lock:
+            self.calls[method] += 1
+            if self.flood_limit and method in self.MESSAGE_METHODS:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] > 1:
+                    self._recent.popleft()
+                if len(self._recent) >= self.flood_limit:
+                    self.flooded += 1
+                    return {'ok': False, 'error_code': 429, 'description': 'Too Many Requests: retry after 1',
+                            'parameters': {'retry_after': 1}}
+                self._recent.append(now)
+        if self.strict:
+            error = telegram_payload_error(method, params) or self.message_error(method, params)
+            if error:
+                self.rejected.append((method, error))
+                return {'ok': False, 'error_code': 400, 'description': f'Bad Request: {error}'}
+        if method == 'answerInlineQuery':
+            self.inline_answers[str(params.get('inline_query_id'))] = time.perf_counter()
+        if method == 'getMe':
+            return {'ok': True, 'result': self.BOT_USER}
+        if method == '_state':
+            return {'ok': True, 'result': {'calls': self.calls, 'inline_answers': self.inline_answers}}
+        if method in self.MESSAGE_METHODS:
+            chat_id = params.get('chat_id', 1)
+            message_id = params.get('message_id') or (next(self._message_ids) if self.strict else 1)
+            message = {'message_id': message_id, 'date': int(time.time()),
+                       'chat': {'id': chat_id, 'type': 'private'}, 'from': self.BOT_USER}
+            if self.strict:
+                is_photo = method in ('sendPhoto', 'editMessageMedia') or message_id in self.photo_messages
+                if is_photo:
+                    self.photo_messages.add(message_id)
+                self.last_message[chat_id] = (message_id, is_photo)
+            if method in ('sendPhoto', 'editMessageMedia'):
+                message['photo'] = [{'file_id': 'photo', 'file_unique_id': 'photo', 'width': 1, 'height': 1}]
+                message['caption'] = params.get('caption', '')
+            else:
+                message['text'] = params.get('text', '')
+            return {'ok': True, 'result': message}
+        return {'ok': True, 'result': True}
+
+    def message_error(self, method, params):
+        photo = params.get('photo') if method == 'sendPhoto' else (params.get('media') or {}).get('media')
+        if isinstance(photo, str) and photo.startswith('dead'):
+            return 'wrong file identifier/HTTP URL specified'
+        message_id = params.get('message_id')
+        if method == 'editMessageText' and message_id in self.photo_messages:
+            return 'there is no text in the message to edit'
+        if method == 'editMessageMedia' and message_id not in self.photo_messages:
+            return 'there is no media in the message to edit'
+        return None
+
+    def start(self, process=False):
+        if process:
+            import multiprocessing
+            self._process = multiprocessing.get_context('fork').Process(target=self._serve_forever, daemon=True)
+            self._process.start()
+        else:
+            self._thread = threading.Thread(target=self._serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def remote(self):
+        import httpx
+        return httpx.post(f'{self.url}/bot/_state').json()['result']
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._sock.close()
+        else:
+            # সকেট বন্ধ করে সার্ভার নিজেই, লুপের থ্রেডে
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+
+def parse_legacy_markdown(text):
+    """টেলিগ্রামের লিগ্যাসি Markdown পার্সারের মতো: এন্টিটির ভেতরে এস্কেপ নেই, বন্ধ না হলে ত্রুটি
+    ফেরত (সাধারণ লেখা, ত্রুটি)"""
+    out = []
+    i, n = 0, len(text)
+    while i < n:
+        char = text[i]
+        if char == '\\' and i + 1 < n and text[i + 1] in '_*`[':
+            out.append(text[i + 1])
+            i += 2
+            continue
+        if char not in '_*`[':
+            out.append(char)
+            i += 1
+            continue
+        marker = '```' if text.startswith('```', i) else {'[': ']'}.get(char, char)
+        end = text.find(marker, i + len(marker))
+        if end < 0:
+            return None, f"can't parse entities: Can't find end of the entity starting at byte offset " \
+                         f"{len(text[:i].encode())}"
+        out.append(text[i + len(marker):end])
+        i = end + len(marker)
+        if marker == ']' and text.startswith('(', i):
+            close = text.find(')', i)
+            i = close + 1 if close >= 0 else n
+    return ''.join(out), None
+
+
+def telegram_payload_error(method, params):
+    # (ফিল্ড, সীমা) - সীমা পার্সের পরের লেখায়, UTF-16 ইউনিটে
+    if method == 'answerInlineQuery':
+        results = params.get('results') or []
+        for result in results:
+            content = result.get('input_message_content') or {}
+            for text, mode, limit in ((result.get('caption'), result.get('parse_mode'), bot.CAPTION_LIMIT),
+                                      (content.get('message_text'), content.get('parse_mode'), bot.TEXT_LIMIT)):
+                error = text_error(text, mode, limit)
+                if error:
+                    return error
+        return None
+    if method == 'editMessageMedia':
+        media = params.get('media') or {}
+        return text_error(media.get('caption'), media.get('parse_mode'), bot.CAPTION_LIMIT, 'message caption')
+    if method in ('sendPhoto', 'editMessageCaption'):
+        return text_error(params.get('caption'), params.get('parse_mode'), bot.CAPTION_LIMIT, 'message caption')
+    if method in ('sendMessage', 'editMessageText'):
+        return text_error(params.get('text'), params.get('parse_mode'), bot.TEXT_LIMIT)
+    return None
+
+
+def text_error(text, parse_mode, limit, what='message'):
+    if text is None:
+        return None
+    if parse_mode == 'Markdown':
+        text, error = parse_legacy_markdown(text)
+        if error:
+            return error
+    if bot.utf16_len(text) > limit:
+        return f'{what} is too long'
+    return None
+
+
+def make_user(user_id):
+    return {'id': user_id, 'is_bot': False, 'first_name': f'User {user_id}'}
+
+
+def message_update(update_id, user_id, text):
+    message = {'message_id': update_id, 'date': int(time.time()), 'from': make_user(user_id),
+               'chat': {'id': user_id, 'type': 'private'}, 'text': text}
+    if text.startswith('/'):
+        command = text.split()[0]
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+    return {'update_id': update_id, 'message': message}
+
+
+def inline_update(update_id, user_id, text, offset=''):
+    return {'update_id': update_id, 'inline_query': {'id': str(update_id), 'from': make_user(user_id),
+                                                     'query': text, 'offset': offset}}
+
+
+def callback_update(update_id, user_id, data, message_id=None, photo=False):
+    message = {'message_id': message_id or update_id, 'date': int(time.time()), 'from': FakeBotAPI.BOT_USER,
+               'chat': {'id': user_id, 'type': 'private'}}
+    if photo:
+        message['photo'] = [{'file_id': 'photo', 'file_unique_id': 'photo', 'width': 1, 'height': 1}]
+        message['caption'] = 'card'
+    else:
+        message['text'] = 'menu'
+    return {'update_id': update_id, 'callback_query': {
+        'id': str(update_id), 'from': make_user(user_id), 'chat_instance': str(user_id),
+        'message': message, 'data': data}}
+
+
+def synthetic_updates(count):
+    for i in range(count):
+        user_id = 10000 + i % 300
+        kind = i % 4
+        if kind == 0:
+            yield message_update(i + 1, user_id, '/start')
+        elif kind == 1:
+            yield callback_update(i + 1, user_id, 'browse_latest')
+        else:
+            yield message_update(i + 1, user_id, SEARCH_QUERIES[i % len(SEARCH_QUERIES)])
+
+
+async def start_application(api, **webhook):
+    bot.BOT_API_URL = api.url
+    application = bot.build_application()
+    await application.initialize()
+    if webhook:
+        await application.updater.start_webhook(**webhook)
+    await application.start()
+    return application
+
+
+async def stop_application(application):
+    if application.updater.running:
+        await application.updater.stop()
+    await application.stop()
+    await application.shutdown()
+
+
+async def wait_until_drained(application, timeout=60):
+    # খালি কিউ মানে শুধু সব আপডেট তোলা হয়েছে। PTB task_done() ডাকে প্রসেসর ফেরার পর, আর একই ইউজারের
+    # পেছনের আপডেটগুলো আগেরটার সাথেই চলে - তাই join() ফেরে সব হ্যান্ডলার (ও তাদের API কল) শেষে
+    await asyncio.wait_for(application.update_queue.join(), timeout)
+
+
+# ==================== webhook: ইনগ্রেস থ্রুপুট ====================
+async def _webhook_run(args):
+    import httpx
+
+    api = FakeBotAPI().start()
+    if not args.flood_control:
+        # টেলিগ্রামের ৩০ মেসেজ/সেকেন্ড সীমায় প্রসেসিং নয়, আউটবক্সই মাপা হত
+        bot.outbox = bot.OutboundScheduler(global_rate=100000, chat_rate=100000, chat_burst=100)
+    secret = 'bench-secret'
+    url = f'http://127.0.0.1:{args.port}/webhook'
+    application = await start_application(
+        api, listen='127.0.0.1', port=args.port, url_path='webhook', webhook_url=url,
+        secret_token=secret, allowed_updates=None,
+    )
+    application_updates = bot.allowed_updates(application)
+    print(f"fake api={api.url} webhook={url} allowed_updates={application_updates} "
+          f"queue maxsize={application.update_queue.maxsize}")
+    try:
+        async with httpx.AsyncClient(timeout=30) as client:
+            rejected = await client.post(url, json=message_update(0, 1, '/start'),
+                                         headers={'X-Telegram-Bot-Api-Secret-Token': 'wrong'})
+            print(f"wrong secret token -> HTTP {rejected.status_code}")
+
+            headers = {'X-Telegram-Bot-Api-Secret-Token': secret}
+            semaphore = asyncio.Semaphore(args.concurrency)
+            latencies = []
+
+            async def post(update):
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post(url, json=update, headers=headers)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(post(update) for update in synthetic_updates(args.updates)))
+            ingress = time.perf_counter() - started
+            report('webhook POST (ingress)', latencies, ingress)
+            # ফ্লাড কন্ট্রোলে প্রতিটি রিপ্লাই সীমার ভেতরে - তত সময় অপেক্ষা
+            await wait_until_drained(application, 60 + args.updates / bot.OUTBOUND_GLOBAL_RATE * args.flood_control)
+            total = time.perf_counter() - started
+            print(f"processed {args.updates} updates in {total:.2f}s ({args.updates / total:.1f}/s), "
+                  f"api calls: {dict(api.calls)}")
+    finally:
+        await stop_application(application)
+        api.stop()
+
+
+def bench_webhook(args):
+    seed_movies(bot.db, args.movies)
+    asyncio.run(_webhook_run(args))
+
+
+# ==================== outbound: ফ্লাড কন্ট্রোল ও প্রায়োরিটি ====================
+async def _outbound_run(args, scheduler):
+    from telegram.error import RetryAfter
+    from telegram.ext import ExtBot
+
+    api = FakeBotAPI(flood_limit=args.api_limit).start()
+    sender = ExtBot(bot.BOT_TOKEN, base_url=f'{api.url}/bot', rate_limiter=scheduler)
+    await sender.initialize()
+    latencies = {'interactive': [], 'background': []}
+    flooded = Counter()
+
+    async def send(kind, chat_id, i):
+        started = time.perf_counter()
+        rate_limit_args = bot.PRIORITY_BACKGROUND if kind == 'background' else None
+        kwargs = {'rate_limit_args': rate_limit_args} if scheduler else {}
+        try:
+            await sender.send_message(chat_id, f'{kind} {i}', **kwargs)
+        except RetryAfter:
+            flooded[kind] += 1
+            return
+        latencies[kind].append(time.perf_counter() - started)
+
+    async def interactive():
+        # ব্রডকাস্ট চলার সময় ইউজাররা ট্যাপ করছে
+        tasks = []
+        for i in range(args.interactive):
+            await asyncio.sleep(args.broadcast / bot.OUTBOUND_GLOBAL_RATE / args.interactive)
+            tasks.append(asyncio.create_task(send('interactive', 900000 + i, i)))
+        await asyncio.gather(*tasks)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(interactive(), *(send('background', 100000 + i, i) for i in range(args.broadcast)))
+    finally:
+        elapsed = time.perf_counter() - started
+        await sender.shutdown()
+        api.stop()
+    label = 'scheduler' if scheduler else 'no limiter'
+    for kind, values in latencies.items():
+        report(f'{label} {kind}', values, elapsed)
+    print(f"{label}: 429 responses={api.flooded}, failed sends={dict(flooded)}, elapsed={elapsed:.2f}s")
+    if scheduler:
+        stats = scheduler.stats()
+        print(f"{label}: max queue depth={stats['max_depth']} retries={stats['retries']} "
+              f"wait p50={stats['wait_p50'] * 1000:.0f}ms p95={stats['wait_p95'] * 1000:.0f}ms")
+
+
+async def _outbound_chat_burst(args):
+    # এক চ্যাটে পরপর মেসেজ: বার্স্টের পর ১/সেকেন্ড
+    api = FakeBotAPI().start()
+    scheduler = bot.OutboundScheduler()
+    from telegram.ext import ExtBot
+    sender = ExtBot(bot.BOT_TOKEN, base_url=f'{api.url}/bot', rate_limiter=scheduler)
+    await sender.initialize()
+    started = time.perf_counter()
+    sent_at = []
+
+    async def send(i):
+        await sender.send_message(42, f'burst {i}')
+        sent_at.append(time.perf_counter() - started)
+
+    try:
+        await asyncio.gather(*(send(i) for i in range(args.chat_burst)))
+    finally:
+        await sender.shutdown()
+        api.stop()
+    print(f"single chat, {args.chat_burst} messages sent at: " + ', '.join(f'{t:.2f}s' for t in sorted(sent_at)))
+
+
+def bench_outbound(args):
+    print(f"broadcast={args.broadcast} interactive={args.interactive} fake api limit={args.api_limit}/s "
+          f"scheduler global={bot.OUTBOUND_GLOBAL_RATE}/s chat={bot.OUTBOUND_CHAT_RATE}/s")
+    asyncio.run(_outbound_run(args, None))
+    asyncio.run(_outbound_run(args, bot.OutboundScheduler()))
+    asyncio.run(_outbound_chat_burst(args))
+
+
+# ==================== fanout: আপলোডের পর রিকোয়েস্টকারীদের নোটিফিকেশন ====================
+FANOUT_MATCHING = ['kgf 2', 'KGF Chapter 2', 'the kgf 2', 'KGF chapter 2 2022', 'kgf-2']
+# 'kgf' একা কোন পর্ব বোঝায় না; '2022'/'chapter 2' এ টাইটেলের কোন নাম নেই
+FANOUT_OTHER = ['kgf 3', 'kgf chapter 2 hindi', 'avatar 3', 'pathaan 2', 'salaar', 'kgf', '2022', 'chapter 2']
+# (আপলোড, সাল, রিকোয়েস্ট, মিলবে কি না)
+FANOUT_CASES = [
+    ('The Salaar Part 2', '2023', '2023', False),
+    ('The Salaar Part 2', '2023', 'the', False),
+    ('The Salaar Part 2', '2023', 'part 2', False),
+    ('The Salaar Part 2', '2023', 'salaar', False),
+    ('The Salaar Part 2', '2023', 'salaar 2', True),
+    ('The Salaar Part 2', '2023', 'Salaar Part 2 2023', True),
+    ('Avatar: The Way of Water', '2022', 'avatar', False),
+    ('Avatar: The Way of Water', '2022', 'avatar way of water', True),
+    ('Pathaan', '2023', 'pathaan', True),
+    ('Avatar 2', '2009', 'avatar 22', False),
+    ('Avatar 2', '2009', 'avatar2', True),
+    ("Ocean's 11", '2001', 'oceans 1', False),
+]
+# (রিকোয়েস্ট, রিকোয়েস্ট, একই ডিমান্ড কি না)
+DEMAND_KEY_CASES = [
+    ('avatar 3', 'Avatar-3', True), ('avatar 3', 'avatar3', True), ('KGF ২', 'kgf 2', True),
+    ('Avatar 2', 'Avatar 22', False), ("Ocean's 11", 'Oceans 1', False), ('2001', '201', False),
+    ('Saw', 'Sab', False), ('Vow', 'Bow', False),
+]
+
+
+def seed_requests(database, requesters, pending):
+    rows = [(200000 + i, FANOUT_MATCHING[i % len(FANOUT_MATCHING)]) for i in range(requesters)]
+    rows += [(500000 + i, f'{FANOUT_OTHER[i % len(FANOUT_OTHER)]} {make_title(i)}') for i in range(pending)]
+    database.conn.executemany('INSERT INTO requests (user_id, movie_name) VALUES (?, ?)', rows)
+    database.conn.commit()
+
+
+async def _fanout_run(args):
+    from telegram.ext import ExtBot
+
+    api = FakeBotAPI().start()
+    scheduler = bot.OutboundScheduler(global_rate=args.send_rate)
+    sender = ExtBot(bot.BOT_TOKEN, base_url=f'{api.url}/bot', rate_limiter=scheduler)
+    await sender.initialize()
+    try:
+        started = time.perf_counter()
+        matches = await bot.adb.match_pending_requests('KGF Chapter 2', '2022')
+        print(f"match: {len(matches)} of {args.requesters + args.pending} pending requests "
+              f"in {(time.perf_counter() - started) * 1000:.1f}ms (expected {args.requesters})")
+        ok = len(matches) == args.requesters
+
+        started = time.perf_counter()
+        task = asyncio.create_task(bot.notify_requesters(sender, 1, 'KGF Chapter 2', '2022'))
+        await asyncio.sleep(0)
+        print(f"uploader unblocked after {(time.perf_counter() - started) * 1000:.2f}ms")
+        completed = await task
+        elapsed = time.perf_counter() - started
+        stats = bot.db.get_stats()
+        print(f"fan-out: {completed} requests completed, {api.calls['sendMessage']} messages in {elapsed:.2f}s "
+              f"(send rate {args.send_rate}/s), pending left={stats['pending_requests']}")
+        again = await bot.notify_requesters(sender, 1, 'KGF Chapter 2', '2022')
+        print(f"second upload of the same title matched {again} requests")
+        ok &= again == 0
+    finally:
+        await sender.shutdown()
+        api.stop()
+    return ok
+
+
+def check_request_matching():
+    wrong = [(title, year, request) for title, year, request, expected in FANOUT_CASES
+             if bot.request_fulfilled_by(request, bot.match_words(title), year) != expected]
+    for title, year, request in wrong:
+        print(f"WRONG: upload {title!r} ({year}) vs request {request!r}")
+    print(f"request matching: {len(FANOUT_CASES) - len(wrong)}/{len(FANOUT_CASES)} cases right")
+    merged = [(a, b) for a, b, same in DEMAND_KEY_CASES if (bot.request_key(a) == bot.request_key(b)) != same]
+    for a, b in merged:
+        print(f"WRONG demand key: {a!r} -> {bot.request_key(a)!r}, {b!r} -> {bot.request_key(b)!r}")
+    print(f"demand keys: {len(DEMAND_KEY_CASES) - len(merged)}/{len(DEMAND_KEY_CASES)} cases right")
+    return not wrong and not merged
+
+
+def bench_fanout(args):
+    seed_requests(bot.db, args.requesters, args.pending)
+    ok = check_request_matching()
+    ok &= asyncio.run(_fanout_run(args))
+    return 0 if ok else 1
+
+
+# ==================== persistence: আপলোড উইজার্ড রিস্টার্টে টিকে থাকে কিনা ====================
+async def _wizard_updates(application, agents, steps, offset):
+    from telegram import Update
+
+    latencies = []
+    for step, payload in enumerate(steps):
+        for i, agent_id in enumerate(agents):
+            update_id = offset + step * len(agents) + i
+            if payload.startswith('cb:'):
+                raw = callback_update(update_id, agent_id, payload[3:])
+            else:
+                raw = message_update(update_id, agent_id, payload)
+            update = Update.de_json(raw, application.bot)
+            started = time.perf_counter()
+            await application.process_update(update)
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def _persistence_run(args):
+    api = FakeBotAPI().start()
+    # এখানে ফ্লাড কন্ট্রোল মাপা হচ্ছে না
+    bot.outbox = bot.OutboundScheduler(global_rate=100000, chat_rate=100000, chat_burst=100)
+    agents = [300000 + i for i in range(args.agents)]
+    for agent_id in agents:
+        bot.db.add_agent(agent_id, 5347353883)
+    steps = ['cb:browse_upload', 'KGF Chapter 3', '2026']
+    try:
+        for label, persistent in (('no persistence', False), ('SQLitePersistence', True)):
+            bot.BOT_API_URL = api.url
+            application = bot.build_application()
+            if not persistent:
+                application.persistence = None
+            await application.initialize()
+            await application.start()
+            latencies = await _wizard_updates(application, agents, steps, 1 if persistent else 100000)
+            report(f'{label} per update', latencies)
+            if persistent:
+                persistence = application.persistence
+                started = time.perf_counter()
+                await application.update_persistence()
+                await bot.adb.flush()
+                print(f"update_persistence: {persistence.writes} rows written in "
+                      f"{(time.perf_counter() - started) * 1000:.1f}ms")
+                before = persistence.writes
+                await _wizard_updates(application, agents, ['cb:browse_latest'], 200000)
+                await application.update_persistence()
+                print(f"after updates that don't touch user_data: {persistence.writes - before} rows written")
+            await application.stop()
+            await application.shutdown()
+
+        # রিস্টার্ট: নতুন অ্যাপ্লিকেশন ডাটাবেস থেকে উইজার্ড ফিরে পায়
+        application = bot.build_application()
+        await application.initialize()
+        restored = sum(1 for agent_id in agents
+                       if application.user_data.get(agent_id, {}).get('upload_step') == 'quality')
+        print(f"after restart: {restored}/{len(agents)} agents resume the upload wizard at 'quality'")
+        await application.shutdown()
+    finally:
+        api.stop()
+
+
+def bench_persistence(args):
+    asyncio.run(_persistence_run(args))
+
+
+# ==================== routes: কলব্যাক রাউটার কভারেজ ও ডিসপ্যাচ খরচ ====================
+ROUTE_SAMPLES = {'int': '42', 'id36': 'z1', 'rank': bot.encode_rank(-1.5), 'str': 'abcd1234', 'dir': 'n'}
+
+
+def route_sample(name, params):
+    types = {convert: type_name for type_name, convert in bot.CALLBACK_PARAM_TYPES.items()}
+    return ':'.join([name] + [ROUTE_SAMPLES[types[convert]] for _, convert in params])
+
+
+def source_callbacks():
+    # bot.py তে যত callback_data তৈরি হয়: লিটারাল, f-string, পেজিনেশন বাটন
+    source = open(bot.__file__, encoding='utf-8').read()
+    templates = set(re.findall(r'callback_data=f?"([^"]+)"', source))
+    templates |= set(re.findall(r'f"((?:lt|sr|tr|dl):[^"]+)"', source))
+    # রোল মেনু MAIN_MENU_ROWS থেকে তৈরি - বানানো মার্কআপ থেকেই নেওয়া
+    templates |= {button.callback_data for menu in bot.MAIN_MENUS.values()
+                  for row in menu.inline_keyboard for button in row}
+    for template in sorted(templates):
+        name, *parts = template.split(':')
+        route = bot.router.routes.get(name)
+        if route is None:
+            yield template, template
+            continue
+        sample = route_sample(name, route[1]).split(':')
+        yield template, ':'.join([name] + [sample[i + 1] if '{' in part else part for i, part in enumerate(parts)])
+
+
+def check_routes():
+    failures = []
+    used = set()
+    for name, (handler, params, roles) in bot.router.routes.items():
+        data = route_sample(name, params)
+        role = next(iter(roles)) if roles else 'user'
+        resolved = bot.router.resolve(data, role)
+        if resolved is None or resolved[0] is not handler:
+            failures.append(f"{data!r} does not resolve to {handler.__name__}")
+        if roles and 'user' not in roles and bot.router.resolve(data, 'user') is not None:
+            failures.append(f"{data!r} is not guarded from role 'user'")
+        if params and bot.router.resolve(name + ':x' * (len(params) + 1), role) is not None:
+            failures.append(f"{name} accepts the wrong number of arguments")
+    for template, data in source_callbacks():
+        resolved = bot.router.resolve(data, 'admin')
+        if resolved is None:
+            failures.append(f"callback_data {template!r} used in bot.py has no route")
+        else:
+            used.add(resolved[0])
+    for name, (handler, _, _) in bot.router.routes.items():
+        if handler not in used:
+            failures.append(f"route {name!r} is never produced by any button")
+    for legacy in ('movie_42', 'confirm_delete_agent_42', 'delete_agent_now_42', 'delete_movie_42'):
+        if bot.router.resolve(legacy, 'admin') is None:
+            failures.append(f"legacy callback {legacy!r} no longer resolves")
+    # ভাঙা rank (struct.error আসত), '1_0'/' 10'/'১০' (int() এগুলোও নিত), NaN rank
+    bad_ranks = ('abcd', 'abcdefghijkl', '!!!!!!!!!!!', bot.encode_rank(math.nan))
+    for bad in ('movie:abc', 'lt:x:z1', 'nope', '', 'delete_movie_x', 'movie:1_0', 'movie: 10', 'movie:+10',
+                'movie:১০', 'delete_movie_1_0', 'lt:n:z_1', 'lt:n:Z1',
+                *(f'sr:n:abc:{rank}:1' for rank in bad_ranks)):
+        if bot.router.resolve(bad, 'admin') is not None:
+            failures.append(f"malformed callback {bad!r} resolved")
+    return failures
+
+
+def bench_routes(args):
+    failures = check_routes()
+    print(f"{len(bot.router.routes)} routes checked: " + ('OK' if not failures else f"{len(failures)} failures"))
+    for failure in failures:
+        print(f"  FAIL {failure}")
+
+    samples = [route_sample(name, params) for name, (_, params, _) in bot.router.routes.items()]
+    names = list(bot.router.routes)
+
+    def chain(data):
+        # আগের if/elif এর মতো: রুটগুলো ক্রমানুসারে == / startswith
+        for name in names:
+            if data == name or data.startswith(name + ':'):
+                return name
+
+    for label, dispatch in (('router.resolve', lambda d: bot.router.resolve(d, 'admin')), ('if/elif chain', chain)):
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            for data in samples:
+                dispatch(data)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<16} {elapsed / (args.iterations * len(samples)) * 1e9:8.0f} ns/dispatch")
+    print("(the chain only finds the branch; resolve also parses and type-checks the arguments)")
+    return 1 if failures else 0
+
+
+# ==================== logging: ধীর stdout এ print বনাম কিউ লগিং ====================
+class SlowStream:
+    """পাইপ/কনটেইনার লগ ড্রাইভার ধীর হলে যেমন: প্রতি write এ দেরি"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.lines = 0
+
+    def write(self, text):
+        time.sleep(self.delay)
+        self.lines += text.count('\n')
+
+    def flush(self):
+        pass
+
+
+async def _log_loop(log, events):
+    latencies = []
+    for i in range(events):
+        started = time.perf_counter()
+        log(i)
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0)
+    return latencies
+
+
+def bench_logging(args):
+    text = 'KGF Chapter 2 hindi dubbed 1080p'
+    slow = SlowStream(args.write_ms / 1000)
+    latencies = asyncio.run(_log_loop(
+        lambda i: print(f"Message from {1000 + i}: {text[:50]}...", file=slow), args.events))
+    report('print() to slow stdout', latencies)
+
+    for label, sample in (('log_event, all events', {}), ('log_event, message=0.1', {'message': 0.1})):
+        slow = SlowStream(args.write_ms / 1000)
+        bot.LOG_SAMPLE.clear()
+        bot.LOG_SAMPLE.update(sample)
+        bot.setup_logging(stream=slow)
+        latencies = asyncio.run(_log_loop(
+            lambda i: bot.log_event('message', user=1000 + i, role='user', text=text), args.events))
+        report(label, latencies)
+        started = time.perf_counter()
+        bot.stop_logging()
+        print(f"  {slow.lines} lines written; writer thread needed {time.perf_counter() - started:.2f}s more to drain")
+
+
+# ==================== metrics: /metrics এন্ডপয়েন্ট ও ইনস্ট্রুমেন্টেশনের খরচ ====================
+async def _metrics_run(args):
+    import httpx
+    from telegram import Update
+
+    api = FakeBotAPI().start()
+    bot.outbox = bot.OutboundScheduler(global_rate=100000, chat_rate=100000, chat_burst=100)
+    bot.metrics_server.port = 0
+    application = await start_application(api)
+    await bot.on_startup(application)
+    try:
+        semaphore = asyncio.Semaphore(20)
+
+        async def process(raw):
+            async with semaphore:
+                await application.process_update(Update.de_json(raw, application.bot))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(process(raw) for raw in synthetic_updates(args.updates)))
+        print(f"processed {args.updates} updates in {time.perf_counter() - started:.2f}s")
+
+        url = f'http://{bot.metrics_server.host}:{bot.metrics_server.port}/metrics'
+        async with httpx.AsyncClient() as client:
+            started = time.perf_counter()
+            response = await client.get(url)
+            scrape = time.perf_counter() - started
+            missing = await client.get(url.replace('/metrics', '/nope'))
+        lines = response.text.splitlines()
+        print(f"GET /metrics -> {response.status_code} ({response.headers['content-type']}), "
+              f"{len(lines)} lines in {scrape * 1000:.1f}ms; GET /nope -> {missing.status_code}")
+        for line in lines:
+            if (line.endswith(('_count', '_total')) or '_count{' in line or '_total{' in line
+                    or 'in_flight' in line or 'queue_depth' in line) and not line.startswith('#'):
+                print('  ' + line)
+    finally:
+        await bot.metrics_server.stop()
+        await stop_application(application)
+        api.stop()
+
+
+def bench_metrics(args):
+    seed_movies(bot.db, args.movies)
+    asyncio.run(_metrics_run(args))
+
+    # ইনস্ট্রুমেন্টেশনের খরচ: একই মেথড র‍্যাপার সহ ও ছাড়া
+    raw = bot.Database.get_movie_by_id.__wrapped__
+    for label, call in (('Database method, raw', lambda: raw(bot.db, 1)),
+                        ('Database method, timed', lambda: bot.db.get_movie_by_id(1)),
+                        ('metrics.observe', lambda: bot.metrics.observe('bench_seconds', (), 0.001))):
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            call()
+        print(f"{label:<24} {(time.perf_counter() - started) / args.iterations * 1e6:6.2f} µs/call")
+
+
+ADMIN_ID = 5347353883
+REPLAY_AGENTS = [700000 + i for i in range(20)]
+
+
+# ==================== concurrency: ধীর sendPhoto বনাম বাকিদের বাটন, ইউজার প্রতি ক্রম ====================
+async def _concurrency_run(args, max_concurrent, run):
+    from telegram import Update
+
+    api = FakeBotAPI(latency={'sendPhoto': args.photo_latency}).start()
+    bot.outbox = bot.OutboundScheduler(global_rate=100000, chat_rate=100000, chat_burst=100)
+    started = {}
+    done = {}
+    # ইউজার -> যে ক্রমে তার আপডেট হ্যান্ডলিং শুরু হলো
+    order = defaultdict(list)
+
+    class TimedProcessor(bot.UserOrderedProcessor):
+        async def do_process_update(self, update, coroutine):
+            async def timed():
+                order[self.ordering_key(update)].append(update.update_id)
+                await coroutine
+                done[update.update_id] = time.perf_counter()
+            await super().do_process_update(update, timed())
+
+    bot.update_processor = TimedProcessor(max_concurrent)
+    application = await start_application(api)
+
+    # ধীর (থাম্বনেলসহ মুভি), দ্রুত (নতুন মুভি লিস্ট) ও আপলোড উইজার্ড - একে অপরের মাঝে মিশিয়ে
+    streams = []
+    update_id = 0
+    for i in range(args.slow):
+        update_id += 1
+        streams.append([('slow', callback_update(update_id, 30000 + i, f'movie:{1 + i % 50}'))])
+    for i in range(args.fast):
+        update_id += 1
+        streams.append([('fast', callback_update(update_id, 40000 + i, 'browse_latest'))])
+    for agent_id in REPLAY_AGENTS[:args.agents]:
+        steps = [('cb', 'browse_upload'), ('msg', f'Ordered Upload {run} {agent_id}'), ('msg', '2026'),
+                 ('msg', '720p'), ('msg', 'Hindi'), ('msg', '900MB'), ('msg', f'https://example.com/{agent_id}'),
+                 ('cb', 'skip_thumbnail'), ('cb', 'confirm_upload')]
+        stream = []
+        for kind, value in steps:
+            update_id += 1
+            make = callback_update if kind == 'cb' else message_update
+            stream.append(('wizard', make(update_id, agent_id, value)))
+        streams.append(stream)
+    kinds = {}
+    queue_order = []
+    while any(streams):
+        for stream in streams:
+            if stream:
+                kind, raw = stream.pop(0)
+                kinds[raw['update_id']] = kind
+                queue_order.append(raw)
+
+    t0 = time.perf_counter()
+    for raw in queue_order:
+        started[raw['update_id']] = time.perf_counter()
+        await application.update_queue.put(Update.de_json(raw, application.bot))
+    deadline = time.perf_counter() + 120
+    while len(done) < len(queue_order) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - t0
+    await stop_application(application)
+    api.stop()
+
+    label = 'sequential' if max_concurrent == 1 else f'concurrent({max_concurrent})'
+    print(f"--- {label}: {len(done)}/{len(queue_order)} updates in {elapsed:.2f}s")
+    for kind in ('fast', 'slow', 'wizard'):
+        report(f'{label} {kind}', [done[u] - started[u] for u, k in kinds.items() if k == kind and u in done])
+    out_of_order = [user for user, ids in order.items() if ids != sorted(ids)]
+    uploaded = bot.db.conn.execute(
+        "SELECT COUNT(*) FROM movies WHERE title LIKE ? AND year = '2026' AND quality = '720p' "
+        "AND language = 'Hindi' AND size = '900MB'", (f'Ordered Upload {run} %',)).fetchone()[0]
+    print(f"users processed out of order: {len(out_of_order)}; wizards completed intact: {uploaded}/{args.agents}")
+    return not out_of_order and uploaded == args.agents and len(done) == len(queue_order)
+
+
+def bench_concurrency(args):
+    seed_movies(bot.db, 2000)
+    bot.db.conn.execute("UPDATE movies SET thumbnail = 'thumb' WHERE id <= 50")
+    bot.db.conn.commit()
+    bot.db.catalog_version += 1
+    for agent_id in REPLAY_AGENTS[:args.agents]:
+        bot.db.add_agent(agent_id, ADMIN_ID)
+    ok = True
+    for run, limit in enumerate((1, args.concurrency)):
+        ok &= asyncio.run(_concurrency_run(args, limit, run))
+    return 0 if ok else 1
+
+
+# ==================== startup: কোল্ড স্টার্ট, আলাদা প্রসেসে ====================
+STARTUP_PROBE = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import bot
+imported = time.perf_counter() - started
+import benchmark
+
+async def run():
+    api = benchmark.FakeBotAPI().start()
+    bot.BOT_API_URL = api.url
+    application = bot.build_application()
+    # run_polling এর ক্রম: initialize -> post_init -> start
+    await application.initialize()
+    await bot.on_startup(application)
+    await application.start()
+    await bot.warm_up_task
+    await application.stop()
+    await application.shutdown()
+    await bot.on_shutdown(application)
+    api.stop()
+
+asyncio.run(run())
+print(json.dumps({'import': imported, **bot.STARTUP_TIMINGS, 'fuzzy_titles': len(bot.db.fuzzy)}))
+"""
+
+
+def startup_probe(db_path):
+    env = dict(os.environ, MOVIE_DB_PATH=db_path, METRICS_PORT='0', LOG_LEVEL='WARNING')
+    output = subprocess.run([sys.executable, '-c', STARTUP_PROBE], env=env, capture_output=True,
+                            text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def bench_startup(args):
+    for size in [int(s) for s in args.sizes.split(',')]:
+        path = os.path.join(_TMP_DIR, f'startup-{size}.db')
+        first = startup_probe(path)
+        if size:
+            database = bot.Database(path)
+            seed_movies(database, size)
+            database.conn.close()
+        started = time.perf_counter()
+        eager = bot.Database(path)
+        eager.load_fuzzy_index()
+        eager_seconds = time.perf_counter() - started
+        eager.conn.close()
+        runs = [startup_probe(path) for _ in range(args.runs)]
+        ms = lambda key: statistics.median(run[key] for run in runs) * 1000
+        print(f"--- {size} movies (median of {args.runs} restarts)")
+        print(f"first start on an empty file: database {first['database'] * 1000:.1f}ms (full DDL + migrations)")
+        print(f"restart: import bot {ms('import'):.1f}ms (telegram included)")
+        print(f"  from bot module start: database {ms('database'):.1f}ms, initialized {ms('initialized'):.1f}ms, "
+              f"serving {ms('serving'):.1f}ms, warm-up done {ms('warm'):.1f}ms ({runs[0]['fuzzy_titles']} fuzzy titles)")
+        print(f"eager Database() + fuzzy build, as before: {eager_seconds * 1000:.1f}ms before the first update")
+
+
+# ==================== inline: কিস্ট্রোক প্রতি ইনলাইন কুয়েরি ====================
+async def _inline_run(args, cached):
+    from telegram import Update
+
+    api = FakeBotAPI().start(process=True)
+    bot.outbox = bot.OutboundScheduler(global_rate=100000, chat_rate=100000, chat_burst=100)
+    bot.update_processor = bot.UserOrderedProcessor()
+    bot.inline_cache = bot.TTLCache(bot.INLINE_CACHE_SIZE if cached else 0, bot.INLINE_CACHE_TTL)
+    bot.inline_slots = asyncio.Semaphore(bot.INLINE_CONCURRENCY)
+    lookups = Counter()
+    for name in ('search_movies_page', 'fuzzy_search_movies', 'get_movies_page'):
+        async def counted(*call_args, name=name, call=getattr(bot.adb, name)):
+            lookups[name] += 1
+            return await call(*call_args)
+        setattr(bot.adb, name, counted)
+    application = await start_application(api)
+
+    rng = random.Random(7)
+    titles = ZipfTitles(args.movies, args.zipf, rng)
+    sent = {}
+    update_id = 0
+
+    async def type_title(user_id):
+        nonlocal update_id
+        query, _ = titles.query(0)
+        for i in range(1, len(query) + 1):
+            update_id += 1
+            sent[str(update_id)] = time.perf_counter()
+            await application.update_queue.put(Update.de_json(inline_update(update_id, user_id, query[:i]),
+                                                              application.bot))
+            await asyncio.sleep(rng.expovariate(1000 / args.keystroke_ms))
+        if rng.random() < 0.3:
+            # পরের পেজ দেখতে স্ক্রল
+            update_id += 1
+            sent[str(update_id)] = time.perf_counter()
+            await application.update_queue.put(Update.de_json(
+                inline_update(update_id, user_id, query, str(bot.INLINE_PAGE_SIZE)), application.bot))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(type_title(50000 + i) for i in range(args.users)))
+    await wait_until_drained(application)
+    await asyncio.sleep(0.5)
+    elapsed = time.perf_counter() - started
+    await stop_application(application)
+    inline_answers = api.remote()['inline_answers']
+    api.stop()
+    for name in list(vars(bot.adb)):
+        if name in lookups:
+            delattr(bot.adb, name)
+
+    label = 'cached' if cached else 'no cache'
+    answered = [inline_answers[i] - sent[i] for i in inline_answers if i in sent]
+    print(f"--- {label}: {len(sent)} inline queries from {args.users} users in {elapsed:.2f}s; "
+          f"answered {len(answered)}, superseded by a newer keystroke {len(sent) - len(answered)}")
+    print(f"dropped by the processor: {bot.update_processor.superseded}; database lookups: "
+          f"{sum(lookups.values())} {dict(lookups)}; cache {bot.inline_cache.stats()}")
+    report(f'inline answer ({label})', answered)
+
+
+class InlineQueryStub:
+    def __init__(self, query):
+        self.query = query
+        self.offset = ''
+        self.from_user = SimpleNamespace(id=1)
+        self.results = None
+
+    async def answer(self, results, **kwargs):
+        self.results = [int(result.id) for result in results]
+
+
+async def _inline_invalidation():
+    # আপলোড/ডিলিটের পর TTL শেষ হওয়ার অপেক্ষা ছাড়াই পরের কুয়েরিতে দেখা যায়/যায় না
+    async def search():
+        inline_query = InlineQueryStub('Inline Fresh Arrival')
+        await bot.inline_search(SimpleNamespace(inline_query=inline_query), None)
+        return inline_query.results
+
+    data = {'title': 'Inline Fresh Arrival', 'year': '2026', 'quality': '1080p', 'language': 'Bangla',
+            'size': '2GB', 'download_link': 'https://example.com/f', 'thumbnail': '', 'uploader_id': ADMIN_ID}
+    before = await search()
+    movie_id = await bot.adb.add_movie(data)
+    uploaded = await search()
+    await bot.adb.delete_movie(movie_id)
+    deleted = await search()
+    print(f"inline cache invalidation: upload visible={movie_id in uploaded}, "
+          f"deleted gone={movie_id not in deleted} (before upload: {movie_id in before})")
+    return movie_id in uploaded and movie_id not in deleted and movie_id not in before
+
+
+def bench_inline(args):
+    seed_movies(bot.db, args.movies)
+    bot.db.fuzzy = bot.FuzzyIndex()
+    bot.db.load_fuzzy_index()
+    bot.db.catalog_version += 1
+    for cached in (False, True):
+        asyncio.run(_inline_run(args, cached))
+    return 0 if asyncio.run(_inline_invalidation()) else 1
+
+
+# ==================== views: Markdown এস্কেপ, সীমা আর প্রি-বিল্ট মেনু ====================
+HOSTILE_TITLES = [
+    'Fast_and_Furious *X*', 'Mission: Impossible [Dead Reckoning]', '`Backtick` Cut', 'Ek_Tha_Tiger_2',
+    '**Bold** Claims_', 'Amélie \\ Poulain',
+    # ক্যাপশনের ১০২৪ সীমার বেশি, ইমোজিসহ (UTF-16 এ দুই ইউনিট)
+    'Épic 🎬 saga_part *' * 90,
+]
+
+
+def _views_updates(movie_ids, agent_id):
+    user_id = 70001
+    steps = [(user_id, 'msg', '/start'), (ADMIN_ID, 'msg', '/start'), (agent_id, 'cb', 'home'),
+             (user_id, 'cb', 'browse_latest')]
+    for movie_id in movie_ids:
+        steps += [(user_id, 'cb', f'movie:{movie_id}'), (ADMIN_ID, 'cb', f'movie:{movie_id}')]
+    for title in HOSTILE_TITLES:
+        steps.append((user_id, 'msg', title[:60]))
+        steps.append((user_id, 'inline', title[:40]))
+    steps += [(user_id, 'msg', 'zz_*[nothing` here'), (user_id, 'msg', 'ক' * 4000),
+              (user_id, 'cb', 'my_requests'), (agent_id, 'cb', 'top_requests'),
+              (ADMIN_ID, 'cb', 'browse_agents'), (ADMIN_ID, 'cb', 'agent_list'),
+              (ADMIN_ID, 'cb', 'agent_remove_menu'), (ADMIN_ID, 'cb', f'confirm_delete_agent:{agent_id}'),
+              (ADMIN_ID, 'msg', '/agents'), (ADMIN_ID, 'msg', '/stats detailed')]
+    steps += [(agent_id, 'cb', 'browse_upload')]
+    for text in ('Up_load *Star* `x`', '2026_', '1080p [WEB]', 'Bangla_Dub', '2*GB',
+                 'https://drive.google.com/file/d/1a_B*c/view?usp=share_link'):
+        steps.append((agent_id, 'msg', text))
+    steps += [(agent_id, 'cb', 'skip_thumbnail'), (agent_id, 'cb', 'confirm_upload')]
+    for update_id, (user, kind, value) in enumerate(steps, 1):
+        if kind == 'inline':
+            yield inline_update(update_id, user, value)
+        else:
+            yield (callback_update if kind == 'cb' else message_update)(update_id, user, value)
+
+
+async def _views_run():
+    from telegram import Update
+
+    api = FakeBotAPI(strict=True).start()
+    bot.outbox = bot.OutboundScheduler(global_rate=100000, chat_rate=100000, chat_burst=100)
+    application = await start_application(api)
+    agent_id = REPLAY_AGENTS[0]
+    movie_ids = []
+    for i, title in enumerate(HOSTILE_TITLES):
+        movie_ids.append(bot.db.add_movie({
+            'title': title, 'year': '20_2*', 'quality': '1080p [HD]', 'language': 'Bangla_Dub', 'size': '2*GB',
+            'download_link': f'https://drive.google.com/file/d/1a_B`c{i}/view?usp=share_link',
+            'thumbnail': 'thumb_file' if i % 2 else '', 'uploader_id': ADMIN_ID,
+        }))
+    bot.db.add_agent(agent_id, ADMIN_ID)
+    bot.db.conn.execute('UPDATE users SET username = ? WHERE user_id = ?', ('movie_*agent_`one', agent_id))
+    bot.db.conn.commit()
+    try:
+        for raw in _views_updates(movie_ids, agent_id):
+            await application.process_update(Update.de_json(raw, application.bot))
+        await bot.adb.flush()
+    finally:
+        await stop_application(application)
+        api.stop()
+    sent = sum(api.calls[method] for method in FakeBotAPI.MESSAGE_METHODS | {'answerInlineQuery'})
+    print(f"hostile titles/usernames/fields: {sent} messages sent, {len(api.rejected)} rejected by the API")
+    for method, error in api.rejected:
+        print(f"  REJECTED {method}: {error}")
+    return not api.rejected
+
+
+def _old_menu(role):
+    # আগের start/start_callback এর মতো: প্রতি কলে নতুন বাটন ও মার্কআপ
+    keyboard = [
+        [bot.InlineKeyboardButton("🔍 মুভি সার্চ", callback_data="browse_search")],
+        [bot.InlineKeyboardButton("📥 নতুন মুভি", callback_data="browse_latest")],
+        [bot.InlineKeyboardButton("📝 মুভি রিকোয়েস্ট", callback_data="browse_request")]
+    ]
+    if role in ['admin', 'agent']:
+        keyboard.append([bot.InlineKeyboardButton("📤 মুভি আপলোড", callback_data="browse_upload")])
+        keyboard.append([bot.InlineKeyboardButton("🔥 টপ রিকোয়েস্ট", callback_data="top_requests")])
+    if role == 'admin':
+        keyboard.append([
+            bot.InlineKeyboardButton("👥 এজেন্ট ম্যানেজ", callback_data="browse_agents"),
+            bot.InlineKeyboardButton("📊 স্ট্যাটস", callback_data="browse_stats")
+        ])
+    return bot.InlineKeyboardMarkup(keyboard)
+
+
+def bench_views(args):
+    for role in ('user', 'agent', 'admin'):
+        if bot.main_menu(role) != _old_menu(role):
+            print(f"menu for {role} differs from the old keyboard")
+            return 1
+    roles = ['user', 'agent', 'admin'] * (args.iterations // 3)
+    for label, menu in (('menu built per call', _old_menu), ('precompiled menu', bot.main_menu)):
+        started = time.perf_counter()
+        for role in roles:
+            menu(role).to_dict()
+        elapsed = time.perf_counter() - started
+        print(f"{label:<24} {elapsed / len(roles) * 1e6:8.2f} µs/call (with serialization)")
+    text = bot.movie_details_text((1, HOSTILE_TITLES[-1], '2024', '1080p', 'Bangla', '2GB', 'https://x/y_z', '',
+                                   ADMIN_ID, '2026-01-01'))
+    for label, fn in (('md() escape', lambda: bot.md(HOSTILE_TITLES[-1])),
+                      ('fit() caption', lambda: bot.fit(text, bot.CAPTION_LIMIT)),
+                      ('fit() short text', lambda: bot.fit('🏠 *মেইন মেনু*'))):
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            fn()
+        print(f"{label:<24} {(time.perf_counter() - started) / args.iterations * 1e6:8.2f} µs/call")
+    return 0 if asyncio.run(_views_run()) else 1
+
+
+# ==================== details: প্রতি ট্যাপে Bot API কল ====================
+async def _details_run():
+    from telegram import Update
+
+    api = FakeBotAPI(strict=True).start()
+    bot.outbox = bot.OutboundScheduler(global_rate=100000, chat_rate=100000, chat_burst=100)
+    application = await start_application(api)
+    movies = {}
+    for label, thumbnail in (('thumb', 'photo_a'), ('thumb 2', 'photo_b'), ('dead', 'dead_c'), ('none', '')):
+        movies[label] = bot.db.add_movie({
+            'title': f'Detail Card {label}', 'year': '2026', 'quality': '1080p', 'language': 'Bangla',
+            'size': '2GB', 'download_link': 'https://example.com/d', 'thumbnail': thumbnail,
+            'uploader_id': ADMIN_ID,
+        })
+    user_id = 80001
+    # (লেবেল, callback_data, কোথা থেকে): 'list' = টেক্সট মেসেজ, 'last' = ইউজারের সবশেষ মেসেজ
+    taps = [
+        ('list -> card', f"movie:{movies['thumb']}", 'list'),
+        ('card -> card (edit media)', f"movie:{movies['thumb 2']}", 'last'),
+        ('card -> same card', f"movie:{movies['thumb 2']}", 'last'),
+        ('card -> list (back)', 'browse_latest', 'last'),
+        ('list -> dead thumb (1st)', f"movie:{movies['dead']}", 'list'),
+        ('list -> dead thumb (again)', f"movie:{movies['dead']}", 'list'),
+        ('list -> no thumb', f"movie:{movies['none']}", 'list'),
+        ('list -> card', f"movie:{movies['thumb']}", 'list'),
+        ('card -> dead thumb (again)', f"movie:{movies['dead']}", 'last'),
+    ]
+    rows = []
+    try:
+        await application.process_update(Update.de_json(message_update(1, user_id, '/start'), application.bot))
+        list_message = api.last_message[user_id][0]
+        for update_id, (label, data, source) in enumerate(taps, 2):
+            message_id, photo = api.last_message[user_id] if source == 'last' else (list_message, False)
+            before = Counter(api.calls)
+            rejected = len(api.rejected)
+            started = time.perf_counter()
+            await application.process_update(Update.de_json(
+                callback_update(update_id, user_id, data, message_id, photo), application.bot))
+            elapsed = time.perf_counter() - started
+            calls = Counter(api.calls)
+            calls.subtract(before)
+            calls.pop('answerCallbackQuery', None)
+            rows.append((label, +calls, len(api.rejected) - rejected, elapsed))
+    finally:
+        await stop_application(application)
+        api.stop()
+    for label, calls, failed, elapsed in rows:
+        print(f"{label:<28} {sum(calls.values())} call(s) {failed} failed  {elapsed * 1000:6.1f}ms  {dict(calls)}")
+    print(f"dead thumbnails tracked: {bot.db.dead_thumbnails}")
+    stale = bot.Database(bot.db.path).dead_thumbnails
+    print(f"after restart: {stale}")
+    return all(sum(calls.values()) <= 1 for label, calls, _, _ in rows if '(1st)' not in label) \
+        and movies['dead'] in stale
+
+
+def bench_details(args):
+    return 0 if asyncio.run(_details_run()) else 1
+
+
+# ==================== search-cache: ক্যাটালগ ভার্সনসহ সার্চ রেজাল্ট ক্যাশ ====================
+async def _search_cache_run(args, cache_bytes):
+    bot.adb.search_cache = bot.VersionedCache(cache_bytes)
+    rng = random.Random(22)
+    titles = ZipfTitles(args.movies, args.zipf, rng)
+    latencies = []
+    uploads = 0
+    started = time.perf_counter()
+    for i in range(args.queries):
+        if args.upload_every and i and i % args.upload_every == 0:
+            # আপলোড ক্যাটালগ ভার্সন বাড়ায় - আগের সব ফল অবৈধ
+            await bot.adb.add_movie({
+                'title': f'{make_title(i)} fresh', 'year': '2026', 'quality': '1080p', 'language': 'Bangla',
+                'size': '1GB', 'download_link': f'https://drive.google.com/file/fresh{i}', 'uploader_id': ADMIN_ID,
+            })
+            uploads += 1
+        query, _ = titles.query(args.typo_rate)
+        t0 = time.perf_counter()
+        movies, _ = await bot.adb.search_movies_page(query, bot.SEARCH_LIMIT)
+        if not movies:
+            await bot.adb.fuzzy_search_movies(query, bot.SEARCH_LIMIT)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    stats = bot.adb.search_cache.stats()
+    label = f'{cache_bytes / 1048576:.1f}MB cache' if cache_bytes else 'no cache'
+    report(f'search ({label})', latencies, elapsed)
+    print(f"  hit rate {stats['hit_rate']:.1%}  hits={stats['hits']} misses={stats['misses']} "
+          f"stale={stats['stale']}  entries={stats['size']} bytes={stats['bytes']}  uploads={uploads}")
+    return stats
+
+
+async def _search_cache_invalidation():
+    # ক্যাশ হওয়া কুয়েরি আপলোড/ডিলিটের পরপরই নতুন ক্যাটালগ দেখায় কিনা
+    query = 'zzqx benchmark'
+    before, _ = await bot.adb.search_movies_page(query)
+    movie_id = await bot.adb.add_movie({
+        'title': 'Zzqx Benchmark', 'year': '2026', 'quality': '720p', 'language': 'Bangla',
+        'size': '1GB', 'download_link': 'https://drive.google.com/file/zzqx', 'uploader_id': ADMIN_ID,
+    })
+    after_add, _ = await bot.adb.search_movies_page(query.upper())
+    await bot.adb.delete_movie(movie_id)
+    after_delete, _ = await bot.adb.search_movies_page(query)
+    ok = not before and [m[0] for m in after_add] == [movie_id] and not after_delete
+    print(f"invalidation: before={len(before)} after add={len(after_add)} after delete={len(after_delete)} "
+          f"-> {'OK' if ok else 'STALE RESULT'}")
+    return ok
+
+
+def bench_search_cache(args):
+    seed_movies(bot.db, args.movies)
+    bot.db.fuzzy = bot.FuzzyIndex()
+    bot.db.load_fuzzy_index()
+    bot.db.catalog_version += 1
+    for cache_bytes in (0, int(args.cache_mb * 1024 * 1024)):
+        asyncio.run(_search_cache_run(args, cache_bytes))
+    if not asyncio.run(_search_cache_invalidation()):
+        return 1
+
+
+# ==================== replay: সিন্থেটিক সেশন রিপ্লে, হ্যান্ডলার অনুযায়ী লেটেন্সি ====================
+
+
+class ZipfTitles:
+    """ক্যাটালগের টাইটেল থেকে Zipf বণ্টনে কুয়েরি: অল্প কিছু টাইটেল বেশিরভাগ সার্চ পায়"""
+
+    def __init__(self, size, exponent, rng, pool=1000):
+        step = max(1, size // pool)
+        self.titles = [make_title(i) for i in range(0, size, step)]
+        rng.shuffle(self.titles)
+        weights = [1 / (rank + 1) ** exponent for rank in range(len(self.titles))]
+        total = 0
+        self.cum_weights = []
+        for weight in weights:
+            total += weight
+            self.cum_weights.append(total)
+        self.rng = rng
+
+    def query(self, typo_rate):
+        title = self.rng.choices(self.titles, cum_weights=self.cum_weights)[0].lower()
+        words = title.split()
+        # কখনো পুরো নাম, কখনো শুধু প্রথম শব্দ (প্রিফিক্সসহ)
+        query = title if self.rng.random() < 0.6 else words[0][:max(3, len(words[0]) - 1)]
+        if self.rng.random() < typo_rate and len(query) > 3:
+            i = self.rng.randrange(len(query) - 1)
+            return query[:i] + query[i + 1] + query[i] + query[i + 2:], 'search (typo)'
+        return query, 'search'
+
+
+class SessionGenerator:
+    """ইউজার সেশন: প্রতিটি সেশনের আপডেট ক্রমানুসারে, সেশনগুলো একসাথে"""
+
+    def __init__(self, size, args, seed=1):
+        self.rng = random.Random(seed)
+        self.size = size
+        self.args = args
+        self.titles = ZipfTitles(size, args.zipf, self.rng)
+        self.update_id = 0
+
+    def _message(self, user_id, text):
+        self.update_id += 1
+        return message_update(self.update_id, user_id, text)
+
+    def _callback(self, user_id, data):
+        self.update_id += 1
+        return callback_update(self.update_id, user_id, data)
+
+    def browse(self, user_id):
+        session = [('cmd /start', self._message(user_id, '/start'))]
+        for _ in range(self.rng.randint(1, 4)):
+            query, label = self.titles.query(self.args.typo_rate)
+            session.append((label, self._message(user_id, query)))
+        session.append(('tap latest', self._callback(user_id, 'browse_latest')))
+        if self.rng.random() < 0.5:
+            cursor = bot.encode_id(max(1, self.size - bot.LATEST_PAGE_SIZE + 1))
+            session.append(('tap latest page', self._callback(user_id, f'lt:n:{cursor}')))
+        session.append(('tap movie', self._callback(user_id, f'movie:{self.rng.randint(1, self.size)}')))
+        return session
+
+    def request(self, user_id):
+        # ক্যাটালগে নেই এমন সিকুয়েল ("Avatar 4"): টাইপো-মিলে আগের পর্ব দেখালে রিকোয়েস্ট সেভ হয় না
+        copies = self.size // 20 // len(TITLES) + 1
+        wanted = f'{self.rng.choice(["Avatar", "Salaar Part", "Animal", "KGF"])} {copies + self.rng.randint(1, 3)}'
+        return [
+            ('tap request', self._callback(user_id, 'browse_request')),
+            ('search miss -> request', self._message(user_id, wanted)),
+            ('tap my requests', self._callback(user_id, 'my_requests')),
+        ]
+
+    def upload(self, agent_id):
+        title = f'Replay Upload {self.update_id}'
+        session = [('upload step', self._callback(agent_id, 'browse_upload'))]
+        for text in (title, '2026', '1080p WEB-DL', 'Bangla', '2.1GB', 'https://drive.google.com/file/replay'):
+            session.append(('upload step', self._message(agent_id, text)))
+        session.append(('upload step', self._callback(agent_id, 'skip_thumbnail')))
+        session.append(('upload confirm', self._callback(agent_id, 'confirm_upload')))
+        return session
+
+    def admin(self):
+        return [
+            ('admin /stats', self._message(ADMIN_ID, '/stats')),
+            ('admin /stats detailed', self._message(ADMIN_ID, '/stats detailed')),
+            ('admin /agents', self._message(ADMIN_ID, '/agents')),
+            ('admin tap', self._callback(ADMIN_ID, 'browse_stats')),
+            ('admin tap', self._callback(ADMIN_ID, 'top_requests')),
+            ('admin tap', self._callback(ADMIN_ID, 'browse_agents')),
+            ('admin tap', self._callback(ADMIN_ID, 'agent_list')),
+        ]
+
+    def sessions(self, count):
+        kinds = ['browse', 'request', 'upload', 'admin']
+        weights = [70, 15, 10, 5]
+        for i in range(count):
+            kind = self.rng.choices(kinds, weights)[0]
+            if kind == 'browse':
+                yield self.browse(20000 + self.rng.randrange(5000))
+            elif kind == 'request':
+                yield self.request(20000 + self.rng.randrange(5000))
+            elif kind == 'upload':
+                yield self.upload(self.rng.choice(REPLAY_AGENTS))
+            else:
+                yield self.admin()
+
+
+async def _replay_run(args, size):
+    from telegram import Update
+
+    api = FakeBotAPI().start()
+    if not args.flood_control:
+        bot.outbox = bot.OutboundScheduler(global_rate=100000, chat_rate=100000, chat_burst=100)
+    application = await start_application(api)
+    errors = Counter()
+
+    async def on_error(update, context):
+        name = type(context.error).__name__
+        if not errors[name]:
+            print(f"first {name}: {context.error!r}", file=sys.stderr)
+        errors[name] += 1
+    application.add_error_handler(on_error)
+
+    latencies = defaultdict(list)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    # একই ইউজারের দুই সেশন একসাথে চললে ক্রম ভেঙে যায় (যেমন একই এজেন্টের দুই আপলোড)
+    user_locks = defaultdict(asyncio.Lock)
+
+    async def run_session(session):
+        user_id = session[0][1].get('message', session[0][1].get('callback_query', {})).get('from', {}).get('id')
+        async with semaphore, user_locks[user_id]:
+            for label, raw in session:
+                started = time.perf_counter()
+                await application.process_update(Update.de_json(raw, application.bot))
+                latencies[label].append(time.perf_counter() - started)
+
+    sessions = list(SessionGenerator(size, args).sessions(args.sessions))
+    total = sum(len(session) for session in sessions)
+    wanted = Counter(raw['message']['text'] for session in sessions for label, raw in session
+                     if label == 'search miss -> request')
+    last_request = bot.db.conn.execute('SELECT COALESCE(MAX(id), 0) FROM requests').fetchone()[0]
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(run_session(session) for session in sessions))
+        elapsed = time.perf_counter() - started
+    finally:
+        await stop_application(application)
+        api.stop()
+
+    print(f"--- {size} movies: {len(sessions)} sessions, {total} updates in {elapsed:.2f}s "
+          f"({total / elapsed:.1f} updates/s), handler errors: {dict(errors) or 0}")
+    # সিকুয়েল কুয়েরি ফাজি-মিলে আগের পর্বে গেলে এখানে কম আসে
+    saved = bot.db.conn.execute(
+        f"SELECT COUNT(*) FROM requests WHERE id > ? AND movie_name IN ({','.join('?' * len(wanted))})",
+        (last_request, *wanted)).fetchone()[0] if wanted else 0
+    print(f"sequel requests saved: {saved}/{sum(wanted.values())}")
+    for label in sorted(latencies):
+        report(label, latencies[label])
+    report('ALL', [value for values in latencies.values() for value in values], elapsed)
+
+
+def bench_replay(args):
+    for agent_id in REPLAY_AGENTS:
+        bot.db.add_agent(agent_id, ADMIN_ID)
+    for size in [int(s) for s in args.sizes.split(',')]:
+        seed_movies(bot.db, size)
+        # সরাসরি INSERT এ ফাজি ইনডেক্স ও ক্যাটালগ ভার্সন আপডেট হয় না
+        bot.db.fuzzy = bot.FuzzyIndex()
+        bot.db.load_fuzzy_index()
+        bot.db.catalog_version += 1
+        asyncio.run(_replay_run(args, size))
+
+
+# ==================== links: ডাউনলোড লিংক হেলথ চেক ====================
+# লিংকের ধরন -> (প্রতি ১০০০ এ কতটা, চেকারের প্রত্যাশিত ফল)
+LINK_KINDS = [
+    ('ok', 850, 'ok'),
+    ('gone', 50, 'dead'),
+    ('nohead', 40, 'ok'),
+    ('redirect', 30, 'ok'),
+    ('flaky', 20, 'error'),
+    ('invalid', 7, 'dead'),
+    ('slow', 3, 'error'),
+]
+
+
+class StubLinkServer:
+    """ডাউনলোড হোস্টের মতো আচরণ: পাথ অনুযায়ী স্ট্যাটাস। 0.0.0.0 এ শোনে, তাই 127.0.0.1-4 আলাদা হোস্ট;
+    Host হেডার ধরে হোস্ট প্রতি একসাথে কত রিকোয়েস্ট চলছে তা মাপে"""
+
+    def __init__(self, latency=0.01, client_timeout=1.0):
+        self.latency = latency
+        self.client_timeout = client_timeout
+        self.in_flight = Counter()
+        self.max_in_flight = Counter()
+        self.requests = Counter()
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, '0.0.0.0', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def _leave(self, host):
+        self.in_flight[host] -= 1
+
+    async def _respond(self, reader, method, path, host):
+        self.in_flight[host] += 1
+        self.max_in_flight[host] = max(self.max_in_flight[host], self.in_flight[host])
+        counted = True
+        try:
+            await asyncio.sleep(self.latency)
+            if path == '/slow':
+                # ক্লায়েন্ট টাইমআউটের ঠিক আগে গোনা বন্ধ - তারপর ক্লায়েন্ট কানেকশন কাটা পর্যন্ত চুপ
+                await asyncio.sleep(self.client_timeout * 0.8)
+                self._leave(host)
+                counted = False
+                await reader.read()
+                return None
+            if path == '/gone':
+                return 404, '', b'not found'
+            if path == '/flaky':
+                return 503, '', b'busy'
+            if path == '/redirect':
+                return 302, 'Location: /ok\r\n', b''
+            if path == '/nohead' and method == 'HEAD':
+                return 405, 'Allow: GET\r\n', b''
+            # বড় ফাইলের মতো বডি - GET এ চেকার এটা পড়ে না
+            return 200, 'Content-Type: video/mp4\r\n', b'\0' * 65536
+        finally:
+            if counted:
+                self._leave(host)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+                method, target, _ = head[0].split(' ', 2)
+                headers = {key.strip().lower(): value.strip()
+                           for key, _, value in (line.partition(':') for line in head[1:] if line)}
+                host = headers.get('host', '').rsplit(':', 1)[0]
+                path = target.split('?')[0]
+                self.requests[method, path] += 1
+                response = await self._respond(reader, method, path, host)
+                if response is None:
+                    return
+                status, extra, body = response
+                writer.write(f'HTTP/1.1 {status} Stub\r\nContent-Length: {len(body)}\r\n{extra}\r\n'.encode()
+                             + (b'' if method == 'HEAD' else body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+def link_kind(movie_id):
+    slot = movie_id * 37 % 1000
+    for kind, share, expected in LINK_KINDS:
+        if slot < share:
+            return kind, expected
+        slot -= share
+    raise AssertionError(movie_id)
+
+
+def link_for(movie_id, port, kind):
+    if kind == 'invalid':
+        # urlsplit নিজেই ValueError দেয় এমন লিংকও - এক সারিতে পুরো সুইপ যেন না থামে
+        return ('ftp://files.example/movie.mkv', 'link dead, ask admin', 'http://[abc/x')[movie_id % 3]
+    return f'http://127.0.0.{movie_id % 4 + 1}:{port}/{kind}?id={movie_id}'
+
+
+class NoticeBot:
+    """run_link_check এর send_message ধরে রাখে"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text, kwargs))
+
+
+async def _links_run(args):
+    stub = await StubLinkServer(args.latency_ms / 1000, args.timeout).start()
+    ids = [row[0] for row in bot.db.conn.execute('SELECT id FROM movies')]
+    expected = {}
+    rows = []
+    for movie_id in ids:
+        kind, expected[movie_id] = link_kind(movie_id)
+        rows.append((link_for(movie_id, stub.port, kind), movie_id))
+    bot.db.conn.executemany('UPDATE movies SET download_link = ?, link_status = NULL, last_checked = NULL '
+                            'WHERE id = ?', rows)
+    bot.db.conn.commit()
+
+    checker = bot.LinkChecker(concurrency=args.concurrency, per_host=args.per_host, timeout=args.timeout)
+    ok = True
+    try:
+        lag = []
+
+        async def watch_loop():
+            # সুইপ চলাকালীন ইভেন্ট লুপ কতটা আটকায় (বট একই লুপে আপডেট হ্যান্ডল করে)
+            while True:
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lag.append(time.perf_counter() - started - 0.01)
+
+        watcher = asyncio.create_task(watch_loop())
+        summary = await checker.run()
+        watcher.cancel()
+        print(f"sweep: {summary['checked']} links in {summary['seconds']:.1f}s ({summary['rate']:.0f} links/s), "
+              f"ok {summary['ok']} / dead {summary['dead']} / error {summary['error']}, new dead {summary['new_dead']}")
+        print(f"event loop lag during sweep: p50 {percentile(lag, 50) * 1000:.1f}ms "
+              f"p99 {percentile(lag, 99) * 1000:.1f}ms")
+        print(f"stub requests: {dict(sorted(Counter(method for method, _ in stub.requests.elements()).items()))}, "
+              f"GET bodies skipped on {stub.requests['GET', '/nohead']} HEAD-less hosts")
+        print(f"max in flight per host: {dict(sorted(stub.max_in_flight.items()))} (limit {args.per_host})")
+        ok &= summary['checked'] == len(ids)
+        ok &= all(peak <= args.per_host for peak in stub.max_in_flight.values())
+
+        statuses = dict(bot.db.conn.execute('SELECT id, link_status FROM movies'))
+        wrong = Counter(link_kind(movie_id)[0] for movie_id, status in statuses.items()
+                        if status != expected[movie_id])
+        print(f"status mismatches by kind: {dict(wrong) or 'none'}")
+        print(f"link health: {await bot.adb.get_link_health()}")
+        ok &= not wrong
+
+        again = await checker.run()
+        print(f"second sweep (nothing stale): {again['checked']} links in {again['seconds'] * 1000:.0f}ms")
+        ok &= again['checked'] == 0
+
+        # কিছু লিংক আগে ok ছিল, এখন মারা গেছে - শুধু এগুলোর জন্য অ্যাডমিন নোটিস
+        revived = [movie_id for movie_id in ids if link_kind(movie_id)[0] == 'gone'][:25]
+        bot.db.conn.executemany("UPDATE movies SET link_status = 'ok', last_checked = NULL WHERE id = ?",
+                                [(movie_id,) for movie_id in revived])
+        bot.db.conn.commit()
+        bot.link_checker = checker
+        notice_bot = NoticeBot()
+        notified = await bot.run_link_check(notice_bot)
+        admins = await bot.adb.get_admin_ids()
+        print(f"newly dead: {notified['new_dead']} of {notified['checked']} rechecked, "
+              f"notices to {len(notice_bot.sent)}/{len(admins)} admins")
+        ok &= notified['new_dead'] == len(revived) and len(notice_bot.sent) == len(admins)
+        for _, text, kwargs in notice_bot.sent:
+            ok &= text_error(text, kwargs.get('parse_mode'), bot.TEXT_LIMIT) is None
+            ok &= kwargs.get('rate_limit_args') == bot.PRIORITY_BACKGROUND
+
+        # /deadlinks ভিউ: প্রতিটি পেজ বৈধ মার্কডাউন, কার্সর ধরে শেষ পর্যন্ত
+        pages, seen, cursor = 0, 0, None
+        while True:
+            text, markup = await bot.build_dead_links_view(cursor)
+            ok &= text_error(text, 'Markdown', bot.TEXT_LIMIT) is None
+            pages += 1
+            next_data = [button.callback_data for row in markup.inline_keyboard for button in row
+                         if button.callback_data.startswith('dl:')]
+            seen += text.count('🎬')
+            if not next_data:
+                break
+            cursor = bot.decode_id(next_data[0].split(':')[1])
+        dead = sum(status == 'dead' for status in expected.values())
+        print(f"/deadlinks: {seen} dead links over {pages} pages (expected {dead})")
+        ok &= seen == dead
+    finally:
+        await stub.stop()
+    return ok
+
+
+def bench_links(args):
+    seed_movies(bot.db, args.movies)
+    return 0 if asyncio.run(_links_run(args)) else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Movie Bot benchmarks')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    db_parser = sub.add_parser('db', help='handler latency with sync vs async database access')
+    db_parser.add_argument('--movies', type=int, default=20000)
+    db_parser.add_argument('--handlers', type=int, default=2000)
+    db_parser.add_argument('--rate', type=float, default=80, help='updates per second')
+    db_parser.set_defaults(func=bench_db)
+
+    search_parser = sub.add_parser('search', help='title search latency by catalog size')
+    search_parser.add_argument('--sizes', default='10000,100000,1000000')
+    search_parser.add_argument('--queries', type=int, default=200)
+    search_parser.set_defaults(func=bench_search)
+
+    fuzzy_parser = sub.add_parser('fuzzy', help='typo-tolerant trigram search latency')
+    fuzzy_parser.add_argument('--movies', type=int, default=100000)
+    fuzzy_parser.add_argument('--queries', type=int, default=240)
+    fuzzy_parser.set_defaults(func=bench_fuzzy)
+
+    webhook_parser = sub.add_parser('webhook', help='POST synthetic updates to the webhook server')
+    webhook_parser.add_argument('--updates', type=int, default=2000)
+    webhook_parser.add_argument('--concurrency', type=int, default=20)
+    webhook_parser.add_argument('--movies', type=int, default=10000)
+    webhook_parser.add_argument('--port', type=int, default=8765)
+    webhook_parser.add_argument('--flood-control', action='store_true', help='keep Telegram send limits')
+    webhook_parser.set_defaults(func=bench_webhook)
+
+    outbound_parser = sub.add_parser('outbound', help='broadcast + interactive sends against a flood-limited fake API')
+    outbound_parser.add_argument('--broadcast', type=int, default=150)
+    outbound_parser.add_argument('--interactive', type=int, default=20)
+    outbound_parser.add_argument('--api-limit', type=int, default=30, help='fake API messages per second')
+    outbound_parser.add_argument('--chat-burst', type=int, default=6)
+    outbound_parser.set_defaults(func=bench_outbound)
+
+    fanout_parser = sub.add_parser('fanout', help='notify requesters when a requested movie is uploaded')
+    fanout_parser.add_argument('--requesters', type=int, default=3000, help='pending requests that match')
+    fanout_parser.add_argument('--pending', type=int, default=50000, help='pending requests that do not')
+    fanout_parser.add_argument('--send-rate', type=float, default=1000, help='scheduler global rate for the run')
+    fanout_parser.set_defaults(func=bench_fanout)
+
+    persistence_parser = sub.add_parser('persistence', help='upload wizard state across a restart')
+    persistence_parser.add_argument('--agents', type=int, default=200)
+    persistence_parser.set_defaults(func=bench_persistence)
+
+    routes_parser = sub.add_parser('routes', help='check every callback route and time dispatch')
+    routes_parser.add_argument('--iterations', type=int, default=20000)
+    routes_parser.set_defaults(func=bench_routes)
+
+    logging_parser = sub.add_parser('logging', help='event-loop cost of logging when stdout is slow')
+    logging_parser.add_argument('--events', type=int, default=2000)
+    logging_parser.add_argument('--write-ms', type=float, default=1.0)
+    logging_parser.set_defaults(func=bench_logging)
+
+    metrics_parser = sub.add_parser('metrics', help='scrape /metrics after synthetic traffic')
+    metrics_parser.add_argument('--updates', type=int, default=500)
+    metrics_parser.add_argument('--movies', type=int, default=10000)
+    metrics_parser.add_argument('--iterations', type=int, default=50000)
+    metrics_parser.set_defaults(func=bench_metrics)
+
+    concurrency_parser = sub.add_parser('concurrency', help='slow sendPhoto vs other users, per-user ordering')
+    concurrency_parser.add_argument('--slow', type=int, default=20, help='users opening a movie with a thumbnail')
+    concurrency_parser.add_argument('--fast', type=int, default=200, help='users tapping the latest list')
+    concurrency_parser.add_argument('--agents', type=int, default=10, help='agents running the upload wizard')
+    concurrency_parser.add_argument('--photo-latency', type=float, default=0.3)
+    concurrency_parser.add_argument('--concurrency', type=int, default=bot.CONCURRENT_UPDATES)
+    concurrency_parser.set_defaults(func=bench_concurrency)
+
+    startup_parser = sub.add_parser('startup', help='cold start: time until updates are served')
+    startup_parser.add_argument('--sizes', default='0,10000,100000', help='catalog sizes')
+    startup_parser.add_argument('--runs', type=int, default=3)
+    startup_parser.set_defaults(func=bench_startup)
+
+    inline_parser = sub.add_parser('inline', help='inline-mode queries typed keystroke by keystroke')
+    inline_parser.add_argument('--movies', type=int, default=50000)
+    inline_parser.add_argument('--users', type=int, default=20,
+                               help='typists; past ~25 one CPU saturates and latency is pure queueing')
+    inline_parser.add_argument('--keystroke-ms', type=float, default=150)
+    inline_parser.add_argument('--zipf', type=float, default=1.1)
+    inline_parser.set_defaults(func=bench_inline)
+
+    views_parser = sub.add_parser('views', help='hostile titles through every view; menu and escaping cost')
+    views_parser.add_argument('--iterations', type=int, default=30000)
+    views_parser.set_defaults(func=bench_views)
+
+    details_parser = sub.add_parser('details', help='Bot API calls per movie-detail tap, dead thumbnails')
+    details_parser.set_defaults(func=bench_details)
+
+    search_cache_parser = sub.add_parser('search-cache', help='popular-query search with the catalog-versioned cache')
+    search_cache_parser.add_argument('--movies', type=int, default=100000)
+    search_cache_parser.add_argument('--queries', type=int, default=5000)
+    search_cache_parser.add_argument('--upload-every', type=int, default=500, help='queries between uploads')
+    search_cache_parser.add_argument('--cache-mb', type=float, default=bot.SEARCH_CACHE_BYTES / 1048576)
+    search_cache_parser.add_argument('--zipf', type=float, default=1.1)
+    search_cache_parser.add_argument('--typo-rate', type=float, default=0.15)
+    search_cache_parser.set_defaults(func=bench_search_cache)
+
+    replay_parser = sub.add_parser('replay', help='replay synthetic user sessions, per-handler latency')
+    replay_parser.add_argument('--sizes', default='10000,100000', help='catalog sizes to seed, in order')
+    replay_parser.add_argument('--sessions', type=int, default=400)
+    replay_parser.add_argument('--concurrency', type=int, default=20, help='sessions in flight')
+    replay_parser.add_argument('--zipf', type=float, default=1.1, help='Zipf exponent of the search title mix')
+    replay_parser.add_argument('--typo-rate', type=float, default=0.15)
+    replay_parser.add_argument('--flood-control', action='store_true', help='keep Telegram send limits')
+    replay_parser.set_defaults(func=bench_replay)
+
+    links_parser = sub.add_parser('links', help='download-link health sweep against a local stub host')
+    links_parser.add_argument('--movies', type=int, default=100000)
+    links_parser.add_argument('--concurrency', type=int, default=bot.LINK_CHECK_CONCURRENCY)
+    links_parser.add_argument('--per-host', type=int, default=bot.LINK_CHECK_PER_HOST)
+    links_parser.add_argument('--timeout', type=float, default=1.0, help='probe timeout; /slow exceeds it')
+    links_parser.add_argument('--latency-ms', type=float, default=20, help='stub response time')
+    links_parser.set_defaults(func=bench_links)
+
+    args = parser.parse_args()
+    try:
+        return args.func(args)
+    finally:
+        bot.adb.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,25 +1,1023 @@
 import os
+import re
+import math
+import base64
+import struct
+import hashlib
+import sys
+import time
+import bisect
+import heapq
+import functools
+import json
+import queue
+import atexit
+import random
+import asyncio
 import logging
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
+import logging.handlers
+import inspect
+import threading
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+from telegram import (Update, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, InputMediaPhoto,
+                      InlineQueryResultCachedPhoto, InlineQueryResultsButton, InputTextMessageContent)
+from telegram.error import BadRequest, RetryAfter, TelegramError
+from telegram.ext import Application, BasePersistence, BaseRateLimiter, BaseUpdateProcessor, PersistenceInput, CommandHandler, CallbackQueryHandler, InlineQueryHandler, MessageHandler, filters, ContextTypes
 import sqlite3
+import httpx
 from datetime import datetime
 
+# স্টার্টআপ ধাপগুলোর সময় (সেকেন্ড) - লগ ও /metrics এ
+STARTUP_STARTED = time.perf_counter()
+STARTUP_TIMINGS = {}
+
 # লগিং সেটআপ
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+# LOG_FORMAT: json | text
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+# ইউজারের লেখা (মেসেজ, আপলোডের তথ্য) লগে কীভাবে যাবে: full | hash | drop
+LOG_TEXT = os.environ.get('LOG_TEXT', 'hash')
+# বেশি ভলিউমের ইভেন্টের কত অংশ লগ হবে, যেমন "button=0.1,message=0.1"; না থাকলে সব
+LOG_SAMPLE = {
+    event: float(rate)
+    for event, _, rate in (item.partition('=') for item in
+                           os.environ.get('LOG_SAMPLE', 'button=0.1,message=0.1,inline=0.01').split(',') if item)
+}
+# এই ফিল্ডগুলোতে ইউজারের লেখা থাকে - LOG_TEXT অনুযায়ী রিড্যাক্ট
+LOG_TEXT_FIELDS = {'text'}
+
+
+def redact(value, mode=LOG_TEXT):
+    if mode == 'full':
+        return value[:200]
+    if mode == 'hash':
+        # একই লেখা একই হ্যাশ - গোনা/খোঁজা যায়, পড়া যায় না
+        return f"blake2s:{hashlib.blake2s(value.encode(), digest_size=6).hexdigest()} len={len(value)}"
+    return f"len={len(value)}"
+
+
+def _event_fields(record):
+    fields = dict(getattr(record, 'fields', None) or {})
+    for key in LOG_TEXT_FIELDS & fields.keys():
+        if isinstance(fields[key], str):
+            fields[key] = redact(fields[key])
+    return fields
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        entry.update(_event_fields(record))
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = super().format(record)
+        fields = _event_fields(record)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """ইভেন্ট লুপে শুধু রেকর্ড কিউতে রাখা; ফরম্যাট, রিড্যাক্ট ও লেখা লিসেনার থ্রেডে"""
+    
+    def prepare(self, record):
+        # একই প্রসেসের কিউ - পিকল লাগে না, তাই আগেভাগে ফরম্যাট করার দরকার নেই
+        return record
+
+
+def setup_logging(stream=None, fmt=LOG_FORMAT, level=LOG_LEVEL):
+    output = logging.StreamHandler(stream or sys.stdout)
+    if fmt == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(TextFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, output)
+    
+    stop_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    handler = DeferredQueueHandler(records)
+    handler.listener = listener
+    root.addHandler(handler)
+    root.setLevel(level)
+    listener.start()
+    return listener
+
+
+def stop_logging():
+    # কিউতে থাকা লগ লিখে লিসেনার থ্রেড বন্ধ; একাধিকবার ডাকলেও সমস্যা নেই
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, DeferredQueueHandler) and handler.listener is not None:
+            handler.listener.stop()
+            handler.listener = None
+
+
+def log_event(event, level=logging.INFO, **fields):
+    # স্যাম্পলিং রেকর্ড তৈরির আগেই - বাদ পড়া ইভেন্টের খরচ একটা random() মাত্র
+    rate = LOG_SAMPLE.get(event, 1.0)
+    if rate < 1.0:
+        if random.random() >= rate:
+            return
+        fields['sample_rate'] = rate
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={'fields': {'event': event, **fields}})
+
+
 logger = logging.getLogger(__name__)
+setup_logging()
+# httpx প্রতিটি API কলে INFO লগ করে, URL এ বট টোকেনসহ
+logging.getLogger('httpx').setLevel(logging.WARNING)
+# প্রসেস বন্ধের আগে কিউতে থাকা লগ লিখে ফেলা
+atexit.register(stop_logging)
+
+# বট / সার্ভিং কনফিগ
+BOT_TOKEN = os.environ.get('BOT_TOKEN', "5649845146:AAGuL82r0Ib-vN2YkRl2HzqFBZjQtWcjTps")
+# লোকাল/ফেক Bot API সার্ভারে চালাতে (যেমন বেঞ্চমার্ক), যেমন http://127.0.0.1:8081
+BOT_API_URL = os.environ.get('BOT_API_URL', '')
+# সেট থাকলে লং পোলিং এর বদলে ওয়েবহুক মোড
+WEBHOOK_URL = os.environ.get('WEBHOOK_URL', '')
+WEBHOOK_PATH = os.environ.get('WEBHOOK_PATH', 'webhook')
+WEBHOOK_LISTEN = os.environ.get('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.environ.get('PORT', '8443'))
+WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET', '')
+WEBHOOK_MAX_CONNECTIONS = int(os.environ.get('WEBHOOK_MAX_CONNECTIONS', '40'))
+# ইনগ্রেস কিউ ভরে গেলে ওয়েবহুক রেসপন্স দেরি করে - টেলিগ্রাম নিজেই ধীর হয় (ব্যাকপ্রেশার)
+UPDATE_QUEUE_SIZE = int(os.environ.get('UPDATE_QUEUE_SIZE', '1000'))
+# একসাথে কয়টা আপডেট হ্যান্ডেল হবে (একই ইউজারের আপডেট তবুও ক্রমানুসারে)
+CONCURRENT_UPDATES = int(os.environ.get('CONCURRENT_UPDATES', '64'))
+
+# আউটবাউন্ড ফ্লাড কন্ট্রোল: টেলিগ্রাম মোট ~৩০ মেসেজ/সেকেন্ড, এক চ্যাটে ~১/সেকেন্ড, গ্রুপে ~২০/মিনিট
+OUTBOUND_GLOBAL_RATE = float(os.environ.get('OUTBOUND_GLOBAL_RATE', '30'))
+OUTBOUND_CHAT_RATE = float(os.environ.get('OUTBOUND_CHAT_RATE', '1'))
+OUTBOUND_CHAT_BURST = int(os.environ.get('OUTBOUND_CHAT_BURST', '3'))
+OUTBOUND_GROUP_RATE = float(os.environ.get('OUTBOUND_GROUP_RATE', '0.33'))
+OUTBOUND_MAX_RETRIES = int(os.environ.get('OUTBOUND_MAX_RETRIES', '3'))
+OUTBOUND_CHAT_BUCKETS = 10000
+# রিকোয়েস্টকারীদের নোটিফিকেশন একসাথে কতজনকে কিউতে দেওয়া হবে
+NOTIFY_BATCH_SIZE = int(os.environ.get('NOTIFY_BATCH_SIZE', '100'))
+# user_data কত সেকেন্ড পরপর ডাটাবেসে যাবে (শাটডাউনে সবসময়)
+PERSISTENCE_INTERVAL = float(os.environ.get('PERSISTENCE_INTERVAL', '5'))
+# rate_limit_args: ছোট সংখ্যা আগে যায়; ইউজারের ট্যাপের রিপ্লাই ডিফল্ট, নোটিফিকেশন/ব্রডকাস্ট BACKGROUND
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+PRIORITY_LABELS = defaultdict(lambda: (('priority', 'other'),), {
+    PRIORITY_INTERACTIVE: (('priority', 'interactive'),),
+    PRIORITY_BACKGROUND: (('priority', 'background'),),
+})
+
+# /metrics (Prometheus টেক্সট ফরম্যাট); METRICS_PORT=0 হলে বন্ধ
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '9100'))
+
+# ডাটাবেস কনফিগ
+DB_PATH = os.environ.get('MOVIE_DB_PATH', 'movies.db')
+DB_READERS = int(os.environ.get('DB_READERS', '4'))
+READER_THREAD_PREFIX = 'db-reader'
+ROLE_CACHE_SIZE = int(os.environ.get('ROLE_CACHE_SIZE', '10000'))
+VIEW_CACHE_SIZE = int(os.environ.get('VIEW_CACHE_SIZE', '512'))
+SEARCH_TOKEN_CACHE_SIZE = int(os.environ.get('SEARCH_TOKEN_CACHE_SIZE', '5000'))
+# সার্চ রেজাল্ট ক্যাশ: এন্ট্রি সংখ্যা নয়, আনুমানিক মেমোরি দিয়ে সীমা
+SEARCH_CACHE_BYTES = int(float(os.environ.get('SEARCH_CACHE_MB', '16')) * 1024 * 1024)
+
+# গ্রুপ কমিট: আগের কমিট চলাকালীন যত রাইট জমে (সর্বোচ্চ N টি) সব পরের কমিটে।
+# DELAY_MS > 0 হলে প্রতি ব্যাচ আরও রাইটের জন্য অপেক্ষা করে - কম লোডে প্রতি রাইটে সেটুকু লেটেন্সি
+WRITE_BATCH_SIZE = int(os.environ.get('WRITE_BATCH_SIZE', '100'))
+WRITE_BATCH_DELAY = float(os.environ.get('WRITE_BATCH_DELAY_MS', '0')) / 1000
+# sync: প্রতি রাইটে কমিট | batch: ব্যাচ কমিট হওয়া পর্যন্ত অপেক্ষা | async: অপেক্ষা নেই (ক্র্যাশে শেষ ব্যাচ হারাতে পারে)
+WRITE_DURABILITY = os.environ.get('WRITE_DURABILITY', 'batch')
+# ফাজি ইনডেক্স স্টার্টআপের পর writer থ্রেডে এই কয়টা করে মুভি নিয়ে তৈরি হয়
+FUZZY_BUILD_CHUNK = 5000
+# স্টার্টআপের পর রোল ক্যাশে আগেই তুলে রাখা সাম্প্রতিক ইউজার
+ROLE_WARM_USERS = min(ROLE_CACHE_SIZE, int(os.environ.get('ROLE_WARM_USERS', '2000')))
+# ইনলাইন মোড (@bot টাইটেল): প্রতি কিস্ট্রোকে কুয়েরি আসে
+INLINE_PAGE_SIZE = 20             # টেলিগ্রাম সর্বোচ্চ ৫০
+INLINE_MAX_RESULTS = 100          # একবারে আনা র‍্যাঙ্কড লিস্ট, পেজগুলো এখান থেকেই
+INLINE_MIN_QUERY = 2              # এর ছোট হলে নতুন মুভি ("t"* প্রায় পুরো ক্যাটালগ র‍্যাঙ্ক করে)
+INLINE_CACHE_SIZE = int(os.environ.get('INLINE_CACHE_SIZE', '2000'))
+INLINE_CACHE_TTL = float(os.environ.get('INLINE_CACHE_TTL', '60'))
+INLINE_CACHE_TIME = int(os.environ.get('INLINE_CACHE_TIME', '300'))   # টেলিগ্রাম সার্ভারের ক্যাশ
+INLINE_CONCURRENCY = int(os.environ.get('INLINE_CONCURRENCY', '8'))
+SEARCH_LIMIT = 5
+LATEST_PAGE_SIZE = 10
+TOP_REQUESTS_PAGE_SIZE = 10
+DEAD_LINKS_PAGE_SIZE = 15
+# ডাউনলোড লিংক হেলথ চেক (ব্যাকগ্রাউন্ডে HEAD/GET); LINK_CHECK_INTERVAL_HOURS=0 হলে বন্ধ
+LINK_CHECK_INTERVAL = float(os.environ.get('LINK_CHECK_INTERVAL_HOURS', '24')) * 3600
+# এর চেয়ে পুরনো চেক আবার হয় - ইন্টারভালের চেয়ে একটু কম, যাতে প্রতি সুইপে আগের সুইপের লিংকও পড়ে
+LINK_RECHECK_HOURS = float(os.environ.get('LINK_RECHECK_HOURS', '20'))
+LINK_CHECK_CONCURRENCY = int(os.environ.get('LINK_CHECK_CONCURRENCY', '64'))
+LINK_CHECK_PER_HOST = int(os.environ.get('LINK_CHECK_PER_HOST', '8'))
+LINK_CHECK_TIMEOUT = float(os.environ.get('LINK_CHECK_TIMEOUT', '10'))
+LINK_CHECK_CHUNK = 1000
+
+def text_tokens(text):
+    return re.findall(r'[\w\u0980-\u09ff]+', text.lower())
+
+def fts_query(text):
+    # ইউজারের লেখা থেকে FTS5 প্রিফিক্স কুয়েরি: "kgf cha" -> "kgf"* "cha"*
+    return ' '.join(f'"{token}"*' for token in text_tokens(text))
+
+# ==================== ক্যাশ ====================
+class LRUCache:
+    """থ্রেড-সেফ bounded LRU ক্যাশ, hit/miss কাউন্টার সহ"""
+    
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # invalidate হলে বাড়ে; পুরনো রিডের ফল যেন পরে ক্যাশে না ঢোকে
+        self.generation = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._data)
+    
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+    
+    def put(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def invalidate(self, key):
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+    
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+def approx_bytes(value):
+    # sys.getsizeof ভেতরের জিনিস গোনে না; রো-এর টাপল/লিস্টের ভেতর পর্যন্ত হিসাব
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(approx_bytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class VersionedCache:
+    """ক্যাটালগ ভার্সন ট্যাগসহ থ্রেড-সেফ LRU ক্যাশ; ভার্সন বদলালে এন্ট্রি অবৈধ, সীমা আনুমানিক বাইটে"""
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # ক্যাটালগ বদলানোয় বাদ পড়া এন্ট্রি
+        self.stale = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._data)
+    
+    def get(self, key, version):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[0] == version:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self.bytes -= self._data.pop(key)[2]
+                self.stale += 1
+            self.misses += 1
+            return None
+    
+    def put(self, key, value, version):
+        size = approx_bytes(key) + approx_bytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._data[key] = (version, value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self.bytes -= self._data.popitem(last=False)[1][2]
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+    
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+class TTLCache(LRUCache):
+    """LRUCache, তবে প্রতিটি এন্ট্রি ttl সেকেন্ড পর মেয়াদোত্তীর্ণ"""
+    
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self.clock = clock
+    
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > self.clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+    
+    def put(self, key, value, generation=None):
+        super().put(key, (self.clock() + self.ttl, value), generation)
+
+# ==================== মেট্রিক্স ====================
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# নাম -> (টাইপ, বিবরণ)
+METRIC_FAMILIES = {
+    'moviebot_handler_seconds': ('histogram', 'Update handler latency'),
+    'moviebot_handler_errors_total': ('counter', 'Update handlers that raised'),
+    'moviebot_callback_seconds': ('histogram', 'Callback route latency'),
+    'moviebot_updates_in_flight': ('gauge', 'Updates currently being handled'),
+    'moviebot_updates_waiting_for_user': ('gauge', 'Updates queued behind an earlier update from the same user'),
+    'moviebot_inline_superseded_total': ('counter', 'Inline queries dropped because a newer keystroke arrived'),
+    'moviebot_db_query_seconds': ('histogram', 'Database method time on the database thread'),
+    'moviebot_db_errors_total': ('counter', 'Database methods that raised'),
+    'moviebot_db_call_seconds': ('histogram', 'Database call time seen by the event loop, including pool wait'),
+    'moviebot_telegram_api_seconds': ('histogram', 'Bot API request latency'),
+    'moviebot_telegram_api_errors_total': ('counter', 'Bot API requests that raised'),
+    'moviebot_outbound_wait_seconds': ('histogram', 'Time a Bot API request waited for flood-control tokens'),
+    'moviebot_outbound_queue_depth': ('gauge', 'Bot API requests waiting in the outbound scheduler'),
+    'moviebot_outbound_retries_total': ('counter', 'Bot API requests retried after RetryAfter'),
+    'moviebot_write_queue_depth': ('gauge', 'Rows waiting in the write-behind queue'),
+    'moviebot_cache_hits_total': ('counter', 'Cache hits'),
+    'moviebot_cache_misses_total': ('counter', 'Cache misses'),
+    'moviebot_cache_entries': ('gauge', 'Entries held in a cache'),
+    'moviebot_cache_bytes': ('gauge', 'Approximate memory held by a size-capped cache'),
+    'moviebot_startup_seconds': ('gauge', 'Seconds from module import to the end of each startup phase'),
+    'moviebot_link_checks_total': ('counter', 'Download links probed by the health checker'),
+    'moviebot_link_probe_seconds': ('histogram', 'Download link probe latency, including redirects'),
+}
+
+
+class Metrics:
+    """থ্রেড-সেফ কাউন্টার/হিস্টোগ্রাম; লেবেল = ((কী, মান), ...) টাপল। রেন্ডার শুধু স্ক্রেপের সময়"""
+    
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._values = defaultdict(float)
+        # (নাম, লেবেল) -> [প্রতি বাকেটের কাউন্ট (+Inf সহ), যোগফল]
+        self._histograms = {}
+        # স্ক্রেপের সময় হিসাব হয়: নাম -> fn() -> {লেবেল: মান}
+        self._collectors = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, name, labels=(), value=1):
+        with self._lock:
+            self._values[(name, labels)] += value
+    
+    def observe(self, name, labels, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+    
+    def collect(self, name, fn):
+        self._collectors[name] = fn
+    
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = [*labels, *extra]
+        if not pairs:
+            return ''
+        escape = lambda value: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in pairs) + '}'
+    
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+            histograms = {key: ([*counts], total) for key, (counts, total) in self._histograms.items()}
+        for name, fn in self._collectors.items():
+            for labels, value in fn().items():
+                values[(name, labels)] = value
+        
+        by_name = defaultdict(list)
+        for (name, labels), value in values.items():
+            by_name[name].append((labels, value))
+        for (name, labels), histogram in histograms.items():
+            by_name[name].append((labels, histogram))
+        
+        lines = []
+        for name in sorted(by_name):
+            kind, text = METRIC_FAMILIES.get(name, ('untyped', name))
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+                if kind != 'histogram':
+                    lines.append(f'{name}{self._labels(labels)} {value:g}')
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip((*self.buckets, '+Inf'), counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{self._labels(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{name}_sum{self._labels(labels)} {total:.6f}')
+                lines.append(f'{name}_count{self._labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+def instrument_methods(prefix):
+    """ক্লাস ডেকোরেটর: প্রতিটি পাবলিক মেথডের সময় ও এরর (যে থ্রেডেই চলুক)"""
+    def decorate(cls):
+        for name, fn in list(vars(cls).items()):
+            if name.startswith('_') or not inspect.isfunction(fn):
+                continue
+            setattr(cls, name, _timed_method(prefix, name, fn))
+        return cls
+    return decorate
+
+def _timed_method(prefix, name, fn):
+    labels = (('method', name),)
+    
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            metrics.inc(f'{prefix}_errors_total', labels)
+            raise
+        finally:
+            metrics.observe(f'{prefix}_query_seconds', labels, time.perf_counter() - started)
+    return wrapper
+
+def instrument_handler(name, callback):
+    labels = (('handler', name),)
+    
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        metrics.inc('moviebot_updates_in_flight', (), 1)
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except Exception:
+            metrics.inc('moviebot_handler_errors_total', labels)
+            raise
+        finally:
+            metrics.observe('moviebot_handler_seconds', labels, time.perf_counter() - started)
+            metrics.inc('moviebot_updates_in_flight', (), -1)
+    return wrapper
+
+
+class MetricsServer:
+    """শুধু GET /metrics - ছোট asyncio HTTP সার্ভার, বট যে লুপে চলে সেখানেই"""
+    
+    def __init__(self, host=METRICS_HOST, port=METRICS_PORT):
+        self.host = host
+        self.port = port
+        self._server = None
+    
+    async def start(self):
+        try:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError as e:
+            # পোর্ট ব্যস্ত (আরেকটা ইনস্ট্যান্স বা এক্সপোর্টার) - মেট্রিক্সের জন্য বট বন্ধ হবে না
+            logger.warning("Metrics endpoint disabled, cannot bind %s:%s: %s", self.host, self.port, e)
+            return False
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Serving metrics on http://%s:%s/metrics", self.host, self.port)
+        return True
+    
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+    
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5)
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b'\r\n', b'\n', b''):
+                pass
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+            if method == 'GET' and path.split('?', 1)[0] == '/metrics':
+                status, body = '200 OK', metrics.render().encode()
+            else:
+                status, body = '404 Not Found', b'not found\n'
+            writer.write(
+                f'HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+                f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ValueError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+# ==================== ফাজি সার্চ ====================
+FUZZY_THRESHOLD = 0.5
+
+BANGLA_VOWELS = {
+    'অ': 'a', 'আ': 'a', 'ই': 'i', 'ঈ': 'i', 'উ': 'u', 'ঊ': 'u', 'ঋ': 'ri',
+    'এ': 'e', 'ঐ': 'oi', 'ও': 'o', 'ঔ': 'ou',
+}
+BANGLA_SIGNS = {
+    'া': 'a', 'ি': 'i', 'ী': 'i', 'ু': 'u', 'ূ': 'u', 'ৃ': 'ri',
+    'ে': 'e', 'ৈ': 'oi', 'ো': 'o', 'ৌ': 'ou', '্': '',
+}
+BANGLA_CONSONANTS = {
+    'ক': 'k', 'খ': 'kh', 'গ': 'g', 'ঘ': 'gh', 'ঙ': 'ng', 'চ': 'ch', 'ছ': 'chh', 'জ': 'j',
+    'ঝ': 'jh', 'ঞ': 'n', 'ট': 't', 'ঠ': 'th', 'ড': 'd', 'ঢ': 'dh', 'ণ': 'n', 'ত': 't',
+    'থ': 'th', 'দ': 'd', 'ধ': 'dh', 'ন': 'n', 'প': 'p', 'ফ': 'ph', 'ব': 'b', 'ভ': 'bh',
+    'ম': 'm', 'য': 'j', 'র': 'r', 'ল': 'l', 'শ': 'sh', 'ষ': 'sh', 'স': 's', 'হ': 'h',
+    'ড়': 'r', 'ঢ়': 'rh', 'য়': 'y', 'ৎ': 't',
+}
+BANGLA_OTHERS = {'ং': 'ng', 'ঃ': 'h', 'ঁ': '', '০': '0', '১': '1', '২': '2', '৩': '3', '৪': '4',
+                 '৫': '5', '৬': '6', '৭': '7', '৮': '8', '৯': '9'}
+
+# উচ্চারণ এক করা: "pathaan"/"পাঠান" -> "patan", "avatar"/"অবতার" -> "abatar"
+PHONETIC_FOLDS = [
+    ('chh', 'c'), ('ch', 'c'), ('sh', 's'), ('th', 't'), ('dh', 'd'), ('kh', 'k'), ('gh', 'g'),
+    ('ph', 'f'), ('bh', 'b'), ('jh', 'j'), ('ck', 'k'), ('ee', 'i'), ('oo', 'u'),
+    ('v', 'b'), ('w', 'b'), ('z', 'j'), ('q', 'k'), ('y', 'i'), ('x', 'ks'),
+]
+_FOLD_RE = re.compile('|'.join(re.escape(src) for src, _ in PHONETIC_FOLDS))
+_FOLD_MAP = dict(PHONETIC_FOLDS)
+
+
+_BANGLA_TOKEN_RE = re.compile('|'.join(sorted(
+    (re.escape(unicodedata.normalize('NFC', key))
+     for key in (*BANGLA_VOWELS, *BANGLA_SIGNS, *BANGLA_CONSONANTS, *BANGLA_OTHERS, 'ওয়')),
+    key=len, reverse=True,
+)) + '|.', re.S)
+_BANGLA_CONSONANTS_NFC = {unicodedata.normalize('NFC', k): v for k, v in BANGLA_CONSONANTS.items()}
+_BANGLA_MAP = {unicodedata.normalize('NFC', k): v for k, v in
+               {**BANGLA_VOWELS, **BANGLA_SIGNS, **BANGLA_OTHERS, 'ওয়': 'w'}.items()}
+
+
+def transliterate_bangla(text):
+    # য়/ড়/ঢ় NFC তেও দুই কোডপয়েন্ট, তাই অক্ষর নয় টোকেন ধরে ম্যাপ
+    tokens = _BANGLA_TOKEN_RE.findall(unicodedata.normalize('NFC', text))
+    out = []
+    for i, token in enumerate(tokens):
+        if token in _BANGLA_CONSONANTS_NFC:
+            out.append(_BANGLA_CONSONANTS_NFC[token])
+            # পরের অক্ষর ব্যঞ্জন হলে অন্তর্নিহিত 'অ', শব্দের শেষে উচ্চারিত হয় না
+            if i + 1 < len(tokens) and tokens[i + 1] in _BANGLA_CONSONANTS_NFC:
+                out.append('a')
+        else:
+            out.append(_BANGLA_MAP.get(token, token))
+    return ''.join(out)
+
+
+def normalize_title(text):
+    text = transliterate_bangla(unicodedata.normalize('NFKC', text).lower())
+    text = re.sub(r'(?<=[a-z])(?=\d)|(?<=\d)(?=[a-z])', ' ', text)   # kgf2 -> kgf 2
+    text = re.sub(r'[^a-z0-9]+', ' ', text)
+    text = _FOLD_RE.sub(lambda m: _FOLD_MAP[m.group(0)], text)
+    text = re.sub(r'(.)\1+', r'\1', text)                             # aa -> a, ll -> l
+    return text.strip()
+
+
+# রিকোয়েস্ট মেলানোর সময় এগুলো শব্দ নয় - নইলে "the", "part 2" যেকোনো সিকুয়েলে মিলে যেত
+MATCH_STOPWORDS = frozenset({
+    'the', 'a', 'an', 'of', 'and', 'in', 'on', 'to', 'part', 'chapter', 'season', 'vol', 'volume',
+    'episode', 'movie', 'film', 'full',
+})
+
+_BANGLA_DIGITS = str.maketrans('০১২৩৪৫৬৭৮৯', '0123456789')
+
+def match_words(text):
+    # "kgf2" / "kgf-2" / "KGF ২" -> {"kgf", "2"}
+    text = re.sub(r'(?<=[^\W\d_])(?=\d)|(?<=\d)(?=[^\W\d_])', ' ', (text or '').translate(_BANGLA_DIGITS))
+    return {word for word in text_tokens(text) if word not in MATCH_STOPWORDS}
+
+def request_fulfilled_by(request, title_words, year=''):
+    """রিকোয়েস্টের সব শব্দ টাইটেলে (সাল বাড়তি চলে, কিন্তু গোনা হয় না), অন্তত একটা অসংখ্যা শব্দ,
+    আর টাইটেলের অর্ধেকের বেশি শব্দ রিকোয়েস্টে: "kgf 2" -> "KGF Chapter 2" ✓,
+    "salaar" / "part 2" / "2023" -> "The Salaar Part 2" (2023) ✗"""
+    words = match_words(request) - {year}
+    return (bool(words) and words <= title_words and not all(word.isdigit() for word in words)
+            and 2 * len(words) > len(title_words))
+
+def request_key(text):
+    # "avatar 3", "Avatar-3", "avatar3" -> একই ডিমান্ড কী; বাংলা লেখা ও অঙ্ক ("৩") ট্রান্সলিটারেট।
+    # normalize_title নয়: তার পুনরাবৃত্তি কলাপ্স ("22" -> "2") আর ধ্বনি ফোল্ড (v/w -> b)
+    # ফাজি সার্চের জন্য, ডিমান্ড কী-তে "Avatar 22" কে "Avatar 2" বানিয়ে দিত
+    text = transliterate_bangla(unicodedata.normalize('NFKC', text or '').lower())
+    return re.sub(r'[^a-z0-9]+', '', text) or text.strip()
+
+
+def trigrams(text):
+    grams = set()
+    for word in text.split():
+        padded = f' {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class FuzzyIndex:
+    """মুভি টাইটেলের ট্রাইগ্রাম ইনডেক্স - টাইপো ও বাংলা/ইংরেজি বানান সহ সার্চ"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.postings = defaultdict(set)
+        self.grams = {}
+    
+    def __len__(self):
+        return len(self.grams)
+    
+    def add(self, movie_id, title):
+        grams = frozenset(trigrams(normalize_title(title)))
+        with self._lock:
+            self.grams[movie_id] = grams
+            for gram in grams:
+                self.postings[gram].add(movie_id)
+    
+    def remove(self, movie_id):
+        with self._lock:
+            for gram in self.grams.pop(movie_id, ()):
+                ids = self.postings[gram]
+                ids.discard(movie_id)
+                if not ids:
+                    del self.postings[gram]
+    
+    def search(self, text, limit=SEARCH_LIMIT, threshold=FUZZY_THRESHOLD):
+        query = trigrams(normalize_title(text))
+        if not query:
+            return []
+        need = max(1, math.ceil(threshold * len(query)))
+        with self._lock:
+            # প্রিফিক্স ফিল্টার: ন্যূনতম মিল থাকলে বিরলতম (len - need + 1) ট্রাইগ্রামের একটিতে থাকতেই হবে,
+            # বাকি ট্রাইগ্রাম শুধু সেই ক্যান্ডিডেটদের জন্য গোনা হয়
+            ranked = sorted(query, key=lambda gram: len(self.postings.get(gram, ())))
+            split = len(query) - need + 1
+            counts = Counter()
+            for gram in ranked[:split]:
+                counts.update(self.postings.get(gram, ()))
+            for gram in ranked[split:]:
+                counts.update(self.postings.get(gram, set()) & counts.keys())
+            # কুয়েরি কভারেজ প্রধান, Dice দিয়ে ছোট/নিখুঁত টাইটেল আগে
+            scored = [
+                (0.7 * common / len(query) + 0.3 * 2 * common / (len(query) + len(self.grams[movie_id])), movie_id)
+                for movie_id, common in counts.items() if common >= need
+            ]
+        return [movie_id for score, movie_id in heapq.nlargest(limit, scored)]
+
+# ==================== স্কিমা মাইগ্রেশন ====================
+# প্রতিটি কানেকশনে প্রযোজ্য
+DB_PRAGMAS = [
+    f"synchronous = {os.environ.get('DB_SYNCHRONOUS', 'NORMAL')}",   # WAL এ NORMAL নিরাপদ, fsync কম
+    f"cache_size = -{int(os.environ.get('DB_CACHE_KB', '16384'))}",
+    f"mmap_size = {int(os.environ.get('DB_MMAP_BYTES', str(256 * 1024 * 1024)))}",
+    'temp_store = MEMORY',
+    'busy_timeout = 5000',
+]
+
+# (ভার্সন, বিবরণ, SQL) - ক্রমানুসারে একবারই চলে; নতুন মাইগ্রেশন শুধু শেষে যোগ করুন
+MIGRATIONS = [
+    (1, 'secondary indexes', '''
+        CREATE INDEX IF NOT EXISTS idx_requests_user_date ON requests (user_id, request_date);
+        CREATE INDEX IF NOT EXISTS idx_requests_status ON requests (status);
+        CREATE INDEX IF NOT EXISTS idx_movies_title ON movies (title);
+    '''),
+    # M* ক্যাটাগরি টোকেনে রাখা হয়েছে যাতে বাংলা কার-চিহ্নে শব্দ ভেঙে না যায়
+    (2, 'movies_fts full-text index', '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+            title,
+            content='movies',
+            content_rowid='id',
+            tokenize="unicode61 remove_diacritics 2 categories 'L* N* M* Co'"
+        );
+        CREATE TRIGGER IF NOT EXISTS movies_fts_ai AFTER INSERT ON movies BEGIN
+            INSERT INTO movies_fts (rowid, title) VALUES (new.id, new.title);
+        END;
+        CREATE TRIGGER IF NOT EXISTS movies_fts_ad AFTER DELETE ON movies BEGIN
+            INSERT INTO movies_fts (movies_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        END;
+        CREATE TRIGGER IF NOT EXISTS movies_fts_au AFTER UPDATE OF title ON movies BEGIN
+            INSERT INTO movies_fts (movies_fts, rowid, title) VALUES ('delete', old.id, old.title);
+            INSERT INTO movies_fts (rowid, title) VALUES (new.id, new.title);
+        END;
+        INSERT INTO movies_fts (movies_fts) VALUES ('rebuild');
+    '''),
+    # COUNT(*) স্ক্যানের বদলে ট্রিগারে আপডেট হওয়া কাউন্টার ও দৈনিক/এজেন্ট ভিত্তিক এগ্রিগেট
+    (3, 'precomputed statistics', '''
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS stats_daily (
+            day TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (metric, day)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS stats_agent_uploads (
+            uploader_id INTEGER PRIMARY KEY,
+            uploads INTEGER NOT NULL DEFAULT 0
+        );
+        
+        INSERT OR REPLACE INTO stats_counters (name, value) VALUES
+            ('users', (SELECT COUNT(*) FROM users)),
+            ('movies', (SELECT COUNT(*) FROM movies)),
+            ('agents', (SELECT COUNT(*) FROM agents)),
+            ('pending_requests', (SELECT COUNT(*) FROM requests WHERE status = 'pending'));
+        INSERT OR REPLACE INTO stats_daily (day, metric, value)
+            SELECT date(join_date), 'new_users', COUNT(*) FROM users WHERE join_date IS NOT NULL GROUP BY 1;
+        INSERT OR REPLACE INTO stats_daily (day, metric, value)
+            SELECT date(request_date), 'requests', COUNT(*) FROM requests WHERE request_date IS NOT NULL GROUP BY 1;
+        INSERT OR REPLACE INTO stats_daily (day, metric, value)
+            SELECT date(upload_date), 'uploads', COUNT(*) FROM movies WHERE upload_date IS NOT NULL GROUP BY 1;
+        INSERT OR REPLACE INTO stats_agent_uploads (uploader_id, uploads)
+            SELECT uploader_id, COUNT(*) FROM movies WHERE uploader_id IS NOT NULL GROUP BY uploader_id;
+        
+        CREATE TRIGGER IF NOT EXISTS stats_users_ai AFTER INSERT ON users BEGIN
+            UPDATE stats_counters SET value = value + 1 WHERE name = 'users';
+            INSERT INTO stats_daily (day, metric, value) VALUES (date(COALESCE(new.join_date, 'now')), 'new_users', 1)
+                ON CONFLICT (metric, day) DO UPDATE SET value = value + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS stats_users_ad AFTER DELETE ON users BEGIN
+            UPDATE stats_counters SET value = value - 1 WHERE name = 'users';
+        END;
+        CREATE TRIGGER IF NOT EXISTS stats_movies_ai AFTER INSERT ON movies BEGIN
+            UPDATE stats_counters SET value = value + 1 WHERE name = 'movies';
+            INSERT INTO stats_daily (day, metric, value) VALUES (date(COALESCE(new.upload_date, 'now')), 'uploads', 1)
+                ON CONFLICT (metric, day) DO UPDATE SET value = value + 1;
+            INSERT INTO stats_agent_uploads (uploader_id, uploads) VALUES (new.uploader_id, 1)
+                ON CONFLICT (uploader_id) DO UPDATE SET uploads = uploads + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS stats_movies_ad AFTER DELETE ON movies BEGIN
+            UPDATE stats_counters SET value = value - 1 WHERE name = 'movies';
+        END;
+        CREATE TRIGGER IF NOT EXISTS stats_agents_ai AFTER INSERT ON agents BEGIN
+            UPDATE stats_counters SET value = value + 1 WHERE name = 'agents';
+        END;
+        CREATE TRIGGER IF NOT EXISTS stats_agents_ad AFTER DELETE ON agents BEGIN
+            UPDATE stats_counters SET value = value - 1 WHERE name = 'agents';
+        END;
+        CREATE TRIGGER IF NOT EXISTS stats_requests_ai AFTER INSERT ON requests BEGIN
+            UPDATE stats_counters SET value = value + 1 WHERE name = 'pending_requests' AND new.status = 'pending';
+            INSERT INTO stats_daily (day, metric, value) VALUES (date(COALESCE(new.request_date, 'now')), 'requests', 1)
+                ON CONFLICT (metric, day) DO UPDATE SET value = value + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS stats_requests_ad AFTER DELETE ON requests BEGIN
+            UPDATE stats_counters SET value = value - 1 WHERE name = 'pending_requests' AND old.status = 'pending';
+        END;
+        CREATE TRIGGER IF NOT EXISTS stats_requests_au AFTER UPDATE OF status ON requests
+        WHEN (old.status = 'pending') != (new.status = 'pending') BEGIN
+            UPDATE stats_counters
+            SET value = value + (CASE WHEN new.status = 'pending' THEN 1 ELSE -1 END)
+            WHERE name = 'pending_requests';
+        END;
+    '''),
+    # শুধু পেন্ডিং রিকোয়েস্ট ইনডেক্সে থাকে - আপলোডের পর মিল খুঁজতে পুরো টেবিল স্ক্যান লাগে না
+    (4, 'requests_fts pending request index', '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS requests_fts USING fts5(
+            movie_name,
+            content='requests',
+            content_rowid='id',
+            tokenize="unicode61 remove_diacritics 2 categories 'L* N* M* Co'"
+        );
+        CREATE TRIGGER IF NOT EXISTS requests_fts_ai AFTER INSERT ON requests
+        WHEN new.status = 'pending' BEGIN
+            INSERT INTO requests_fts (rowid, movie_name) VALUES (new.id, new.movie_name);
+        END;
+        CREATE TRIGGER IF NOT EXISTS requests_fts_ad AFTER DELETE ON requests
+        WHEN old.status = 'pending' BEGIN
+            INSERT INTO requests_fts (requests_fts, rowid, movie_name) VALUES ('delete', old.id, old.movie_name);
+        END;
+        CREATE TRIGGER IF NOT EXISTS requests_fts_au AFTER UPDATE OF status ON requests
+        WHEN old.status = 'pending' AND new.status != 'pending' BEGIN
+            INSERT INTO requests_fts (requests_fts, rowid, movie_name) VALUES ('delete', old.id, old.movie_name);
+        END;
+        INSERT INTO requests_fts (rowid, movie_name)
+            SELECT id, movie_name FROM requests WHERE status = 'pending';
+    '''),
+    # একই মুভির আলাদা বানানের রিকোয়েস্ট এক ডিমান্ডে: কতবার, কতজন (শুধু পেন্ডিং) - ট্রিগারে আপডেট
+    # request_key() পাইথন ফাংশন, শুধু ব্যাকফিলের জন্য writer কানেকশনে রেজিস্টার করা
+    (5, 'request demand aggregate', '''
+        ALTER TABLE requests ADD COLUMN demand_key TEXT;
+        UPDATE requests SET demand_key = request_key(movie_name);
+        CREATE INDEX IF NOT EXISTS idx_requests_demand ON requests (demand_key, user_id);
+        
+        CREATE TABLE IF NOT EXISTS request_demand (
+            id INTEGER PRIMARY KEY,
+            demand_key TEXT NOT NULL UNIQUE,
+            title TEXT NOT NULL,
+            requesters INTEGER NOT NULL DEFAULT 0,
+            requests INTEGER NOT NULL DEFAULT 0,
+            last_requested TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_demand_rank ON request_demand (requesters DESC, id);
+        CREATE TABLE IF NOT EXISTS request_demand_users (
+            demand_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (demand_id, user_id)
+        ) WITHOUT ROWID;
+        
+        -- MAX() এর সাথে বেয়ার কলাম: সর্বশেষ রিকোয়েস্টের লেখাটাই টাইটেল
+        INSERT INTO request_demand (demand_key, title, requests, last_requested)
+            SELECT demand_key, movie_name, COUNT(*), MAX(request_date)
+            FROM requests WHERE status = 'pending' AND demand_key IS NOT NULL GROUP BY demand_key;
+        INSERT OR IGNORE INTO request_demand_users (demand_id, user_id)
+            SELECT d.id, r.user_id FROM requests r JOIN request_demand d ON d.demand_key = r.demand_key
+            WHERE r.status = 'pending';
+        UPDATE request_demand SET requesters = (
+            SELECT COUNT(*) FROM request_demand_users u WHERE u.demand_id = request_demand.id
+        );
+        
+        CREATE TRIGGER IF NOT EXISTS request_demand_ai AFTER INSERT ON requests
+        WHEN new.status = 'pending' AND new.demand_key IS NOT NULL BEGIN
+            INSERT INTO request_demand (demand_key, title, requests, last_requested)
+                VALUES (new.demand_key, new.movie_name, 1, COALESCE(new.request_date, CURRENT_TIMESTAMP))
+                ON CONFLICT (demand_key) DO UPDATE
+                SET requests = requests + 1, last_requested = excluded.last_requested;
+            UPDATE request_demand SET requesters = requesters + 1
+                WHERE demand_key = new.demand_key AND NOT EXISTS (
+                    SELECT 1 FROM request_demand_users WHERE demand_id = request_demand.id AND user_id = new.user_id);
+            INSERT OR IGNORE INTO request_demand_users (demand_id, user_id)
+                SELECT id, new.user_id FROM request_demand WHERE demand_key = new.demand_key;
+        END;
+        -- পেন্ডিং থেকে বের হলে (completed) বা ডিলিট হলে ডিমান্ড কমে; শূন্য হলে সারি মুছে যায়
+        CREATE TRIGGER IF NOT EXISTS request_demand_au AFTER UPDATE OF status ON requests
+        WHEN old.status = 'pending' AND new.status != 'pending' AND old.demand_key IS NOT NULL BEGIN
+            UPDATE request_demand SET requests = requests - 1,
+                requesters = requesters - NOT EXISTS (
+                    SELECT 1 FROM requests WHERE demand_key = old.demand_key AND user_id = old.user_id
+                    AND status = 'pending')
+                WHERE demand_key = old.demand_key;
+            DELETE FROM request_demand_users
+                WHERE demand_id = (SELECT id FROM request_demand WHERE demand_key = old.demand_key)
+                AND user_id = old.user_id AND NOT EXISTS (
+                    SELECT 1 FROM requests WHERE demand_key = old.demand_key AND user_id = old.user_id
+                    AND status = 'pending');
+            DELETE FROM request_demand WHERE demand_key = old.demand_key AND requests <= 0;
+        END;
+        CREATE TRIGGER IF NOT EXISTS request_demand_ad AFTER DELETE ON requests
+        WHEN old.status = 'pending' AND old.demand_key IS NOT NULL BEGIN
+            UPDATE request_demand SET requests = requests - 1,
+                requesters = requesters - NOT EXISTS (
+                    SELECT 1 FROM requests WHERE demand_key = old.demand_key AND user_id = old.user_id
+                    AND status = 'pending')
+                WHERE demand_key = old.demand_key;
+            DELETE FROM request_demand_users
+                WHERE demand_id = (SELECT id FROM request_demand WHERE demand_key = old.demand_key)
+                AND user_id = old.user_id AND NOT EXISTS (
+                    SELECT 1 FROM requests WHERE demand_key = old.demand_key AND user_id = old.user_id
+                    AND status = 'pending');
+            DELETE FROM request_demand WHERE demand_key = old.demand_key AND requests <= 0;
+        END;
+    '''),
+    # অসমাপ্ত আপলোড উইজার্ড ইত্যাদি (context.user_data) - রিস্টার্টেও থাকে; খালি হলে সারি মুছে যায়
+    (6, 'persisted user_data', '''
+        CREATE TABLE IF NOT EXISTS user_state (
+            user_id INTEGER PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    '''),
+    # টেলিগ্রাম যে থাম্বনেল file_id আর নেয় না (মুছে যাওয়া ফাইল, টোকেন বদল) - আবার চেষ্টা করা হয় না
+    (7, 'dead thumbnail tracking', '''
+        CREATE TABLE IF NOT EXISTS thumbnail_failures (
+            movie_id INTEGER PRIMARY KEY,
+            file_id TEXT NOT NULL,
+            error TEXT,
+            failed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    '''),
+    # লিংক হেলথ চেকারের ফল: ok | dead | error (টাইমআউট, 5xx - পরের সুইপে আবার)
+    (8, 'download link health', '''
+        ALTER TABLE movies ADD COLUMN link_status TEXT;
+        ALTER TABLE movies ADD COLUMN last_checked TIMESTAMP;
+        CREATE INDEX IF NOT EXISTS idx_movies_link_status ON movies (link_status, id);
+    '''),
+    # request_key আর ধ্বনি ফোল্ড/পুনরাবৃত্তি কলাপ্স করে না - পুরনো কী ("avatar 22" == "avatar 2")
+    # নতুন করে, আর ডিমান্ড টেবিল শুরু থেকে (কী বদলে ট্রিগার চলে না)
+    (9, 'exact request demand keys', '''
+        UPDATE requests SET demand_key = request_key(movie_name);
+        DELETE FROM request_demand_users;
+        DELETE FROM request_demand;
+        INSERT INTO request_demand (demand_key, title, requests, last_requested)
+            SELECT demand_key, movie_name, COUNT(*), MAX(request_date)
+            FROM requests WHERE status = 'pending' AND demand_key IS NOT NULL GROUP BY demand_key;
+        INSERT OR IGNORE INTO request_demand_users (demand_id, user_id)
+            SELECT d.id, r.user_id FROM requests r JOIN request_demand d ON d.demand_key = r.demand_key
+            WHERE r.status = 'pending';
+        UPDATE request_demand SET requesters = (
+            SELECT COUNT(*) FROM request_demand_users u WHERE u.demand_id = request_demand.id
+        );
+    '''),
+]
+
+# movies এ কলাম বাড়লেও (link_status ...) ভিউ কোড সবসময় এই ১০ ফিল্ডের টাপল পায় - তাই SELECT * নয়
+MOVIE_FIELDS = ('id', 'title', 'year', 'quality', 'language', 'size', 'download_link', 'thumbnail',
+                'uploader_id', 'upload_date')
+MOVIE_COLUMNS = ', '.join(MOVIE_FIELDS)
+MOVIE_COLUMNS_M = ', '.join(f'm.{field}' for field in MOVIE_FIELDS)
 
 # ==================== ডাটাবেস ক্লাস ====================
+@instrument_methods('moviebot_db')
 class Database:
-    def __init__(self):
-        self.conn = sqlite3.connect('movies.db', check_same_thread=False)
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.create_function('request_key', 1, request_key, deterministic=True)
         self.cursor = self.conn.cursor()
+        # WAL: রিডার ও writer একে অপরকে ব্লক করে না (ডাটাবেস ফাইলে স্থায়ীভাবে থাকে)
+        # রেজাল্ট রো না পড়া স্টেটমেন্ট শেয়ার্ড কার্সরে খোলা থাকলে পরের commit ব্যর্থ হয়, তাই আলাদা কার্সর
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self._tune(self.conn)
+        self._local = threading.local()
+        self.fuzzy = FuzzyIndex()
+        self.role_cache = LRUCache(ROLE_CACHE_SIZE)
+        # add_movie / delete_movie এ বাড়ে; ক্যাটালগ নির্ভর ক্যাশ এই ভার্সন দিয়ে যাচাই হয়
+        self.catalog_version = 0
+        # ফাজি ইনডেক্স স্টার্টআপে নয়, বট চালু হওয়ার পর ব্যাকগ্রাউন্ডে (AsyncDatabase.build_fuzzy_index)
+        self.fuzzy_ready = False
         self.init_db()
+        # movie_id -> অচল file_id; ছোট, তাই পুরোটা মেমোরিতে - প্রতি ট্যাপে কুয়েরি লাগে না
+        self.dead_thumbnails = dict(self.conn.execute('SELECT movie_id, file_id FROM thumbnail_failures'))
+    
+    def _reader(self):
+        # রিডার থ্রেডে নিজস্ব read-only কানেকশন, বাকি থ্রেডে writer কানেকশন
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if threading.current_thread().name.startswith(READER_THREAD_PREFIX):
+                uri = f"file:{quote(os.path.abspath(self.path))}?mode=ro"
+                conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+                self._tune(conn)
+            else:
+                conn = self.conn
+            self._local.conn = conn
+        return conn.cursor()
+    
+    @staticmethod
+    def _tune(conn):
+        for pragma in DB_PRAGMAS:
+            conn.execute(f'PRAGMA {pragma}')
+    
+    def schema_version(self):
+        try:
+            row = self.conn.execute('SELECT version FROM schema_version').fetchone()
+        except sqlite3.OperationalError:
+            return 0
+        return row[0] if row else 0
     
     def init_db(self):
+        # স্কিমা আপ-টু-ডেট হলে CREATE, অ্যাডমিন INSERT ও কমিট কিছুই লাগে না - শুধু এক রিড
+        if self.schema_version() == MIGRATIONS[-1][0]:
+            return
+        
         # Users টেবিল
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -69,16 +1067,89 @@ class Database:
         # অ্যাডমিন অ্যাড (আপনার আইডি)
         self.cursor.execute('INSERT OR IGNORE INTO users (user_id, role) VALUES (?, ?)', (5347353883, 'admin'))
         self.conn.commit()
+        
+        self.migrate()
+    
+    def migrate(self):
+        self.cursor.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+        row = self.cursor.execute('SELECT version FROM schema_version').fetchone()
+        if row is None:
+            self.cursor.execute('INSERT INTO schema_version (version) VALUES (0)')
+            self.conn.commit()
+        current = row[0] if row else 0
+        
+        for version, description, script in MIGRATIONS:
+            if version <= current:
+                continue
+            logger.info("Applying migration %d: %s", version, description)
+            # প্রতিটি মাইগ্রেশন ও ভার্সন আপডেট একই ট্রানজ্যাকশনে
+            try:
+                self.cursor.executescript(
+                    f"BEGIN;\n{script}\nUPDATE schema_version SET version = {version};\nCOMMIT;"
+                )
+            except Exception:
+                self.conn.rollback()
+                raise
+            current = version
+        return current
+    
+    def load_fuzzy_index(self):
+        after = 0
+        while after is not None:
+            after = self.load_fuzzy_chunk(after)
+        self.fuzzy_ready = True
+    
+    def load_fuzzy_chunk(self, after=0, limit=FUZZY_BUILD_CHUNK):
+        # writer থ্রেডে চলে বলে add_movie / delete_movie এর সাথে ক্রমানুসারে - মাঝপথে মোছা মুভি ফিরে আসে না
+        rows = self.conn.execute(
+            'SELECT id, title FROM movies WHERE id > ? ORDER BY id LIMIT ?', (after, limit)
+        ).fetchall()
+        for movie_id, title in rows:
+            self.fuzzy.add(movie_id, title)
+        if not rows:
+            # আংশিক ইনডেক্স থেকে ক্যাশ হওয়া ফাজি ফল আর বৈধ নয়
+            self.catalog_version += 1
+            return None
+        return rows[-1][0]
+    
+    def warm_role_cache(self, limit=ROLE_WARM_USERS):
+        # অ্যাডমিন/এজেন্ট সবাই + সাম্প্রতিক ইউজার; প্রথম ক্লিকেই রিডার থ্রেডে যেতে হয় না
+        generation = self.role_cache.generation
+        rows = self._reader().execute('''
+            SELECT user_id, role FROM users WHERE role != 'user'
+            UNION
+            SELECT * FROM (SELECT user_id, role FROM users ORDER BY join_date DESC LIMIT ?)
+        ''', (limit,)).fetchall()
+        for user_id, role in rows:
+            self.role_cache.put(user_id, role, generation)
+        return len(rows)
+    
+    def load_user_role(self, user_id):
+        # ক্যাশ মিস হলে ডাটাবেস থেকে রোল এনে ক্যাশে রাখা
+        generation = self.role_cache.generation
+        result = self._reader().execute('SELECT role FROM users WHERE user_id = ?', (user_id,)).fetchone()
+        if not result:
+            return None
+        self.role_cache.put(user_id, result[0], generation)
+        return result[0]
     
     def get_user_role(self, user_id):
-        self.cursor.execute('SELECT role FROM users WHERE user_id = ?', (user_id,))
-        result = self.cursor.fetchone()
-        if result:
-            return result[0]
-        
-        # নতুন ইউজার
-        self.cursor.execute('INSERT INTO users (user_id, role) VALUES (?, ?)', (user_id, 'user'))
+        role = self.role_cache.get(user_id)
+        if role is None:
+            role = self.load_user_role(user_id)
+        if role is None:
+            role = self.register_user(user_id)
+        return role
+    
+    def register_user(self, user_id):
+        self._insert_user(user_id)
         self.conn.commit()
+        return self.load_user_role(user_id)
+    
+    def _insert_user(self, user_id):
+        # নতুন ইউজার
+        self.cursor.execute('INSERT OR IGNORE INTO users (user_id, role) VALUES (?, ?)', (user_id, 'user'))
+        self.role_cache.invalidate(user_id)
         return 'user'
     
     def add_movie(self, data):
@@ -88,27 +1159,136 @@ class Database:
         ''', (data['title'], data['year'], data['quality'], data['language'], 
               data['size'], data['download_link'], data.get('thumbnail', ''), data['uploader_id']))
         self.conn.commit()
-        return self.cursor.lastrowid
-    
-    def get_movies(self, limit=10):
-        self.cursor.execute('SELECT * FROM movies ORDER BY id DESC LIMIT ?', (limit,))
-        return self.cursor.fetchall()
-    
-    def search_movies(self, query):
-        self.cursor.execute('SELECT * FROM movies WHERE title LIKE ? ORDER BY id DESC', (f'%{query}%',))
-        return self.cursor.fetchall()
+        movie_id = self.cursor.lastrowid
+        self.fuzzy.add(movie_id, data['title'])
+        self.catalog_version += 1
+        return movie_id
+    
+    def thumbnail_usable(self, movie_id, file_id):
+        # নতুন থাম্বনেল (অন্য file_id) আবার চেষ্টা পায়
+        return bool(file_id) and self.dead_thumbnails.get(movie_id) != file_id
+    
+    def mark_thumbnail_dead(self, movie_id, file_id, error=''):
+        self.cursor.execute(
+            'INSERT OR REPLACE INTO thumbnail_failures (movie_id, file_id, error) VALUES (?, ?, ?)',
+            (movie_id, file_id, error[:200])
+        )
+        self.conn.commit()
+        self.dead_thumbnails[movie_id] = file_id
+        # ক্যাশ হওয়া ডিটেইল ভিউতে থাম্বনেল আছে - নতুন করে তৈরি হোক
+        self.catalog_version += 1
+    
+    def get_movies_page(self, limit=LATEST_PAGE_SIZE, cursor=None, backward=False):
+        # কিসেট পেজিনেশন: পরের পেজ id < cursor, আগের পেজ id > cursor - যত গভীরেই হোক খরচ একই
+        # limit + 1 রো এনে বোঝা যায় ওই দিকে আরও পেজ আছে কিনা
+        if cursor is None:
+            sql, params = f'SELECT {MOVIE_COLUMNS} FROM movies ORDER BY id DESC LIMIT ?', (limit + 1,)
+        elif backward:
+            sql, params = f'SELECT {MOVIE_COLUMNS} FROM movies WHERE id > ? ORDER BY id ASC LIMIT ?', (cursor, limit + 1)
+        else:
+            sql, params = f'SELECT {MOVIE_COLUMNS} FROM movies WHERE id < ? ORDER BY id DESC LIMIT ?', (cursor, limit + 1)
+        rows = self._reader().execute(sql, params).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if backward:
+            rows.reverse()
+        return rows, more
+    
+    def search_movies(self, query, limit=SEARCH_LIMIT):
+        rows, _ = self.search_movies_page(query, limit)
+        return [row[:-1] for row in rows]
+    
+    def search_movies_page(self, query, limit=SEARCH_LIMIT, cursor=None, backward=False):
+        # রো-এর শেষে rank থাকে; cursor = (rank, id) - BM25 ক্রমেই কিসেট পেজিনেশন
+        match = fts_query(query)
+        if not match:
+            return [], False
+        condition, order = '', 'rank, rowid DESC'
+        params = [match]
+        if cursor is not None:
+            rank, movie_id = cursor
+            if backward:
+                condition = 'AND (rank < ? OR (rank = ? AND rowid > ?))'
+                order = 'rank DESC, rowid ASC'
+            else:
+                condition = 'AND (rank > ? OR (rank = ? AND rowid < ?))'
+            params += [rank, rank, movie_id]
+        params.append(limit + 1)
+        # BM25 র‍্যাঙ্ক (একই স্কোরে নতুন মুভি আগে); LIMIT ইনডেক্সের ভেতরেই, তারপর জয়েন
+        rows = self._reader().execute(f'''
+            SELECT {MOVIE_COLUMNS_M}, f.rank FROM (
+                SELECT rowid, rank FROM movies_fts
+                WHERE movies_fts MATCH ? {condition}
+                ORDER BY {order}
+                LIMIT ?
+            ) f
+            JOIN movies m ON m.id = f.rowid
+            ORDER BY f.rank, m.id DESC
+        ''', params).fetchall()
+        more = len(rows) > limit
+        if not more:
+            return rows, False
+        # অতিরিক্ত রো-টি কুয়েরির দিক অনুযায়ী শেষ/প্রথমে থাকে
+        return (rows[1:] if backward else rows[:limit]), True
+    
+    def fuzzy_search_movies(self, query, limit=SEARCH_LIMIT):
+        ids = self.fuzzy.search(query, limit)
+        if not ids:
+            return []
+        placeholders = ','.join('?' * len(ids))
+        rows = self._reader().execute(f'SELECT {MOVIE_COLUMNS} FROM movies WHERE id IN ({placeholders})', ids).fetchall()
+        # "Avatar 3" এ "Avatar" দেখালে সিকুয়েলের রিকোয়েস্ট আর সেভ হয় না - কুয়েরির প্রতিটি সংখ্যা
+        # টাইটেলে (বা সালে) থাকতে হবে; "kgf2" -> "KGF Chapter 2", "avtar" -> "Avatar" ঠিক থাকে
+        numbers = {word for word in match_words(query) if word.isdigit()}
+        rows = [row for row in rows if numbers <= match_words(f'{row[1]} {row[2]}')]
+        # সিমিলারিটি অনুযায়ী সাজানো
+        order = {movie_id: i for i, movie_id in enumerate(ids)}
+        return sorted(rows, key=lambda row: order[row[0]])
     
     def get_movie_by_id(self, movie_id):
-        self.cursor.execute('SELECT * FROM movies WHERE id = ?', (movie_id,))
-        return self.cursor.fetchone()
+        return self._reader().execute(f'SELECT {MOVIE_COLUMNS} FROM movies WHERE id = ?', (movie_id,)).fetchone()
+    
+    def links_to_check(self, after=0, limit=LINK_CHECK_CHUNK, recheck_hours=LINK_RECHECK_HOURS):
+        # কিসেট চাঙ্ক: কখনো চেক হয়নি বা শেষ চেক পুরনো - id ক্রমে, OFFSET ছাড়া
+        return self._reader().execute('''
+            SELECT id, download_link, link_status FROM movies
+            WHERE id > ? AND (last_checked IS NULL OR last_checked < datetime('now', ?))
+            ORDER BY id LIMIT ?
+        ''', (after, f'-{recheck_hours} hours', limit)).fetchall()
+    
+    def record_link_status(self, results):
+        # এক চাঙ্কের সব ফল এক কমিটে; টাইটেল বদলায় না, তাই FTS ট্রিগার চলে না
+        self.cursor.executemany(
+            "UPDATE movies SET link_status = ?, last_checked = datetime('now') WHERE id = ?",
+            [(status, movie_id) for movie_id, status in results]
+        )
+        self.conn.commit()
+        return len(results)
+    
+    def get_dead_links(self, limit=DEAD_LINKS_PAGE_SIZE, cursor=None):
+        # নতুন মুভি আগে; (link_status, id) ইনডেক্সেই কিসেট পেজ
+        condition, params = ('AND id < ?', [cursor]) if cursor is not None else ('', [])
+        rows = self._reader().execute(f'''
+            SELECT id, title, download_link, last_checked FROM movies
+            WHERE link_status = 'dead' {condition}
+            ORDER BY id DESC LIMIT ?
+        ''', (*params, limit + 1)).fetchall()
+        return rows[:limit], len(rows) > limit
+    
+    def get_link_health(self):
+        return dict(self._reader().execute(
+            "SELECT COALESCE(link_status, 'unchecked'), COUNT(*) FROM movies GROUP BY link_status"
+        ).fetchall())
+    
+    def get_admin_ids(self):
+        return [row[0] for row in self._reader().execute("SELECT user_id FROM users WHERE role = 'admin'")]
     
     def get_agents_with_details(self):
-        self.cursor.execute('''
+        return self._reader().execute('''
             SELECT a.agent_id, u.username, a.added_date 
             FROM agents a 
             LEFT JOIN users u ON a.agent_id = u.user_id
-        ''')
-        return self.cursor.fetchall()
+        ''').fetchall()
     
     def add_agent(self, agent_id, admin_id):
         # ইউজার টেবিলে চেক করুন
@@ -123,8 +1303,13 @@ class Database:
             self.cursor.execute('INSERT INTO users (user_id, role) VALUES (?, ?)', (agent_id, 'agent'))
         
         # এজেন্ট টেবিলে অ্যাড করুন
-        self.cursor.execute('INSERT OR REPLACE INTO agents (agent_id, added_by) VALUES (?, ?)', (agent_id, admin_id))
+        # REPLACE ডিলিট ট্রিগার চালায় না, তাই UPSERT (এজেন্ট কাউন্টার ঠিক রাখতে)
+        self.cursor.execute('''
+            INSERT INTO agents (agent_id, added_by) VALUES (?, ?)
+            ON CONFLICT (agent_id) DO UPDATE SET added_by = excluded.added_by, added_date = CURRENT_TIMESTAMP
+        ''', (agent_id, admin_id))
         self.conn.commit()
+        self.role_cache.invalidate(agent_id)
         return True
     
     def remove_agent(self, agent_id):
@@ -133,208 +1318,1146 @@ class Database:
         # এজেন্ট টেবিল থেকে রিমুভ
         self.cursor.execute('DELETE FROM agents WHERE agent_id = ?', (agent_id,))
         self.conn.commit()
+        self.role_cache.invalidate(agent_id)
         return True
     
     def get_stats(self):
-        self.cursor.execute('SELECT COUNT(*) FROM users')
-        users = self.cursor.fetchone()[0]
-        
-        self.cursor.execute('SELECT COUNT(*) FROM movies')
-        movies = self.cursor.fetchone()[0]
-        
-        self.cursor.execute('SELECT COUNT(*) FROM agents')
-        agents = self.cursor.fetchone()[0]
+        # ট্রিগারে আপডেট হওয়া কাউন্টার - টেবিল যত বড়ই হোক O(1)
+        counters = dict(self._reader().execute('SELECT name, value FROM stats_counters').fetchall())
+        return {
+            'users': counters.get('users', 0), 
+            'movies': counters.get('movies', 0), 
+            'agents': counters.get('agents', 0),
+            'pending_requests': counters.get('pending_requests', 0)
+        }
+    
+    def get_detailed_stats(self, days=7):
+        cursor = self._reader()
+        daily = defaultdict(dict)
+        cursor.execute('''
+            SELECT metric, day, value FROM stats_daily
+            WHERE day >= date('now', ?)
+            ORDER BY day DESC
+        ''', (f'-{days - 1} days',))
+        for metric, day, value in cursor.fetchall():
+            daily[metric][day] = value
         
-        self.cursor.execute('SELECT COUNT(*) FROM requests WHERE status = "pending"')
-        pending_requests = self.cursor.fetchone()[0]
+        cursor.execute('''
+            SELECT s.uploader_id, u.username, s.uploads
+            FROM stats_agent_uploads s
+            LEFT JOIN users u ON u.user_id = s.uploader_id
+            ORDER BY s.uploads DESC
+            LIMIT 10
+        ''')
+        uploads = cursor.fetchall()
         
         return {
-            'users': users, 
-            'movies': movies, 
-            'agents': agents,
-            'pending_requests': pending_requests
+            'requests_per_day': daily.get('requests', {}),
+            'new_users_per_day': daily.get('new_users', {}),
+            'uploads_per_day': daily.get('uploads', {}),
+            'uploads_per_agent': uploads,
         }
     
     def add_request(self, user_id, movie_name):
-        self.cursor.execute('INSERT INTO requests (user_id, movie_name) VALUES (?, ?)', (user_id, movie_name))
+        self._insert_request(user_id, movie_name)
         self.conn.commit()
         return True
     
+    def _insert_request(self, user_id, movie_name):
+        # ডিমান্ড টেবিল ট্রিগারে আপডেট হয়; কী শুধু পাইথনে হিসাব করা যায়
+        self.cursor.execute(
+            'INSERT INTO requests (user_id, movie_name, demand_key) VALUES (?, ?, ?)',
+            (user_id, movie_name, request_key(movie_name))
+        )
+        return True
+    
+    def get_top_requests(self, limit=TOP_REQUESTS_PAGE_SIZE, cursor=None, backward=False):
+        # আগে থেকে হিসাব করা ডিমান্ড - GROUP BY নেই; cursor = (requesters, id), ক্রম requesters DESC, id
+        if cursor is None:
+            condition, params, order = '', [], 'requesters DESC, id ASC'
+        else:
+            requesters, demand_id = cursor
+            if backward:
+                condition = 'WHERE requesters > ? OR (requesters = ? AND id < ?)'
+                order = 'requesters ASC, id DESC'
+            else:
+                condition = 'WHERE requesters < ? OR (requesters = ? AND id > ?)'
+                order = 'requesters DESC, id ASC'
+            params = [requesters, requesters, demand_id]
+        rows = self._reader().execute(f'''
+            SELECT id, title, requesters, requests, last_requested FROM request_demand
+            {condition}
+            ORDER BY {order}
+            LIMIT ?
+        ''', params + [limit + 1]).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if backward:
+            rows.reverse()
+        return rows, more
+    
+    def match_pending_requests(self, title, year=''):
+        # টাইটেলের যেকোনো শব্দ আছে এমন পেন্ডিং রিকোয়েস্ট FTS থেকে; তারপর request_fulfilled_by
+        title_words = match_words(title)
+        year = str(year or '').strip()
+        if not title_words:
+            return []
+        match = ' OR '.join(f'"{word}"' for word in title_words)
+        # +r.status: idx_requests_status দিয়ে শুরু করলে প্রতি রো-তে FTS MATCH চলে; FTS থেকেই শুরু
+        rows = self._reader().execute('''
+            SELECT r.id, r.user_id, r.movie_name
+            FROM requests_fts f
+            JOIN requests r ON r.id = f.rowid
+            WHERE requests_fts MATCH ? AND +r.status = 'pending'
+        ''', (match,)).fetchall()
+        matches = {row[0]: row for row in rows if request_fulfilled_by(row[2], title_words, year)}
+        # একই ডিমান্ডের অন্য বানান ("avatar3", "Avatar-3") - FTS এ না এলেও একই নিয়মে যাচাই করে
+        keys = list({request_key(row[2]) for row in matches.values()})
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for row in self._reader().execute(f'''
+                SELECT id, user_id, movie_name FROM requests
+                WHERE demand_key IN ({placeholders}) AND status = 'pending'
+            ''', chunk):
+                if request_fulfilled_by(row[2], title_words, year):
+                    matches.setdefault(row[0], row)
+        return list(matches.values())
+    
+    def complete_requests(self, request_ids):
+        # সব মিল একটাই ট্রানজ্যাকশনে
+        try:
+            self.cursor.executemany(
+                "UPDATE requests SET status = 'completed' WHERE id = ? AND status = 'pending'",
+                [(request_id,) for request_id in request_ids]
+            )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return self.cursor.rowcount
+    
+    def get_user_states(self):
+        return {user_id: json.loads(data) for user_id, data in
+                self._reader().execute('SELECT user_id, data FROM user_state')}
+    
+    def _save_user_state(self, user_id, data):
+        # data = JSON টেক্সট, None হলে ডিলিট
+        if data is None:
+            self.cursor.execute('DELETE FROM user_state WHERE user_id = ?', (user_id,))
+        else:
+            self.cursor.execute('''
+                INSERT INTO user_state (user_id, data) VALUES (?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET data = excluded.data, updated = CURRENT_TIMESTAMP
+            ''', (user_id, data))
+        return True
+    
+    BATCH_OPS = {'user': _insert_user, 'request': _insert_request, 'user_state': _save_user_state}
+    
+    def write_batch(self, ops):
+        # একাধিক ছোট INSERT এক ট্রানজ্যাকশনে - একবারই fsync
+        try:
+            results = [self.BATCH_OPS[op](self, *args) for op, args in ops]
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return results
+    
     def get_user_requests(self, user_id):
-        self.cursor.execute('SELECT * FROM requests WHERE user_id = ? ORDER BY request_date DESC', (user_id,))
-        return self.cursor.fetchall()
+        return self._reader().execute(
+            'SELECT id, user_id, movie_name, request_date, status FROM requests '
+            'WHERE user_id = ? ORDER BY request_date DESC', (user_id,)
+        ).fetchall()
     
     def delete_movie(self, movie_id):
         self.cursor.execute('DELETE FROM movies WHERE id = ?', (movie_id,))
+        self.cursor.execute('DELETE FROM thumbnail_failures WHERE movie_id = ?', (movie_id,))
         self.conn.commit()
+        self.dead_thumbnails.pop(movie_id, None)
+        self.fuzzy.remove(movie_id)
+        self.catalog_version += 1
         return True
 
-db = Database()
+# ==================== অ্যাসিঙ্ক ডাটাবেস লেয়ার ====================
+class WriteBehindQueue:
+    """কম গুরুত্বপূর্ণ INSERT (নতুন ইউজার, রিকোয়েস্ট) জমিয়ে writer এ এক কমিটে লেখা"""
+    
+    def __init__(self, adb, batch_size=WRITE_BATCH_SIZE, delay=WRITE_BATCH_DELAY, durability=WRITE_DURABILITY):
+        if durability not in ('sync', 'batch', 'async'):
+            raise ValueError(f"Unknown WRITE_DURABILITY: {durability}")
+        self.adb = adb
+        self.batch_size = batch_size
+        self.delay = delay
+        self.durability = durability
+        self.batches = 0
+        self.rows = 0
+        self._pending = []
+        self._worker = None
+    
+    def __len__(self):
+        return len(self._pending)
+    
+    async def submit(self, op, *args):
+        if self.durability == 'sync':
+            results = await self.adb.write_batch([(op, args)])
+            return results[0]
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((op, args, future))
+        self._ensure_worker()
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+        self._wakeup.set()
+        
+        if self.durability == 'async':
+            # কেউ অপেক্ষা করছে না - এরর লগে যাবে
+            future.add_done_callback(self._log_failure)
+            return True
+        return await future
+    
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._full = asyncio.Event()
+            self._commit_lock = asyncio.Lock()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+    
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # ডিফল্টে অপেক্ষা নেই - লোডে ব্যাচ তৈরি হয় writer ব্যস্ত থাকার সময়টুকুতেই
+            if self.delay and len(self._pending) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            self._full.clear()
+            await self._commit()
+    
+    async def _commit(self):
+        # flush() ও ওয়ার্কার একসাথে কমিট না করে; flush চলমান ব্যাচ শেষ হওয়া পর্যন্ত অপেক্ষা করে
+        async with self._commit_lock:
+            await self._commit_batch()
+    
+    async def _commit_batch(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            results = await self.adb.write_batch([(op, args) for op, args, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.rows += len(batch)
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+    
+    async def flush(self):
+        if self._worker is None:
+            return
+        await self._commit()
+        while self._pending:
+            await self._commit()
+    
+    @staticmethod
+    def _log_failure(future):
+        if not future.cancelled() and future.exception():
+            logger.error("Write-behind batch failed: %s", future.exception())
 
-# ==================== বট ফাংশন ====================
 
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user_id = update.effective_user.id
-    role = db.get_user_role(user_id)
-    
-    welcome_text = """
-    🎬 *Welcome to Movie Share Bot!* 🍿
+class AsyncDatabase:
+    """ইভেন্ট লুপ ব্লক না করে Database কল: রিড পুলে, রাইট একটি writer থ্রেডে"""
+    
+    READS = {
+        'load_user_role', 'get_movies_page', 'search_movies', 'search_movies_page',
+        'fuzzy_search_movies', 'get_movie_by_id',
+        'get_agents_with_details', 'get_stats', 'get_detailed_stats', 'get_user_requests',
+        'match_pending_requests', 'get_top_requests', 'get_user_states', 'warm_role_cache',
+        'links_to_check', 'get_dead_links', 'get_link_health', 'get_admin_ids',
+    }
+    WRITES = {
+        'write_batch', 'add_movie', 'add_agent', 'remove_agent', 'delete_movie', 'complete_requests',
+        'load_fuzzy_chunk', 'mark_thumbnail_dead', 'record_link_status',
+    }
+    
+    def __init__(self, database, readers=DB_READERS):
+        self.db = database
+        self._read_pool = ThreadPoolExecutor(max_workers=readers, thread_name_prefix=READER_THREAD_PREFIX)
+        # SQLite এ একসাথে একজনই লিখতে পারে, তাই writer একটাই
+        self._write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        self.writes = WriteBehindQueue(self)
+        # নরমালাইজড কুয়েরি -> ফল, ক্যাটালগ ভার্সন মিললে তবেই বৈধ
+        self.search_cache = VersionedCache(SEARCH_CACHE_BYTES)
+    
+    async def _run(self, pool, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+    
+    def __getattr__(self, name):
+        return self._pooled(name)
+    
+    def _pooled(self, name):
+        if name in self.READS:
+            pool = self._read_pool
+        elif name in self.WRITES:
+            pool = self._write_pool
+        else:
+            raise AttributeError(name)
+        method = getattr(self.db, name)
+        labels = (('method', name),)
+        
+        async def call(*args):
+            # থ্রেডের ভেতরের সময় বাদ দিলে যা থাকে = পুলে অপেক্ষা
+            started = time.perf_counter()
+            try:
+                return await self._run(pool, method, *args)
+            finally:
+                metrics.observe('moviebot_db_call_seconds', labels, time.perf_counter() - started)
+        return call
+    
+    async def get_user_role(self, user_id):
+        # রিটার্নিং ইউজার: ক্যাশ থেকেই, থ্রেড হপ বা I/O ছাড়া
+        role = self.db.role_cache.get(user_id)
+        if role is not None:
+            return role
+        generation = self.db.role_cache.generation
+        role = await self.load_user_role(user_id)
+        if role is None:
+            # নতুন ইউজার - রেজিস্ট্রেশন গ্রুপ কমিটে; ততক্ষণ ক্যাশ থেকে 'user'
+            self.db.role_cache.put(user_id, 'user', generation)
+            await self.writes.submit('user', user_id)
+            role = 'user'
+        return role
+    
+    async def search_movies_page(self, query, limit=SEARCH_LIMIT, cursor=None, backward=False):
+        return await self._cached_search('search_movies_page', query, limit, cursor, backward)
+    
+    async def fuzzy_search_movies(self, query, limit=SEARCH_LIMIT):
+        return await self._cached_search('fuzzy_search_movies', query, limit)
+    
+    async def _cached_search(self, name, query, *args):
+        # জনপ্রিয় কুয়েরি ("kgf", "pathaan"): হিট হলে থ্রেড হপ বা SQLite ছাড়াই।
+        # ভার্সন কুয়েরির আগে পড়া হয়, আর add/delete ভার্সন বাড়ায় কমিটের পরে - তাই পুরনো ফল
+        # কখনো নতুন ভার্সনে ঢোকে না
+        key = ' '.join(text_tokens(query))
+        cache_key = (name, key, *args)
+        version = self.db.catalog_version
+        result = self.search_cache.get(cache_key, version)
+        if result is None:
+            # নরমালাইজড কী দিয়েই সার্চ, যাতে ফল শুধু কী-এর উপর নির্ভর করে
+            result = await self._pooled(name)(key, *args)
+            self.search_cache.put(cache_key, result, version)
+        return result
+    
+    async def add_request(self, user_id, movie_name):
+        return await self.writes.submit('request', user_id, movie_name)
+    
+    async def build_fuzzy_index(self):
+        # ছোট ছোট চাংক - মাঝে আসা আপলোড/ডিলিট এক চাংকের বেশি অপেক্ষা করে না
+        after = 0
+        while after is not None:
+            after = await self.load_fuzzy_chunk(after)
+        self.db.fuzzy_ready = True
+    
+    async def flush(self):
+        await self.writes.flush()
+    
+    def close(self):
+        self._read_pool.shutdown(wait=True)
+        self._write_pool.shutdown(wait=True)
 
-    এই বটের মাধ্যমে আপনি:
-    • নতুন মুভি ডাউনলোড করতে পারবেন
-    • মুভি সার্চ করতে পারবেন
-    • মুভি রিকোয়েস্ট করতে পারবেন
+# ==================== আউটবাউন্ড শিডিউলার ====================
+class TokenBucket:
+    """rate টোকেন/সেকেন্ড হারে ভরে, সর্বোচ্চ capacity পর্যন্ত (বার্স্ট)"""
 
-    নিচের বাটনগুলো ব্যবহার করুন:"""
-    
-    keyboard = [
-        [InlineKeyboardButton("🔍 মুভি সার্চ", callback_data="browse_search")],
-        [InlineKeyboardButton("📥 নতুন মুভি", callback_data="browse_latest")],
-        [InlineKeyboardButton("📝 মুভি রিকোয়েস্ট", callback_data="browse_request")]
-    ]
-    
-    # অ্যাডমিন/এজেন্ট মেনু
-    if role in ['admin', 'agent']:
-        keyboard.append([InlineKeyboardButton("📤 মুভি আপলোড", callback_data="browse_upload")])
-    
-    # শুধু অ্যাডমিন
-    if role == 'admin':
-        keyboard.append([
-            InlineKeyboardButton("👥 এজেন্ট ম্যানেজ", callback_data="browse_agents"),
-            InlineKeyboardButton("📊 স্ট্যাটস", callback_data="browse_stats")
-        ])
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(welcome_text, reply_markup=reply_markup, parse_mode='Markdown')
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
 
-async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    query = update.callback_query
-    await query.answer()
-    
-    user_id = query.from_user.id
-    role = db.get_user_role(user_id)
-    data = query.data
-    
-    print(f"Button: {data}, User: {user_id}, Role: {role}")
-    
-    # হোম পেজ
-    if data == "home":
-        await start_callback(query, user_id)
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        # পরের টোকেন পেতে কত সেকেন্ড লাগবে (০ = এখনই)
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def full(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class OutboundScheduler(BaseRateLimiter):
+    """Bot API তে সব আউটগোয়িং কল এক জায়গা দিয়ে: গ্লোবাল ও চ্যাট-ভিত্তিক টোকেন বাকেট,
+    ইন্টারঅ্যাক্টিভ রিপ্লাই আগে, ব্রডকাস্ট/নোটিফিকেশন পরে, RetryAfter এ ব্যাকঅফ সহ রিট্রাই"""
+
+    def __init__(self, global_rate=OUTBOUND_GLOBAL_RATE, chat_rate=OUTBOUND_CHAT_RATE,
+                 chat_burst=OUTBOUND_CHAT_BURST, group_rate=OUTBOUND_GROUP_RATE, max_retries=OUTBOUND_MAX_RETRIES):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.granted = 0
+        self.retries = 0
+        self.max_depth = 0
+        self.waits = deque(maxlen=1000)
+        self._depth = 0
+        self._seq = 0
+        self._paused_until = 0.0
+        # গ্লোবালে বার্স্ট নেই: টেলিগ্রাম চলমান ১ সেকেন্ডের উইন্ডোতে গোনে
+        self._global = TokenBucket(global_rate, 1, 0.0)
+        self._buckets = {}
+        # chat_id -> হিপ [(priority, seq, future, queued_at)]
+        self._waiting = {}
+        # যেসব চ্যাটের মাথার রিকোয়েস্ট এখনই যেতে পারে: (priority, seq, chat_id)
+        self._ready = []
+        # যেসব চ্যাট নিজের বাকেটের টোকেনের অপেক্ষায়: (ready_at, chat_id)
+        self._sleeping = []
+        self._state = {}
+        self._dispatcher = None
+
+    async def initialize(self):
+        self._ensure_dispatcher()
+
+    async def shutdown(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for waiting in self._waiting.values():
+            for _, _, future, _ in waiting:
+                future.cancel()
+        self._waiting.clear()
+        self._ready.clear()
+        self._sleeping.clear()
+        self._state.clear()
+        self._depth = 0
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    def _bucket(self, chat_id, now):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            if len(self._buckets) >= OUTBOUND_CHAT_BUCKETS:
+                # ভরা বাকেট আর নতুন বাকেট একই - নিষ্ক্রিয় চ্যাটগুলো ফেলে দিলে কিছু হারায় না
+                self._buckets = {key: b for key, b in self._buckets.items()
+                                 if key in self._waiting or not b.full(now)}
+            # গ্রুপ/চ্যানেলে (নেগেটিভ আইডি বা @username) টেলিগ্রামের লিমিট মিনিটে ~২০
+            if isinstance(chat_id, int) and chat_id > 0:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst, now)
+            else:
+                bucket = TokenBucket(self.group_rate, self.chat_burst, now)
+            self._buckets[chat_id] = bucket
+        return bucket
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get('chat_id')
+        if chat_id is None:
+            # answerCallbackQuery, getMe, setWebhook ইত্যাদি মেসেজ লিমিটে পড়ে না
+            return await self._call(endpoint, callback, args, kwargs)
+        priority = PRIORITY_INTERACTIVE if rate_limit_args is None else rate_limit_args
+
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(chat_id, priority)
+            try:
+                return await self._call(endpoint, callback, args, kwargs)
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                # টেলিগ্রাম যতক্ষণ বলেছে ততক্ষণ সবাই থামবে; বারবার হলে দ্বিগুণ করে
+                self.retries += 1
+                delay = e.retry_after * 2 ** attempt
+                logger.warning("%s to chat %s hit flood limit, pausing outbound for %ss",
+                               endpoint, chat_id, delay)
+                loop = asyncio.get_running_loop()
+                self._paused_until = max(self._paused_until, loop.time() + delay)
+                self._wakeup.set()
+
+    @staticmethod
+    async def _call(endpoint, callback, args, kwargs):
+        labels = (('endpoint', endpoint),)
+        started = time.perf_counter()
+        try:
+            return await callback(*args, **kwargs)
+        except Exception as e:
+            metrics.inc('moviebot_telegram_api_errors_total', (*labels, ('error', type(e).__name__)))
+            raise
+        finally:
+            metrics.observe('moviebot_telegram_api_seconds', labels, time.perf_counter() - started)
+
+    async def _acquire(self, chat_id, priority):
+        self._ensure_dispatcher()
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        bucket = self._bucket(chat_id, now)
+
+        # কেউ লাইনে না থাকলে সরাসরি - ডিসপ্যাচার টাস্কে হপ ছাড়া
+        if (not self._depth and self._paused_until <= now
+                and not self._global.delay(now) and not bucket.delay(now)):
+            self._global.take(now)
+            bucket.take(now)
+            self.granted += 1
+            self.waits.append(0.0)
+            metrics.observe('moviebot_outbound_wait_seconds', PRIORITY_LABELS[priority], 0.0)
+            return
+
+        future = loop.create_future()
+        self._seq += 1
+        entry = (priority, self._seq, future, now)
+        waiting = self._waiting.setdefault(chat_id, [])
+        heapq.heappush(waiting, entry)
+        self._depth += 1
+        self.max_depth = max(self.max_depth, self._depth)
+
+        state = self._state.get(chat_id)
+        if state is None:
+            self._schedule(chat_id, now)
+        elif state == 'ready' and waiting[0] is entry:
+            # আগের মাথার চেয়ে জরুরি - নতুন এন্ট্রি, পুরনোটা পপের সময় বাদ পড়বে
+            heapq.heappush(self._ready, (priority, self._seq, chat_id))
+        self._wakeup.set()
+        # কলার বাতিল হলে future ও বাতিল হয়; ডিসপ্যাচার সেটা টোকেন না খরচ করে ফেলে দেয়
+        await future
+
+    def _schedule(self, chat_id, now):
+        waiting = self._waiting.get(chat_id)
+        while waiting and waiting[0][2].cancelled():
+            heapq.heappop(waiting)
+            self._depth -= 1
+        if not waiting:
+            self._waiting.pop(chat_id, None)
+            self._state.pop(chat_id, None)
+            return
+        delay = self._bucket(chat_id, now).delay(now)
+        if delay:
+            self._state[chat_id] = 'sleeping'
+            heapq.heappush(self._sleeping, (now + delay, chat_id))
+        else:
+            self._state[chat_id] = 'ready'
+            priority, seq = waiting[0][:2]
+            heapq.heappush(self._ready, (priority, seq, chat_id))
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if self._paused_until > now:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            while self._sleeping and self._sleeping[0][0] <= now:
+                _, chat_id = heapq.heappop(self._sleeping)
+                self._schedule(chat_id, now)
+            if not self._ready:
+                timeout = self._sleeping[0][0] - now if self._sleeping else None
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            delay = self._global.delay(now)
+            if delay:
+                await asyncio.sleep(delay)
+                continue
+
+            priority, seq, chat_id = heapq.heappop(self._ready)
+            waiting = self._waiting.get(chat_id)
+            if self._state.get(chat_id) != 'ready' or not waiting or waiting[0][:2] != (priority, seq):
+                continue
+            _, _, future, queued_at = heapq.heappop(waiting)
+            self._depth -= 1
+            if not future.cancelled():
+                self._global.take(now)
+                self._buckets[chat_id].take(now)
+                self.granted += 1
+                self.waits.append(now - queued_at)
+                metrics.observe('moviebot_outbound_wait_seconds', PRIORITY_LABELS[priority], now - queued_at)
+                future.set_result(None)
+            self._schedule(chat_id, now)
+
+    def stats(self):
+        waits = sorted(self.waits)
+
+        def pct(p):
+            return waits[min(len(waits) - 1, int(p * len(waits)))] if waits else 0.0
+        return {
+            'queue_depth': self._depth,
+            'max_depth': self.max_depth,
+            'granted': self.granted,
+            'retries': self.retries,
+            'wait_p50': pct(0.50),
+            'wait_p95': pct(0.95),
+        }
+
+# ==================== আপডেট প্রসেসর ====================
+class UserOrderedProcessor(BaseUpdateProcessor):
+    """আলাদা ইউজারের আপডেট একসাথে, একই ইউজারের আপডেট আসার ক্রমে (আপলোড উইজার্ড ক্রমের উপর নির্ভর করে)"""
+    
+    def __init__(self, max_concurrent_updates=CONCURRENT_UPDATES):
+        super().__init__(max_concurrent_updates)
+        # ইউজার -> তার চলমান আপডেটের পেছনে অপেক্ষমাণ (আপডেট, coroutine)
+        self._pending = {}
+        # নতুন কিস্ট্রোক আসায় উত্তর না দিয়ে বাদ দেওয়া ইনলাইন কুয়েরি
+        self.superseded = 0
+    
+    @staticmethod
+    def ordering_key(update):
+        user = getattr(update, 'effective_user', None)
+        if user is not None:
+            return user.id
+        chat = getattr(update, 'effective_chat', None)
+        return chat.id if chat is not None else None
+    
+    def waiting(self):
+        return sum(len(pending) for pending in self._pending.values())
+    
+    async def do_process_update(self, update, coroutine):
+        key = self.ordering_key(update)
+        if key is None:
+            await coroutine
+            return
+        pending = self._pending.get(key)
+        if pending is not None:
+            # লকে অপেক্ষা করলে সেমাফোরের স্লট আটকে থাকত - এক ইউজারের স্প্যাম বাকিদের আটকে দিত।
+            # তাই চলমান আপডেটটাই শেষে এটা চালাবে, এই স্লট ছেড়ে দেওয়া হয়
+            if getattr(update, 'inline_query', None) is not None:
+                self._drop_stale_inline(pending)
+            pending.append((update, coroutine))
+            return
+        pending = self._pending[key] = deque()
+        try:
+            await coroutine
+            while pending:
+                await pending.popleft()[1]
+        finally:
+            del self._pending[key]
+            # বাতিল হলে বাকিগুলো আর চলবে না; 'never awaited' ওয়ার্নিং এড়াতে বন্ধ করা
+            for _, leftover in pending:
+                leftover.close()
+    
+    def _drop_stale_inline(self, pending):
+        # প্রতি কিস্ট্রোকে নতুন ইনলাইন কুয়েরি আসে; অপেক্ষমাণ পুরনোটার উত্তর টেলিগ্রাম আর দেখায় না
+        for item in [item for item in pending if getattr(item[0], 'inline_query', None) is not None]:
+            pending.remove(item)
+            item[1].close()
+            self.superseded += 1
+    
+    async def initialize(self):
+        pass
+    
+    async def shutdown(self):
+        pass
+
+
+# ==================== স্টেট পারসিস্টেন্স ====================
+class SQLitePersistence(BasePersistence):
+    """শুধু user_data (আপলোড উইজার্ডের ধাপ) SQLite এ JSON হিসেবে; আগের বার যা লেখা হয়েছে তার
+    সাথে না মিললে তবেই রাইট-বিহাইন্ড কিউতে - প্রতি আপডেটে পুরো ডাটা আবার লেখা হয় না"""
+    
+    def __init__(self, adb, update_interval=PERSISTENCE_INTERVAL):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.adb = adb
+        self.writes = 0
+        # user_id -> শেষ লেখা JSON; না থাকলে মানে ডাটাবেসে কিছু নেই ({})
+        self._stored = {}
     
-    # ব্রাউজ মেনু
-    elif data == "browse_search":
-        await search_movie_prompt(query)
+    @staticmethod
+    def _encode(data):
+        return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
     
-    elif data == "browse_latest":
-        await show_latest(query)
+    async def get_user_data(self):
+        states = await self.adb.get_user_states()
+        self._stored = {user_id: self._encode(data) for user_id, data in states.items()}
+        return states
     
-    elif data == "browse_request":
-        await request_movie_prompt(query)
+    async def update_user_data(self, user_id, data):
+        try:
+            encoded = self._encode(data) if data else None
+        except TypeError as e:
+            logger.warning("user_data of %s is not JSON serializable, not persisted: %s", user_id, e)
+            return
+        if encoded == self._stored.get(user_id):
+            return
+        if encoded is None:
+            self._stored.pop(user_id, None)
+        else:
+            self._stored[user_id] = encoded
+        self.writes += 1
+        await self.adb.writes.submit('user_state', user_id, encoded)
     
-    elif data == "browse_upload" and role in ['admin', 'agent']:
-        context.user_data.clear()
-        context.user_data['upload_mode'] = True
-        context.user_data['upload_step'] = 'title'
-        context.user_data['movie_data'] = {}
-        await upload_step_title(query)
+    async def drop_user_data(self, user_id):
+        if self._stored.pop(user_id, None) is not None:
+            self.writes += 1
+            await self.adb.writes.submit('user_state', user_id, None)
     
-    elif data == "browse_agents" and role == 'admin':
-        await manage_agents_menu(query)
+    async def refresh_user_data(self, user_id, user_data):
+        pass
     
-    elif data == "browse_stats" and role == 'admin':
-        await show_stats(query)
+    async def flush(self):
+        await self.adb.flush()
     
-    # আপলোড রিলেটেড
-    elif data == "confirm_upload":
-        await confirm_upload(query, context)
+    # বাকি ডাটা টাইপ রাখা হয় না
+    async def get_chat_data(self):
+        return {}
     
-    elif data == "cancel_upload":
-        context.user_data.clear()
-        await query.edit_message_text("❌ আপলোড বাতিল হয়েছে!", parse_mode='Markdown')
-        await start_callback(query, user_id)
+    async def get_bot_data(self):
+        return {}
     
-    elif data == "skip_thumbnail":
-        context.user_data['skip_thumbnail'] = True
-        context.user_data['upload_step'] = 'summary'
-        await upload_show_summary(query, context)
+    async def get_callback_data(self):
+        return None
     
-    elif data == "add_thumbnail":
-        context.user_data['upload_step'] = 'thumbnail'
-        await query.edit_message_text(
-            "🖼️ *এখন থাম্বনেল ছবি পাঠান:*\n\n"
-            "একটি ছবি (JPEG/PNG) পাঠান অথবা /cancel লিখে বাতিল করুন।",
-            parse_mode='Markdown'
-        )
+    async def get_conversations(self, name):
+        return {}
     
-    elif data == "show_summary_after_photo":
-        await upload_show_summary(query, context)
+    async def update_conversation(self, name, key, new_state):
+        pass
     
-    # মুভি ডিটেলস
-    elif data.startswith("movie_"):
-        movie_id = int(data.split("_")[1])
-        await show_movie_details(query, movie_id, context.bot)
+    async def update_chat_data(self, chat_id, data):
+        pass
     
-    # এজেন্ট ম্যানেজমেন্ট
-    elif data == "agent_add_prompt":
-        await add_agent_prompt(query)
+    async def update_bot_data(self, data):
+        pass
     
-    elif data == "agent_remove_menu":
-        await remove_agent_menu(query)
+    async def update_callback_data(self, data):
+        pass
     
-    elif data == "agent_list":
-        await show_agent_list(query)
+    async def drop_chat_data(self, chat_id):
+        pass
     
-    elif data.startswith("confirm_delete_agent_"):
-        agent_id = int(data.split("_")[3])
-        await confirm_delete_agent(query, agent_id)
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
     
-    elif data.startswith("delete_agent_now_"):
-        agent_id = int(data.split("_")[3])
-        db.remove_agent(agent_id)
-        await query.edit_message_text(f"✅ এজেন্ট `{agent_id}` সফলভাবে রিমুভ করা হয়েছে!", parse_mode='Markdown')
-        await manage_agents_menu(query)
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+db = Database()
+STARTUP_TIMINGS['database'] = time.perf_counter() - STARTUP_STARTED
+adb = AsyncDatabase(db)
+# সব আউটগোয়িং Bot API কল এর মধ্য দিয়ে যায় (build_application এ rate_limiter)
+outbox = OutboundScheduler()
+# build_application এ concurrent_updates - ইউজার প্রতি ক্রম রেখে একসাথে হ্যান্ডলিং
+update_processor = UserOrderedProcessor()
+# on_startup এ চালু হওয়া ব্যাকগ্রাউন্ড ওয়ার্ম-আপ ও লিংক হেলথ চেক লুপ
+warm_up_task = None
+link_check_task = None
+# রেন্ডার করা ভিউ (টেক্সট + কিবোর্ড) - কী: (ভিউ, আর্গুমেন্ট, রোল, ক্যাটালগ ভার্সন)
+view_cache = LRUCache(VIEW_CACHE_SIZE)
+# সার্চ পেজিনেশন: callback_data তে ৬৪ বাইটে কুয়েরি ধরে না, তাই ছোট টোকেন -> কুয়েরি
+search_tokens = LRUCache(SEARCH_TOKEN_CACHE_SIZE)
+# ইনলাইন সার্চ: (ক্যাটালগ ভার্সন, কুয়েরি) -> র‍্যাঙ্কড মুভি লিস্ট, আর প্রতি offset এর তৈরি রেজাল্ট পেজ
+inline_cache = TTLCache(INLINE_CACHE_SIZE, INLINE_CACHE_TTL)
+inline_slots = asyncio.Semaphore(INLINE_CONCURRENCY)
+metrics_server = MetricsServer()
+
+# স্ক্রেপের সময় পড়া গেজ/কাউন্টার
+METERED_CACHES = {
+    'role': db.role_cache, 'view': view_cache, 'search_token': search_tokens, 'inline': inline_cache,
+    'search': adb.search_cache,
+}
+metrics.collect('moviebot_outbound_queue_depth', lambda: {(): outbox.stats()['queue_depth']})
+metrics.collect('moviebot_outbound_retries_total', lambda: {(): outbox.retries})
+metrics.collect('moviebot_write_queue_depth', lambda: {(): len(adb.writes)})
+metrics.collect('moviebot_startup_seconds', lambda: {
+    (('phase', phase),): seconds for phase, seconds in STARTUP_TIMINGS.items()
+})
+metrics.collect('moviebot_updates_waiting_for_user', lambda: {(): update_processor.waiting()})
+metrics.collect('moviebot_inline_superseded_total', lambda: {(): update_processor.superseded})
+for _name, _field in (('moviebot_cache_hits_total', 'hits'), ('moviebot_cache_misses_total', 'misses'),
+                      ('moviebot_cache_entries', 'size'), ('moviebot_cache_bytes', 'bytes')):
+    metrics.collect(_name, lambda field=_field: {
+        (('cache', cache_name),): stats[field]
+        for cache_name, stats in ((name, cache.stats()) for name, cache in METERED_CACHES.items())
+        if field in stats
+    })
+
+# ==================== পেজিনেশন কার্সর ====================
+def encode_id(number):
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    out = ''
+    while True:
+        number, rem = divmod(number, 36)
+        out = digits[rem] + out
+        if not number:
+            return out
+
+def decode_int(text):
+    # int() '1_0', ' 10', '+10', '১০' সবই নেয় - বাটনে শুধু ASCII অঙ্ক থাকে
+    if not re.fullmatch(r'[0-9]+', text):
+        raise ValueError(f"Bad callback int: {text!r}")
+    return int(text)
+
+def decode_id(text):
+    if not re.fullmatch(r'[0-9a-z]+', text):
+        raise ValueError(f"Bad callback id: {text!r}")
+    return int(text, 36)
+
+def encode_rank(rank):
+    # float এর হুবহু ৮ বাইট, ১১ অক্ষরে
+    return base64.urlsafe_b64encode(struct.pack('>d', rank)).rstrip(b'=').decode()
+
+def decode_rank(text):
+    # ভুল দৈর্ঘ্যে struct.error আসত (ValueError নয়), NaN এ কার্সরের তুলনা ভাঙে
+    raw = base64.urlsafe_b64decode(text + '=') if re.fullmatch(r'[A-Za-z0-9_-]{11}', text) else b''
+    rank = struct.unpack('>d', raw)[0] if len(raw) == 8 else math.nan
+    if math.isnan(rank):
+        raise ValueError(f"Bad callback rank: {text!r}")
+    return rank
+
+def search_token(query_text):
+    token = base64.b32encode(hashlib.blake2s(query_text.encode(), digest_size=5).digest()).decode().lower()
+    search_tokens.put(token, query_text)
+    return token
+
+# ==================== ভিউ লেয়ার ====================
+# টেলিগ্রামের সীমা (পার্সের পরের লেখা, UTF-16 ইউনিটে) - র Markdown সবসময় এর চেয়ে লম্বা বা সমান,
+# তাই র লেখা সীমার মধ্যে রাখলে API কখনো "too long" ফেরত দেয় না
+TEXT_LIMIT = 4096
+CAPTION_LIMIT = 1024
+# ইউজারের লেখা ফেরত দেখানোর সময় এর বেশি নয় - বাকি টেমপ্লেট যেন সীমার মধ্যে থাকে
+ECHO_LIMIT = 200
+
+# লিগ্যাসি Markdown: এন্টিটির বাইরে এই চার অক্ষরের আগে '\' দিলে সাধারণ অক্ষর
+_MD_ESCAPES = str.maketrans({char: '\\' + char for char in '_*`['})
+_MD_MARKUP = re.compile(r'\\([_*`\[])|[_*`]')
+
+def md(value):
+    """ইউজার/ডাটাবেসের লেখা টেমপ্লেটে বসানোর আগে এক পাসে এস্কেপ (এন্টিটির বাইরে)"""
+    return str(value).translate(_MD_ESCAPES)
+
+def md_bold(value):
+    # বোল্ডের ভেতরে এস্কেপ চলে না: '*' এলে বোল্ড বন্ধ করে এস্কেপ করা '*' বসিয়ে আবার খোলা
+    return '*' + str(value).replace('*', '*\\**') + '*'
+
+def md_code(value):
+    return '`' + str(value).replace('`', '`\\``') + '`'
+
+def utf16_len(text):
+    return len(text.encode('utf-16-le')) // 2
+
+def _utf16_prefix(text, units):
+    # সারোগেট জোড়ার মাঝখানে কাটা পড়লে অর্ধেকটা বাদ
+    return text.encode('utf-16-le')[:units * 2].decode('utf-16-le', errors='ignore')
+
+def fit(text, limit=TEXT_LIMIT):
+    """সীমার বেশি হলে শেষ পুরো লাইনে কেটে '…' - টেমপ্লেটের এন্টিটি লাইনের ভেতরেই খোলে-বন্ধ হয়"""
+    if len(text) * 2 <= limit or utf16_len(text) <= limit:
+        return text
+    head = _utf16_prefix(text, limit - 2)
+    newline = head.rfind('\n')
+    if newline > 0:
+        return head[:newline].rstrip() + '\n…'
+    # এক লাইনই সীমার চেয়ে লম্বা - অর্ধেক এন্টিটি না রেখে মার্কআপ ছাড়া সাধারণ লেখা
+    plain = _MD_MARKUP.sub(lambda m: m.group(1) or '', head)
+    return md(plain) + '…'
+
+def split_text(text, limit=TEXT_LIMIT):
+    """লম্বা লিস্ট লাইনের সীমানায় কয়েকটি মেসেজে ভাগ"""
+    if len(text) * 2 <= limit or utf16_len(text) <= limit:
+        return [text]
+    chunks, lines, size = [], [], 0
+    for line in text.split('\n'):
+        line = fit(line, limit)
+        length = utf16_len(line) + 1
+        if lines and size + length > limit:
+            chunks.append('\n'.join(lines))
+            lines, size = [], 0
+        lines.append(line)
+        size += length
+    if lines:
+        chunks.append('\n'.join(lines))
+    return chunks
+
+async def edit_view(query, text, reply_markup=None):
+    # এক মেসেজ এডিট - ভাগ করা যায় না, তাই কেটে ছোট
+    if query.message is not None and query.message.photo:
+        # থাম্বনেল কার্ড টেক্সটে এডিট করা যায় না (ব্যর্থ কল) - সরাসরি নতুন মেসেজ
+        await query.message.chat.send_message(fit(text), reply_markup=reply_markup, parse_mode='Markdown')
+        return
+    await query.edit_message_text(fit(text), reply_markup=reply_markup, parse_mode='Markdown')
+
+async def reply_view(message, text, reply_markup=None):
+    # বাটন শেষ ভাগের সাথে
+    *head, last = split_text(text)
+    for chunk in head:
+        await message.reply_text(chunk, parse_mode='Markdown')
+    await message.reply_text(last, reply_markup=reply_markup, parse_mode='Markdown')
+
+WELCOME_TEXT = """
+    🎬 *Welcome to Movie Share Bot!* 🍿
+
+    এই বটের মাধ্যমে আপনি:
+    • নতুন মুভি ডাউনলোড করতে পারবেন
+    • মুভি সার্চ করতে পারবেন
+    • মুভি রিকোয়েস্ট করতে পারবেন
+
+    নিচের বাটনগুলো ব্যবহার করুন:"""
+
+HOME_TEXT = "🏠 *মেইন মেনু* - নিচের বাটনগুলো ব্যবহার করুন:"
+
+# (সারি, কোন রোল দেখবে) - None মানে সবাই
+MAIN_MENU_ROWS = [
+    ((("🔍 মুভি সার্চ", "browse_search"),), None),
+    ((("📥 নতুন মুভি", "browse_latest"),), None),
+    ((("📝 মুভি রিকোয়েস্ট", "browse_request"),), None),
+    ((("📤 মুভি আপলোড", "browse_upload"),), {'admin', 'agent'}),
+    ((("🔥 টপ রিকোয়েস্ট", "top_requests"),), {'admin', 'agent'}),
+    ((("👥 এজেন্ট ম্যানেজ", "browse_agents"), ("📊 স্ট্যাটস", "browse_stats")), {'admin'}),
+]
+
+def build_menu(role):
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(text, callback_data=data) for text, data in row]
+        for row, roles in MAIN_MENU_ROWS if roles is None or role in roles
+    ])
+
+# রোল প্রতি একবার তৈরি; InlineKeyboardMarkup ইমিউটেবল, তাই সব মেসেজে একই অবজেক্ট
+MAIN_MENUS = {role: build_menu(role) for role in ('user', 'agent', 'admin')}
+
+def main_menu(role):
+    return MAIN_MENUS.get(role, MAIN_MENUS['user'])
+
+HOME_BUTTON = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 হোম", callback_data="home")]])
+CANCEL_UPLOAD_BUTTON = InlineKeyboardMarkup([[InlineKeyboardButton("❌ বাতিল", callback_data="cancel_upload")]])
+
+# ==================== বট ফাংশন ====================
+
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    role = await adb.get_user_role(user_id)
+    await update.message.reply_text(WELCOME_TEXT, reply_markup=main_menu(role), parse_mode='Markdown')
+
+# ==================== কলব্যাক রাউটার ====================
+# রুট প্যাটার্নের প্যারামিটার টাইপ -> callback_data থেকে পার্স
+CALLBACK_PARAM_TYPES = {
+    'int': decode_int,
+    'id36': decode_id,
+    'rank': decode_rank,
+    'str': str,
+    'dir': lambda value: {'n': False, 'p': True}[value],   # backward?
+}
+
+# আগের ভার্সনের বাটন ("movie_12") চ্যাটে থেকে যায় - সেগুলো নতুন রুটে ("movie:12")
+LEGACY_CALLBACK_PREFIXES = {'movie', 'confirm_delete_agent', 'delete_agent_now', 'delete_movie'}
+
+
+class CallbackRouter:
+    """callback_data "নাম:আর্গ:আর্গ" - নাম দিয়ে dict লুকআপ, তারপর টাইপ অনুযায়ী আর্গুমেন্ট"""
     
-    elif data == "cancel_delete_agent":
-        await manage_agents_menu(query)
+    def __init__(self):
+        self.routes = {}
+    
+    def route(self, pattern, roles=None):
+        # "lt:{backward:dir}:{cursor:id36}" -> নাম 'lt', প্যারামিটার [(backward, dir), (cursor, id36)]
+        name, *parts = re.split(r':(?![^{]*\})', pattern)
+        params = []
+        for part in parts:
+            match = re.fullmatch(r'\{(\w+):(\w+)\}', part)
+            if not match or match.group(2) not in CALLBACK_PARAM_TYPES:
+                raise ValueError(f"Bad callback route pattern: {pattern}")
+            params.append((match.group(1), CALLBACK_PARAM_TYPES[match.group(2)]))
+        if name in self.routes:
+            raise ValueError(f"Duplicate callback route: {name}")
+        
+        def register(handler):
+            self.routes[name] = (handler, params, frozenset(roles) if roles else None)
+            return handler
+        return register
+    
+    def resolve(self, data, role):
+        """(হ্যান্ডলার, kwargs) অথবা None - অজানা, ভুল আর্গুমেন্ট বা রোলের অনুমতি নেই"""
+        name, *args = data.split(':')
+        if name not in self.routes and not args:
+            legacy, _, arg = name.rpartition('_')
+            if legacy in LEGACY_CALLBACK_PREFIXES:
+                name, args = legacy, [arg]
+        route = self.routes.get(name)
+        if route is None:
+            return None
+        handler, params, roles = route
+        if roles is not None and role not in roles or len(args) != len(params):
+            return None
+        try:
+            kwargs = {key: convert(value) for (key, convert), value in zip(params, args)}
+        except (ValueError, KeyError, TypeError):
+            return None
+        return handler, kwargs
+
+router = CallbackRouter()
+callback = router.route
+
+async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
     
-    # রিকোয়েস্ট
-    elif data == "my_requests":
-        await show_my_requests(query, user_id)
+    user_id = query.from_user.id
+    role = await adb.get_user_role(user_id)
+    data = query.data
     
-    # মুভি ডিলিট
-    elif data.startswith("delete_movie_") and role == 'admin':
-        movie_id = int(data.split("_")[2])
-        db.delete_movie(movie_id)
-        await query.edit_message_text(f"✅ মুভি `{movie_id}` ডিলিট করা হয়েছে!", parse_mode='Markdown')
-        await show_latest(query)
+    log_event('button', user=user_id, role=role, data=data)
     
-    # যদি কোন ক্যালব্যাক ম্যাচ না করে
-    else:
+    resolved = router.resolve(data, role)
+    if resolved is None:
+        # যদি কোন ক্যালব্যাক ম্যাচ না করে
         await query.edit_message_text("❓ দয়া করে মেইন মেনু থেকে পছন্দ করুন", parse_mode='Markdown')
         await start_callback(query, user_id)
+        return
+    handler, kwargs = resolved
+    started = time.perf_counter()
+    try:
+        await handler(query, context, **kwargs)
+    finally:
+        metrics.observe('moviebot_callback_seconds', (('route', handler.__name__),), time.perf_counter() - started)
+
+# হোম পেজ
+@callback('home')
+async def on_home(query, context):
+    await start_callback(query, query.from_user.id)
+
+# ব্রাউজ মেনু
+@callback('browse_search')
+async def on_browse_search(query, context):
+    await search_movie_prompt(query)
+
+@callback('browse_latest')
+async def on_browse_latest(query, context):
+    await show_latest(query)
+
+@callback('browse_request')
+async def on_browse_request(query, context):
+    await request_movie_prompt(query)
+
+@callback('browse_upload', roles=['admin', 'agent'])
+async def on_browse_upload(query, context):
+    context.user_data.clear()
+    context.user_data['upload_mode'] = True
+    context.user_data['upload_step'] = 'title'
+    context.user_data['movie_data'] = {}
+    await upload_step_title(query)
+
+@callback('browse_agents', roles=['admin'])
+async def on_browse_agents(query, context):
+    await manage_agents_menu(query)
+
+@callback('browse_stats', roles=['admin'])
+async def on_browse_stats(query, context):
+    await show_stats(query)
+
+@callback('top_requests', roles=['admin', 'agent'])
+async def on_top_requests(query, context):
+    await show_top_requests(query)
+
+# আপলোড রিলেটেড
+@callback('confirm_upload', roles=['admin', 'agent'])
+async def on_confirm_upload(query, context):
+    await confirm_upload(query, context)
+
+@callback('cancel_upload', roles=['admin', 'agent'])
+async def on_cancel_upload(query, context):
+    context.user_data.clear()
+    await query.edit_message_text("❌ আপলোড বাতিল হয়েছে!", parse_mode='Markdown')
+    await start_callback(query, query.from_user.id)
+
+@callback('skip_thumbnail', roles=['admin', 'agent'])
+async def on_skip_thumbnail(query, context):
+    context.user_data['skip_thumbnail'] = True
+    context.user_data['upload_step'] = 'summary'
+    await upload_show_summary(query, context)
+
+@callback('add_thumbnail', roles=['admin', 'agent'])
+async def on_add_thumbnail(query, context):
+    context.user_data['upload_step'] = 'thumbnail'
+    await query.edit_message_text(
+        "🖼️ *এখন থাম্বনেল ছবি পাঠান:*\n\n"
+        "একটি ছবি (JPEG/PNG) পাঠান অথবা /cancel লিখে বাতিল করুন।",
+        parse_mode='Markdown'
+    )
+
+@callback('show_summary_after_photo', roles=['admin', 'agent'])
+async def on_show_summary_after_photo(query, context):
+    await upload_show_summary(query, context)
+
+# পেজিনেশন (কিসেট কার্সর)
+@callback('lt:{backward:dir}:{cursor:id36}')
+async def on_latest_page(query, context, backward, cursor):
+    await show_latest(query, cursor, backward)
+
+@callback('sr:{backward:dir}:{token:str}:{rank:rank}:{cursor:id36}')
+async def on_search_page(query, context, backward, token, rank, cursor):
+    await show_search_page(query, token, (rank, cursor), backward)
+
+@callback('tr:{backward:dir}:{requesters:id36}:{cursor:id36}', roles=['admin', 'agent'])
+async def on_top_requests_page(query, context, backward, requesters, cursor):
+    await show_top_requests(query, (requesters, cursor), backward)
+
+@callback('dl:{cursor:id36}', roles=['admin'])
+async def on_dead_links_page(query, context, cursor):
+    await edit_view(query, *await build_dead_links_view(cursor))
+
+# মুভি ডিটেলস
+@callback('movie:{movie_id:int}')
+async def on_movie(query, context, movie_id):
+    await show_movie_details(query, movie_id, context.bot)
+
+# এজেন্ট ম্যানেজমেন্ট
+@callback('agent_add_prompt', roles=['admin'])
+async def on_agent_add_prompt(query, context):
+    await add_agent_prompt(query)
+
+@callback('agent_remove_menu', roles=['admin'])
+async def on_agent_remove_menu(query, context):
+    await remove_agent_menu(query)
+
+@callback('agent_list', roles=['admin'])
+async def on_agent_list(query, context):
+    await show_agent_list(query)
+
+@callback('confirm_delete_agent:{agent_id:int}', roles=['admin'])
+async def on_confirm_delete_agent(query, context, agent_id):
+    await confirm_delete_agent(query, agent_id)
+
+@callback('delete_agent_now:{agent_id:int}', roles=['admin'])
+async def on_delete_agent_now(query, context, agent_id):
+    await adb.remove_agent(agent_id)
+    await query.edit_message_text(f"✅ এজেন্ট `{agent_id}` সফলভাবে রিমুভ করা হয়েছে!", parse_mode='Markdown')
+    await manage_agents_menu(query)
+
+@callback('cancel_delete_agent', roles=['admin'])
+async def on_cancel_delete_agent(query, context):
+    await manage_agents_menu(query)
+
+# রিকোয়েস্ট
+@callback('my_requests')
+async def on_my_requests(query, context):
+    await show_my_requests(query, query.from_user.id)
+
+# মুভি ডিলিট
+@callback('delete_movie:{movie_id:int}', roles=['admin'])
+async def on_delete_movie(query, context, movie_id):
+    await adb.delete_movie(movie_id)
+    # নোটিস আর নতুন লিস্ট এক এডিটে
+    await show_latest(query, notice=f"✅ মুভি `{movie_id}` ডিলিট করা হয়েছে!\n\n")
 
 async def start_callback(query, user_id):
-    role = db.get_user_role(user_id)
-    
-    keyboard = [
-        [InlineKeyboardButton("🔍 মুভি সার্চ", callback_data="browse_search")],
-        [InlineKeyboardButton("📥 নতুন মুভি", callback_data="browse_latest")],
-        [InlineKeyboardButton("📝 মুভি রিকোয়েস্ট", callback_data="browse_request")]
-    ]
-    
-    if role in ['admin', 'agent']:
-        keyboard.append([InlineKeyboardButton("📤 মুভি আপলোড", callback_data="browse_upload")])
-    
-    if role == 'admin':
-        keyboard.append([
-            InlineKeyboardButton("👥 এজেন্ট ম্যানেজ", callback_data="browse_agents"),
-            InlineKeyboardButton("📊 স্ট্যাটস", callback_data="browse_stats")
-        ])
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.edit_message_text("🏠 *মেইন মেনু* - নিচের বাটনগুলো ব্যবহার করুন:", 
-                                  reply_markup=reply_markup, parse_mode='Markdown')
+    role = await adb.get_user_role(user_id)
+    await query.edit_message_text(HOME_TEXT, reply_markup=main_menu(role), parse_mode='Markdown')
 
 # ==================== মুভি সার্চ ও ব্রাউজ ====================
 async def search_movie_prompt(query):
@@ -343,12 +2466,31 @@ async def search_movie_prompt(query):
         parse_mode='Markdown'
     )
 
-async def show_latest(query):
-    movies = db.get_movies(10)
+async def get_view(key, build):
+    # ক্যাটালগ ভার্সন কী-তে থাকায় add/delete এর পর পুরনো ভিউ আর কখনো মেলে না
+    key = (*key, db.catalog_version)
+    view = view_cache.get(key)
+    if view is None:
+        view = await build()
+        view_cache.put(key, view)
+    return view
+
+def page_buttons(prev_data, next_data):
+    row = []
+    if prev_data:
+        row.append(InlineKeyboardButton("⬅️ আগের", callback_data=prev_data))
+    if next_data:
+        row.append(InlineKeyboardButton("পরের ➡️", callback_data=next_data))
+    return [row] if row else []
+
+async def build_latest_view(cursor=None, backward=False):
+    movies, more = await adb.get_movies_page(LATEST_PAGE_SIZE, cursor, backward)
     
     if not movies:
-        await query.edit_message_text("📭 এখনো কোন মুভি আপলোড করা হয়নি!", parse_mode='Markdown')
-        return
+        if cursor is None:
+            return "📭 এখনো কোন মুভি আপলোড করা হয়নি!", None
+        # পেজ খালি (মুভি ডিলিট হয়েছে) - প্রথম পেজ দেখাই
+        return await build_latest_view()
     
     text = "📥 *নতুন মুভি লিস্ট:*\n\n"
     keyboard = []
@@ -356,39 +2498,80 @@ async def show_latest(query):
     for movie in movies:
         movie_id, title, year, quality, language, size, link, thumbnail, uploader, date = movie
         display_title = title[:30] + "..." if len(title) > 30 else title
-        text += f"🎬 *{display_title}* ({year})\n"
-        text += f"   ⚡ {quality} | 🗣️ {language} | 💾 {size}\n\n"
+        text += f"🎬 {md_bold(display_title)} ({md(year)})\n"
+        text += f"   ⚡ {md(quality)} | 🗣️ {md(language)} | 💾 {md(size)}\n\n"
         keyboard.append([InlineKeyboardButton(
             f"🎬 {display_title}", 
-            callback_data=f"movie_{movie_id}"
+            callback_data=f"movie:{movie_id}"
         )])
     
+    has_prev = more if backward else cursor is not None
+    has_next = True if backward else more
+    keyboard += page_buttons(
+        f"lt:p:{encode_id(movies[0][0])}" if has_prev else None,
+        f"lt:n:{encode_id(movies[-1][0])}" if has_next else None,
+    )
     keyboard.append([InlineKeyboardButton("🔙 হোম", callback_data="home")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+    return text, InlineKeyboardMarkup(keyboard)
 
-async def show_movie_details(query, movie_id, bot):
-    movie = db.get_movie_by_id(movie_id)
+async def show_latest(query, cursor=None, backward=False, notice=''):
+    text, reply_markup = await get_view(
+        ('latest', cursor, backward), lambda: build_latest_view(cursor, backward)
+    )
+    await edit_view(query, notice + text, reply_markup)
+
+async def build_search_view(query_text, cursor=None, backward=False):
+    movies, more = await adb.search_movies_page(query_text, SEARCH_LIMIT, cursor, backward)
+    if not movies and cursor is None:
+        # বানান ভুল / বাংলা নাম - রিকোয়েস্ট বানানোর আগে ফাজি সার্চ (এক পেজ)
+        movies = [(*movie, None) for movie in await adb.fuzzy_search_movies(query_text)]
+    if not movies:
+        return None
     
-    if not movie:
-        await query.edit_message_text("❌ মুভি পাওয়া যায়নি!", parse_mode='Markdown')
-        return
+    text = "🔍 " + md_bold(f"'{query_text[:ECHO_LIMIT]}' এর রেজাল্ট:") + "\n\n"
+    keyboard = []
     
-    movie_id, title, year, quality, language, size, link, thumbnail, uploader, date = movie
+    for movie in movies:
+        movie_id, title, year, quality, language, size, link, thumbnail, uploader, date, rank = movie
+        display_title = title[:25] + "..." if len(title) > 25 else title
+        text += f"🎬 {md_bold(display_title)} ({md(year)})\n"
+        text += f"   ⚡ {md(quality)} | 🗣️ {md(language)}\n\n"
+        keyboard.append([InlineKeyboardButton(
+            f"🎬 {display_title}", 
+            callback_data=f"movie:{movie_id}"
+        )])
     
-    text = f"""
-🎬 *{title}* ({year})
+    if movies[0][-1] is not None:
+        token = search_token(query_text)
+        first, last = movies[0], movies[-1]
+        has_prev = more if backward else cursor is not None
+        has_next = True if backward else more
+        keyboard += page_buttons(
+            f"sr:p:{token}:{encode_rank(first[-1])}:{encode_id(first[0])}" if has_prev else None,
+            f"sr:n:{token}:{encode_rank(last[-1])}:{encode_id(last[0])}" if has_next else None,
+        )
+    keyboard.append([InlineKeyboardButton("🔙 হোম", callback_data="home")])
+    return text, InlineKeyboardMarkup(keyboard)
 
-📊 *ডিটেলস:*
-⚡ কোয়ালিটি: {quality}
-🗣️ ভাষা: {language}
-💾 সাইজ: {size}
-📅 আপলোড: {date[:10] if date else 'N/A'}
+async def show_search_page(query, token, cursor, backward):
+    query_text = search_tokens.get(token)
+    view = await build_search_view(query_text, cursor, backward) if query_text else None
+    if view is None:
+        await query.edit_message_text("⌛ এই সার্চের মেয়াদ শেষ, মুভির নাম আবার লিখে পাঠান।", parse_mode='Markdown')
+        return
+    text, reply_markup = view
+    await edit_view(query, text, reply_markup)
 
-🔗 *ডাউনলোড লিংক:*
-`{link}`
-"""
+async def build_movie_view(movie_id, is_admin):
+    movie = await adb.get_movie_by_id(movie_id)
+    
+    if not movie:
+        return "❌ মুভি পাওয়া যায়নি!", None, None
+    
+    movie_id, title, year, quality, language, size, link, thumbnail, uploader, date = movie
+    text = movie_details_text(movie)
+    if not db.thumbnail_usable(movie_id, thumbnail):
+        thumbnail = ''
     
     keyboard = [
         [InlineKeyboardButton("⬇️ ডাউনলোড লিংক", url=link)],
@@ -396,29 +2579,140 @@ async def show_movie_details(query, movie_id, bot):
     ]
     
     # অ্যাডমিন হলে ডিলিট বাটন
+    if is_admin:
+        keyboard.append([InlineKeyboardButton("🗑️ মুভি ডিলিট", callback_data=f"delete_movie:{movie_id}")])
+    
+    return text, InlineKeyboardMarkup(keyboard), thumbnail
+
+def movie_details_text(movie):
+    movie_id, title, year, quality, language, size, link, thumbnail, uploader, date = movie[:10]
+    
+    return f"""
+🎬 {md_bold(title)} ({md(year)})
+
+📊 *ডিটেলস:*
+⚡ কোয়ালিটি: {md(quality)}
+🗣️ ভাষা: {md(language)}
+💾 সাইজ: {md(size)}
+📅 আপলোড: {date[:10] if date else 'N/A'}
+
+🔗 *ডাউনলোড লিংক:*
+{md_code(link)}
+"""
+
+# টেলিগ্রাম file_id আর চিনছে না - এই ভুলগুলোতে থাম্বনেল অচল ধরা হয়
+DEAD_THUMBNAIL_ERRORS = re.compile(
+    r'file identifier|file reference|file of type|photo_invalid|web page content|failed to get http url', re.I
+)
+
+async def show_movie_details(query, movie_id, bot):
+    """প্রতি ট্যাপে একটাই Bot API কল: কার্ড থেকে edit_message_media, লিস্ট থেকে send_photo,
+    থাম্বনেল না থাকলে বা অচল হলে edit_view"""
     user_id = query.from_user.id
-    role = db.get_user_role(user_id)
-    if role == 'admin':
-        keyboard.append([InlineKeyboardButton("🗑️ মুভি ডিলিট", callback_data=f"delete_movie_{movie_id}")])
+    role = await adb.get_user_role(user_id)
+    is_admin = role == 'admin'
+    text, reply_markup, thumbnail = await get_view(
+        ('movie', movie_id, is_admin), lambda: build_movie_view(movie_id, is_admin)
+    )
     
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    if not thumbnail:
+        await edit_view(query, text, reply_markup)
+        return
     
-    # যদি থাম্বনেল থাকে
-    if thumbnail:
-        try:
+    caption = fit(text, CAPTION_LIMIT)
+    try:
+        if query.message.photo:
+            # আগের কার্ডের ছবি আর ক্যাপশন এক কলে বদল
+            await query.edit_message_media(
+                InputMediaPhoto(thumbnail, caption=caption, parse_mode='Markdown'), reply_markup=reply_markup
+            )
+        else:
+            # টেক্সট মেসেজকে ছবিতে এডিট করা যায় না; লিস্ট থাকে, আলাদা delete কল লাগে না
             await bot.send_photo(
                 chat_id=query.message.chat_id,
                 photo=thumbnail,
-                caption=text,
+                caption=caption,
                 reply_markup=reply_markup,
                 parse_mode='Markdown'
             )
-            await query.delete_message()
-        except Exception as e:
-            print(f"Error sending photo: {e}")
-            await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
-    else:
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+    except BadRequest as e:
+        if 'not modified' in e.message.lower():
+            # একই কার্ডে আবার ট্যাপ
+            return
+        if DEAD_THUMBNAIL_ERRORS.search(e.message):
+            # একবারই দুই কল; এরপর এই মুভির ভিউ থাম্বনেল ছাড়া
+            await adb.mark_thumbnail_dead(movie_id, thumbnail, e.message)
+        log_event('photo_send_failed', logging.WARNING, movie=movie_id, error=e.message)
+        await edit_view(query, text, reply_markup)
+    except TelegramError as e:
+        log_event('photo_send_failed', logging.WARNING, movie=movie_id, error=str(e))
+        await edit_view(query, text, reply_markup)
+
+# ==================== ইনলাইন সার্চ ====================
+async def inline_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # একই ইউজারের পুরনো কিস্ট্রোক UserOrderedProcessor আগেই বাদ দেয়
+    inline_query = update.inline_query
+    key = ' '.join(text_tokens(inline_query.query))
+    if len(key) < INLINE_MIN_QUERY:
+        key = ''
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    # ক্যাটালগ ভার্সন কুয়েরির আগে পড়া, তাই আপলোড/ডিলিটের পর পুরনো ফল আর মেলে না (search_cache এর মতো);
+    # ডেড থাম্বনেল বাড়লে পেজ আবার তৈরি, যাতে মরা file_id এর ফটো রেজাল্ট না যায়
+    version = db.catalog_version
+    page_key = ('page', version, len(db.dead_thumbnails), key, offset)
+    page = inline_cache.get(page_key)
+    if page is None:
+        movies = await inline_ranked(key, version)
+        # তৈরি করা রেজাল্ট অবজেক্টও ক্যাশে - হিটে র‍্যাঙ্কিং আর রেজাল্ট তৈরি দুটোই বাদ
+        page = ([inline_result(movie) for movie in movies[offset:offset + INLINE_PAGE_SIZE]],
+                offset + INLINE_PAGE_SIZE < len(movies), not movies)
+        inline_cache.put(page_key, page)
+    results, more, empty = page
+    log_event('inline', user=inline_query.from_user.id, text=key, offset=offset, results=len(results))
+    await inline_query.answer(
+        results,
+        # ফল সবার জন্য একই, তাই টেলিগ্রাম সব ইউজারকে নিজের ক্যাশ থেকে দিতে পারে
+        cache_time=INLINE_CACHE_TIME,
+        is_personal=False,
+        next_offset=str(offset + INLINE_PAGE_SIZE) if more else '',
+        button=InlineQueryResultsButton(
+            text="😔 পাওয়া যায়নি - বটে রিকোয়েস্ট করুন", start_parameter='request'
+        ) if empty else None,
+    )
+
+async def inline_ranked(key, version):
+    # একসাথে সীমিত সংখ্যক লুকআপ - কিস্ট্রোকের ঝড়ে রিডার পুল অন্য হ্যান্ডলারের জন্যও খালি থাকে
+    cache_key = ('ranked', version, key)
+    async with inline_slots:
+        # অপেক্ষার মধ্যে আরেকজন একই কুয়েরি এনে রাখতে পারে
+        movies = inline_cache.get(cache_key)
+        if movies is not None:
+            return movies
+        if not key:
+            movies, _ = await adb.get_movies_page(INLINE_MAX_RESULTS)
+        else:
+            movies, _ = await adb.search_movies_page(key, INLINE_MAX_RESULTS)
+            if not movies:
+                movies = await adb.fuzzy_search_movies(key, INLINE_PAGE_SIZE)
+        movies = [tuple(movie[:10]) for movie in movies]
+        inline_cache.put(cache_key, movies)
+        return movies
+
+def inline_result(movie):
+    movie_id, title, year, quality, language, size, link, thumbnail, uploader, date = movie
+    text = movie_details_text(movie)
+    reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("⬇️ ডাউনলোড লিংক", url=link)]])
+    description = f"{quality} | {language} | {size}"
+    if db.thumbnail_usable(movie_id, thumbnail):
+        return InlineQueryResultCachedPhoto(
+            id=str(movie_id), photo_file_id=thumbnail, title=f"{title} ({year})", description=description,
+            caption=fit(text, CAPTION_LIMIT), parse_mode='Markdown', reply_markup=reply_markup,
+        )
+    return InlineQueryResultArticle(
+        id=str(movie_id), title=f"{title} ({year})", description=description,
+        input_message_content=InputTextMessageContent(fit(text), parse_mode='Markdown'),
+        reply_markup=reply_markup,
+    )
 
 # ==================== মুভি আপলোড সিস্টেম ====================
 async def upload_step_title(query):
@@ -434,10 +2728,7 @@ async def upload_step_title(query):
 • Pathaan
 """
     
-    keyboard = [[InlineKeyboardButton("❌ বাতিল", callback_data="cancel_upload")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+    await query.edit_message_text(text, reply_markup=CANCEL_UPLOAD_BUTTON, parse_mode='Markdown')
 
 async def upload_show_summary(query, context):
     movie_data = context.user_data.get('movie_data', {})
@@ -449,13 +2740,13 @@ async def upload_show_summary(query, context):
     text = f"""
 📋 *আপলোড সামারি*
 
-🎬 *নাম:* {movie_data.get('title', 'N/A')}
-📅 *সাল:* {movie_data.get('year', 'N/A')}
-⚡ *কোয়ালিটি:* {movie_data.get('quality', 'N/A')}
-🗣️ *ভাষা:* {movie_data.get('language', 'N/A')}
-💾 *সাইজ:* {movie_data.get('size', 'N/A')}
+🎬 *নাম:* {md(movie_data.get('title', 'N/A'))}
+📅 *সাল:* {md(movie_data.get('year', 'N/A'))}
+⚡ *কোয়ালিটি:* {md(movie_data.get('quality', 'N/A'))}
+🗣️ *ভাষা:* {md(movie_data.get('language', 'N/A'))}
+💾 *সাইজ:* {md(movie_data.get('size', 'N/A'))}
 🖼️ *থাম্বনেল:* {thumbnail_status}
-🔗 *লিংক:* {movie_data.get('link', 'N/A')[:50]}...
+🔗 *লিংক:* {md(movie_data.get('link', 'N/A')[:50])}...
 
 ✅ সবকিছু ঠিক আছে?
 """
@@ -471,7 +2762,7 @@ async def upload_show_summary(query, context):
     
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+    await edit_view(query, text, reply_markup)
 
 async def confirm_upload(query, context):
     user_id = query.from_user.id
@@ -484,7 +2775,7 @@ async def confirm_upload(query, context):
     
     try:
         # ডাটাবেসে সেভ করুন
-        movie_id = db.add_movie({
+        movie_id = await adb.add_movie({
             'title': movie_data.get('title', ''),
             'year': movie_data.get('year', ''),
             'quality': movie_data.get('quality', ''),
@@ -498,14 +2789,19 @@ async def confirm_upload(query, context):
         # ক্লিয়ার ডাটা
         context.user_data.clear()
         
+        # যারা এই মুভি চেয়েছিল তাদের জানানো - ব্যাকগ্রাউন্ডে, আপলোডার অপেক্ষা করবে না
+        context.application.create_task(notify_requesters(
+            context.bot, movie_id, movie_data.get('title', ''), movie_data.get('year', '')
+        ))
+        
         success_text = f"""
 ✅ *মুভি সফলভাবে আপলোড হয়েছে!*
 
-🎬 *নাম:* {movie_data.get('title', '')}
-📅 *সাল:* {movie_data.get('year', '')}
-⚡ *কোয়ালিটি:* {movie_data.get('quality', '')}
-🗣️ *ভাষা:* {movie_data.get('language', '')}
-💾 *সাইজ:* {movie_data.get('size', '')}
+🎬 *নাম:* {md(movie_data.get('title', ''))}
+📅 *সাল:* {md(movie_data.get('year', ''))}
+⚡ *কোয়ালিটি:* {md(movie_data.get('quality', ''))}
+🗣️ *ভাষা:* {md(movie_data.get('language', ''))}
+💾 *সাইজ:* {md(movie_data.get('size', ''))}
 🖼️ *থাম্বনেল:* {'✅ আছে' if thumbnail else '❌ নেই'}
 
 📌 মুভি আইডি: `{movie_id}`
@@ -517,21 +2813,21 @@ async def confirm_upload(query, context):
         keyboard = [[InlineKeyboardButton("🏠 হোম", callback_data="home")]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        await query.edit_message_text(success_text, reply_markup=reply_markup, parse_mode='Markdown')
+        await edit_view(query, success_text, reply_markup)
     
     except Exception as e:
-        await query.edit_message_text(f"❌ আপলোড ব্যর্থ: {str(e)}", parse_mode='Markdown')
+        await edit_view(query, f"❌ আপলোড ব্যর্থ: {md(e)}")
 
 # ==================== এজেন্ট ম্যানেজমেন্ট ====================
 async def manage_agents_menu(query):
-    agents = db.get_agents_with_details()
+    agents = await adb.get_agents_with_details()
     
     text = "👥 *এজেন্ট ম্যানেজমেন্ট*\n\n"
     
     if agents:
         text += "📋 *সক্রিয় এজেন্ট লিস্ট:*\n"
         for agent_id, username, added_date in agents:
-            username_display = f"@{username}" if username else "No Username"
+            username_display = f"@{md(username)}" if username else "No Username"
             text += f"• `{agent_id}` - {username_display}\n"
         text += f"\n💰 মোট এজেন্ট: {len(agents)}"
     else:
@@ -545,7 +2841,7 @@ async def manage_agents_menu(query):
     ]
     
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+    await edit_view(query, text, reply_markup)
 
 async def add_agent_prompt(query):
     await query.edit_message_text(
@@ -557,7 +2853,7 @@ async def add_agent_prompt(query):
     )
 
 async def show_agent_list(query):
-    agents = db.get_agents_with_details()
+    agents = await adb.get_agents_with_details()
     
     if not agents:
         await query.edit_message_text("📭 কোন এজেন্ট নেই!", parse_mode='Markdown')
@@ -566,7 +2862,7 @@ async def show_agent_list(query):
     text = "📋 *এজেন্ট লিস্ট:*\n\n"
     
     for agent_id, username, added_date in agents:
-        username_display = f"@{username}" if username else "No Username"
+        username_display = f"@{md(username)}" if username else "No Username"
         text += f"🆔 *ID:* `{agent_id}`\n"
         text += f"👤 *Username:* {username_display}\n"
         text += f"📅 *যোগ দেওয়ার তারিখ:* {added_date[:10] if added_date else 'N/A'}\n"
@@ -580,10 +2876,10 @@ async def show_agent_list(query):
     ]
     
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+    await edit_view(query, text, reply_markup)
 
 async def remove_agent_menu(query):
-    agents = db.get_agents_with_details()
+    agents = await adb.get_agents_with_details()
     
     if not agents:
         await query.edit_message_text("📭 কোন এজেন্ট নেই রিমুভ করার!", parse_mode='Markdown')
@@ -602,7 +2898,7 @@ async def remove_agent_menu(query):
         
         keyboard.append([InlineKeyboardButton(
             button_text, 
-            callback_data=f"confirm_delete_agent_{agent_id}"
+            callback_data=f"confirm_delete_agent:{agent_id}"
         )])
     
     keyboard.append([InlineKeyboardButton("🔙 এজেন্ট ম্যানেজ", callback_data="browse_agents")])
@@ -611,7 +2907,7 @@ async def remove_agent_menu(query):
     await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
 
 async def confirm_delete_agent(query, agent_id):
-    agents = db.get_agents_with_details()
+    agents = await adb.get_agents_with_details()
     agent_info = None
     
     for agent in agents:
@@ -624,7 +2920,7 @@ async def confirm_delete_agent(query, agent_id):
         return
     
     agent_id, username, added_date = agent_info
-    username_display = f"@{username}" if username else "No Username"
+    username_display = f"@{md(username)}" if username else "No Username"
     
     text = f"""
 ⚠️ *এজেন্ট রিমুভ কনফার্মেশন*
@@ -637,7 +2933,7 @@ async def confirm_delete_agent(query, agent_id):
 """
     
     keyboard = [
-        [InlineKeyboardButton("✅ হ্যাঁ, রিমুভ করুণ", callback_data=f"delete_agent_now_{agent_id}")],
+        [InlineKeyboardButton("✅ হ্যাঁ, রিমুভ করুণ", callback_data=f"delete_agent_now:{agent_id}")],
         [InlineKeyboardButton("❌ না, বাতিল করুণ", callback_data="cancel_delete_agent")]
     ]
     
@@ -654,11 +2950,15 @@ async def request_movie_prompt(query):
         "• Salaar Part 2\n"
         "• Animal 2\n\n"
         "✅ আপনার রিকোয়েস্ট সেভ হবে এবং এজেন্টরা দেখতে পাবে।",
+        reply_markup=InlineKeyboardMarkup([
+            [InlineKeyboardButton("📋 আমার রিকোয়েস্ট", callback_data="my_requests")],
+            [InlineKeyboardButton("🔙 হোম", callback_data="home")],
+        ]),
         parse_mode='Markdown'
     )
 
 async def show_my_requests(query, user_id):
-    requests = db.get_user_requests(user_id)
+    requests = await adb.get_user_requests(user_id)
     
     if not requests:
         await query.edit_message_text("📭 আপনি এখনো কোন মুভি রিকোয়েস্ট করেননি!", parse_mode='Markdown')
@@ -669,19 +2969,83 @@ async def show_my_requests(query, user_id):
     for req in requests[:10]:
         req_id, user_id, movie_name, date, status = req
         status_icon = "⏳" if status == "pending" else "✅" if status == "completed" else "❌"
-        text += f"{status_icon} *{movie_name}*\n"
+        text += f"{status_icon} {md_bold(movie_name)}\n"
         text += f"   📅 {date[:10]} | Status: {status}\n\n"
     
     text += f"\n💰 মোট রিকোয়েস্ট: {len(requests)}"
     
-    keyboard = [[InlineKeyboardButton("🔙 হোম", callback_data="home")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    await edit_view(query, text, HOME_BUTTON)
+
+async def show_top_requests(query, cursor=None, backward=False):
+    rows, more = await adb.get_top_requests(TOP_REQUESTS_PAGE_SIZE, cursor, backward)
     
-    await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+    if not rows and cursor is not None:
+        # ডিমান্ড পূরণ হয়ে পেজ খালি - প্রথম পেজ
+        cursor, backward = None, False
+        rows, more = await adb.get_top_requests()
+    
+    keyboard = []
+    if not rows:
+        text = "📭 কোন পেন্ডিং রিকোয়েস্ট নেই!"
+    else:
+        text = "🔥 *টপ রিকোয়েস্ট* (ইউজার / মোট রিকোয়েস্ট)\n\n"
+        for demand_id, title, requesters, requests, last_requested in rows:
+            display_title = title[:40] + "..." if len(title) > 40 else title
+            text += f"🎬 {md_bold(display_title)}\n"
+            text += f"   👥 {requesters} | 📝 {requests} | 🕐 {(last_requested or '')[:10]}\n\n"
+        
+        has_prev = more if backward else cursor is not None
+        has_next = True if backward else more
+        first, last = rows[0], rows[-1]
+        keyboard += page_buttons(
+            f"tr:p:{encode_id(first[2])}:{encode_id(first[0])}" if has_prev else None,
+            f"tr:n:{encode_id(last[2])}:{encode_id(last[0])}" if has_next else None,
+        )
+    keyboard.append([InlineKeyboardButton("🔙 হোম", callback_data="home")])
+    
+    await edit_view(query, text, InlineKeyboardMarkup(keyboard))
+
+# যেসব রিকোয়েস্টের নোটিফিকেশন চলছে - পরপর দুই আপলোডে একই ইউজারকে দুবার না জানাতে
+_notifying = set()
+
+async def notify_requesters(bot, movie_id, title, year=''):
+    """নতুন মুভির সাথে মিলে যাওয়া পেন্ডিং রিকোয়েস্টের ইউজারদের ব্যাকগ্রাউন্ড প্রায়োরিটিতে জানানো,
+    তারপর সব মিল এক ট্রানজ্যাকশনে completed"""
+    matches = [row for row in await adb.match_pending_requests(title, year) if row[0] not in _notifying]
+    if not matches:
+        return 0
+    request_ids = [request_id for request_id, _, _ in matches]
+    _notifying.update(request_ids)
+    try:
+        # একই ইউজারের একাধিক রিকোয়েস্ট থাকলেও একটাই মেসেজ
+        user_ids = list(dict.fromkeys(user_id for _, user_id, _ in matches))
+        text = f"🎉 আপনার রিকোয়েস্ট করা মুভি এসে গেছে!\n\n🎬 {title}" + (f" ({year})" if year else '')
+        reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("📥 ডাউনলোড", callback_data=f"movie:{movie_id}")]])
+        
+        sent = 0
+        for start in range(0, len(user_ids), NOTIFY_BATCH_SIZE):
+            batch = user_ids[start:start + NOTIFY_BATCH_SIZE]
+            results = await asyncio.gather(*(
+                bot.send_message(user_id, text, reply_markup=reply_markup, rate_limit_args=PRIORITY_BACKGROUND)
+                for user_id in batch
+            ), return_exceptions=True)
+            for user_id, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    # বট ব্লক করা ইউজার ইত্যাদি - রিকোয়েস্ট তবুও completed
+                    logger.info("Request notification to %s failed: %s", user_id, result)
+                else:
+                    sent += 1
+        
+        completed = await adb.complete_requests(request_ids)
+        logger.info("Movie %s fulfilled %d requests, notified %d/%d users",
+                    movie_id, completed, sent, len(user_ids))
+        return completed
+    finally:
+        _notifying.difference_update(request_ids)
 
 # ==================== স্ট্যাটিস্টিকস ====================
 async def show_stats(query):
-    stats = db.get_stats()
+    stats = await adb.get_stats()
     
     text = f"""
 📊 *বট স্ট্যাটিস্টিকস*
@@ -696,18 +3060,177 @@ async def show_stats(query):
 ⚡ Powered by Movie Share Bot
 """
     
-    keyboard = [[InlineKeyboardButton("🔙 হোম", callback_data="home")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+    await query.edit_message_text(text, reply_markup=HOME_BUTTON, parse_mode='Markdown')
+
+# ==================== লিংক হেলথ চেক ====================
+# HEAD না মানা হোস্ট (অনেক ফাইল হোস্ট 403/405 দেয়) - তখন বডি না পড়ে GET
+HEAD_REJECTED = {403, 405, 501}
+# শুধু এগুলোতেই লিংক নিশ্চিত মৃত; 5xx/429/টাইমআউট সাময়িক - 'error', পরের সুইপে আবার
+DEAD_STATUSES = {404, 410}
+
+async def probe_link(client, url):
+    """একটা ডাউনলোড লিংক যাচাই -> 'ok' | 'dead' | 'error'"""
+    try:
+        response = await client.head(url)
+        if response.status_code in HEAD_REJECTED:
+            # হেডার পেলেই যথেষ্ট - বডি না পড়ে কানেকশন ছেড়ে দেওয়া
+            async with client.stream('GET', url) as response:
+                pass
+    except (httpx.InvalidURL, httpx.UnsupportedProtocol, ValueError):
+        return 'dead'
+    except httpx.HTTPError:
+        return 'error'
+    if response.status_code < 400:
+        return 'ok'
+    return 'dead' if response.status_code in DEAD_STATUSES else 'error'
+
+class LinkChecker:
+    """ক্যাটালগ কিসেট চাঙ্কে স্ট্রিম করে লিংক প্রোব - মোট ও হোস্ট প্রতি সীমিত কানেকশন।
+    পরের চাঙ্ক পড়া চলে আগের চাঙ্কের প্রোবের সাথে; ফল চাঙ্ক ধরে রাইটার থ্রেডে এক কমিটে"""
+    
+    def __init__(self, concurrency=LINK_CHECK_CONCURRENCY, per_host=LINK_CHECK_PER_HOST,
+                 timeout=LINK_CHECK_TIMEOUT, chunk=LINK_CHECK_CHUNK):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.chunk = chunk
+        self.running = False
+        self.last_run = None
+    
+    async def run(self, recheck_hours=LINK_RECHECK_HOURS):
+        """একটা সুইপ; আরেকটা চললে None, নইলে সারাংশ"""
+        if self.running:
+            return None
+        self.running = True
+        started = time.perf_counter()
+        counts = Counter()
+        new_dead = 0
+        results = []
+        # কিউ এক চাঙ্কের বেশি ধরে না - পুরো ক্যাটালগ কখনো মেমরিতে নয়
+        pending = asyncio.Queue(self.chunk)
+        hosts = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+        
+        async def flush():
+            batch = results[:]
+            results.clear()
+            if batch:
+                await adb.record_link_status(batch)
+        
+        async def worker(client):
+            nonlocal new_dead
+            while True:
+                item = await pending.get()
+                if item is None:
+                    return
+                movie_id, url, previous = item
+                url = (url or '').strip()
+                probe_started = time.perf_counter()
+                try:
+                    # আপলোডে যেকোন টেক্সট লিংক হতে পারে - 'http://[abc/x' এ urlsplit নিজেই ValueError
+                    host = urlsplit(url).hostname
+                except ValueError:
+                    status = 'dead'
+                else:
+                    try:
+                        async with hosts[host]:
+                            status = await probe_link(client, url)
+                    except Exception:
+                        # একটা অদ্ভুত লিংকে পুরো সুইপ থামবে না - এই সারি পরের সুইপে আবার
+                        logger.exception("Link probe failed for movie %s", movie_id)
+                        status = 'error'
+                metrics.observe('moviebot_link_probe_seconds', (), time.perf_counter() - probe_started)
+                metrics.inc('moviebot_link_checks_total', (('status', status),))
+                counts[status] += 1
+                new_dead += status == 'dead' and previous != 'dead'
+                results.append((movie_id, status))
+                if len(results) >= self.chunk:
+                    await flush()
+        
+        async def produce():
+            after = 0
+            while rows := await adb.links_to_check(after, self.chunk, recheck_hours):
+                for row in rows:
+                    await pending.put(row)
+                after = rows[-1][0]
+            for _ in range(self.concurrency):
+                await pending.put(None)
+
+        tasks = []
+        try:
+            limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            async with httpx.AsyncClient(timeout=self.timeout, limits=limits, follow_redirects=True) as client:
+                tasks = [asyncio.create_task(produce())]
+                tasks += [asyncio.create_task(worker(client)) for _ in range(self.concurrency)]
+                # কোন ওয়ার্কার ভাঙলে প্রডিউসার পূর্ণ কিউতে আটকে না থেকে সুইপ সেখানেই শেষ
+                await asyncio.gather(*tasks)
+            await flush()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.running = False
+        
+        seconds = time.perf_counter() - started
+        checked = sum(counts.values())
+        self.last_run = {
+            'checked': checked, 'ok': counts['ok'], 'dead': counts['dead'], 'error': counts['error'],
+            'new_dead': new_dead, 'seconds': seconds, 'rate': checked / seconds if seconds else 0.0,
+            'finished': datetime.now().strftime('%Y-%m-%d %H:%M'),
+        }
+        log_event('link_check', **{k: round(v, 1) if isinstance(v, float) else v for k, v in self.last_run.items()})
+        return self.last_run
+
+link_checker = LinkChecker()
+
+async def run_link_check(bot, recheck_hours=LINK_RECHECK_HOURS):
+    """সুইপ চালিয়ে নতুন ডেড লিংক থাকলে অ্যাডমিনদের ব্যাকগ্রাউন্ড প্রায়োরিটিতে জানানো"""
+    summary = await link_checker.run(recheck_hours)
+    if not summary or not summary['new_dead']:
+        return summary
+    text = (f"🔗 *লিংক চেক:* {summary['new_dead']} টি নতুন ডেড লিংক "
+            f"({summary['checked']} লিংক চেক হয়েছে)\n\n/deadlinks দিয়ে দেখুন")
+    for admin_id in await adb.get_admin_ids():
+        try:
+            await bot.send_message(admin_id, text, parse_mode='Markdown', rate_limit_args=PRIORITY_BACKGROUND)
+        except TelegramError as e:
+            logger.info("Dead link notice to %s failed: %s", admin_id, e)
+    return summary
+
+async def link_check_loop(application: Application):
+    # প্রথম সুইপ ওয়ার্ম-আপের পরে; রিস্টার্টে শুধু নতুন আর পুরনো চেকের লিংক পড়ে
+    while warm_up_task is None or not warm_up_task.done():
+        await asyncio.sleep(1)
+    while True:
+        try:
+            await run_link_check(application.bot)
+        except Exception:
+            # ডাটাবেস/নেটওয়ার্কের সমস্যায় লুপ থামবে না - পরের ইন্টারভালে আবার
+            logger.exception("Link check sweep failed")
+        await asyncio.sleep(LINK_CHECK_INTERVAL)
+
+async def build_dead_links_view(cursor=None):
+    rows, more = await adb.get_dead_links(DEAD_LINKS_PAGE_SIZE, cursor)
+    keyboard = []
+    if not rows:
+        text = "✅ কোন ডেড লিংক নেই!" if cursor is None else "📭 আর কোন ডেড লিংক নেই।"
+    else:
+        text = "🔗 *ডেড লিংক* (নতুন মুভি আগে)\n\n"
+        for movie_id, title, link, last_checked in rows:
+            display_title = title[:40] + "..." if len(title) > 40 else title
+            text += f"🎬 {md_bold(display_title)} - `{movie_id}`\n"
+            text += f"   {md((link or '')[:80])}\n   🕐 {(last_checked or '')[:16]}\n\n"
+            # মুভি কার্ড থেকেই অ্যাডমিন ডিলিট করতে পারে
+            keyboard.append([InlineKeyboardButton(f"🎬 {display_title}", callback_data=f"movie:{movie_id}")])
+        keyboard += page_buttons(None, f"dl:{encode_id(rows[-1][0])}" if more else None)
+    keyboard.append([InlineKeyboardButton("🔙 হোম", callback_data="home")])
+    return text, InlineKeyboardMarkup(keyboard)
 
 # ==================== মেসেজ হ্যান্ডলার ====================
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     message_text = update.message.text.strip() if update.message.text else ""
-    role = db.get_user_role(user_id)
+    role = await adb.get_user_role(user_id)
     
-    print(f"Message from {user_id}: {message_text[:50]}...")
+    log_event('message', user=user_id, role=role, text=message_text)
     
     # ১. যদি ফটো মেসেজ (থাম্বনেল)
     if update.message.photo and context.user_data.get('upload_mode'):
@@ -729,7 +3252,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # ৪. যদি অ্যাডমিন এজেন্ট আইডি পাঠায় (সাধারণ মেসেজ হিসেবে)
     if role == 'admin' and message_text.isdigit():
         agent_id = int(message_text)
-        success = db.add_agent(agent_id, user_id)
+        success = await adb.add_agent(agent_id, user_id)
         if success:
             await update.message.reply_text(f"✅ এজেন্ট `{agent_id}` সফলভাবে অ্যাড করা হয়েছে!", parse_mode='Markdown')
         else:
@@ -738,34 +3261,20 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # ৫. যদি মুভি সার্চ/রিকোয়েস্ট হয়
     if len(message_text) > 1:
-        # প্রথমে সার্চ করুন
-        movies = db.search_movies(message_text)
+        # প্রথমে সার্চ করুন (FTS, না পেলে ফাজি)
+        view = await build_search_view(message_text)
         
-        if movies:
+        if view:
             # মুভি পাওয়া গেছে
-            text = f"🔍 *'{message_text}' এর রেজাল্ট:*\n\n"
-            keyboard = []
-            
-            for movie in movies[:5]:
-                movie_id, title, year, quality, language, size, link, thumbnail, uploader, date = movie
-                display_title = title[:25] + "..." if len(title) > 25 else title
-                text += f"🎬 *{display_title}* ({year})\n"
-                text += f"   ⚡ {quality} | 🗣️ {language}\n\n"
-                keyboard.append([InlineKeyboardButton(
-                    f"🎬 {display_title}", 
-                    callback_data=f"movie_{movie_id}"
-                )])
-            
-            keyboard.append([InlineKeyboardButton("🔙 হোম", callback_data="home")])
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+            text, reply_markup = view
+            await reply_view(update.message, text, reply_markup)
         
         else:
             # মুভি পাওয়া যায়নি, রিকোয়েস্ট হিসেবে সেভ করুন
-            success = db.add_request(user_id, message_text)
+            success = await adb.add_request(user_id, message_text)
             if success:
                 await update.message.reply_text(
-                    f"🔍 *'{message_text}' নামে কোন মুভি পাওয়া যায়নি!*\n\n"
+                    "🔍 " + md_bold(f"'{message_text[:ECHO_LIMIT]}' নামে কোন মুভি পাওয়া যায়নি!") + "\n\n"
                     "✅ আপনার রিকোয়েস্ট সেভ করা হয়েছে।\n"
                     "এজেন্টরা এটি দেখতে পাবে এবং শীঘ্রই আপলোড করবে।",
                     parse_mode='Markdown'
@@ -783,7 +3292,7 @@ async def handle_thumbnail_photo(update: Update, context: ContextTypes.DEFAULT_T
     user_id = update.effective_user.id
     step = context.user_data.get('upload_step', '')
     
-    print(f"Thumbnail photo received, step: {step}")
+    log_event('thumbnail', user=user_id, step=step)
     
     if step == 'thumbnail':
         # সর্বোচ্চ রেজোলিউশনের ফটো নিন
@@ -818,14 +3327,14 @@ async def handle_upload_message(update: Update, context: ContextTypes.DEFAULT_TY
     step = context.user_data.get('upload_step', 'title')
     movie_data = context.user_data.get('movie_data', {})
     
-    print(f"Upload step {step}: {message_text}")
+    log_event('upload_step', user=user_id, step=step, text=message_text)
     
     if step == 'title':
         movie_data['title'] = message_text
         context.user_data['movie_data'] = movie_data
         context.user_data['upload_step'] = 'year'
         await update.message.reply_text(
-            f"✅ নাম সেভ হয়েছে: *{message_text}*\n\n"
+            f"✅ নাম সেভ হয়েছে: {md_bold(message_text[:ECHO_LIMIT])}\n\n"
             "📅 *এখন মুভির সাল লিখুন:*\n"
             "উদাহরণ: 2023, 2022, 2021",
             parse_mode='Markdown'
@@ -836,7 +3345,7 @@ async def handle_upload_message(update: Update, context: ContextTypes.DEFAULT_TY
         context.user_data['movie_data'] = movie_data
         context.user_data['upload_step'] = 'quality'
         await update.message.reply_text(
-            f"✅ সাল সেভ হয়েছে: *{message_text}*\n\n"
+            f"✅ সাল সেভ হয়েছে: {md_bold(message_text[:ECHO_LIMIT])}\n\n"
             "⚡ *এখন ভিডিও কোয়ালিটি লিখুন:*\n"
             "উদাহরণ: 1080p WEB-DL, 720p HDRip",
             parse_mode='Markdown'
@@ -847,7 +3356,7 @@ async def handle_upload_message(update: Update, context: ContextTypes.DEFAULT_TY
         context.user_data['movie_data'] = movie_data
         context.user_data['upload_step'] = 'language'
         await update.message.reply_text(
-            f"✅ কোয়ালিটি সেভ হয়েছে: *{message_text}*\n\n"
+            f"✅ কোয়ালিটি সেভ হয়েছে: {md_bold(message_text[:ECHO_LIMIT])}\n\n"
             "🗣️ *এখন ভাষা লিখুন:*\n"
             "উদাহরণ: বাংলা ডাবিং, বাংলা সাবটাইটেল",
             parse_mode='Markdown'
@@ -858,7 +3367,7 @@ async def handle_upload_message(update: Update, context: ContextTypes.DEFAULT_TY
         context.user_data['movie_data'] = movie_data
         context.user_data['upload_step'] = 'size'
         await update.message.reply_text(
-            f"✅ ভাষা সেভ হয়েছে: *{message_text}*\n\n"
+            f"✅ ভাষা সেভ হয়েছে: {md_bold(message_text[:ECHO_LIMIT])}\n\n"
             "💾 *এখন ফাইল সাইজ লিখুন:*\n"
             "উদাহরণ: 1.5GB, 2.3GB, 850MB",
             parse_mode='Markdown'
@@ -869,7 +3378,7 @@ async def handle_upload_message(update: Update, context: ContextTypes.DEFAULT_TY
         context.user_data['movie_data'] = movie_data
         context.user_data['upload_step'] = 'link'
         await update.message.reply_text(
-            f"✅ সাইজ সেভ হয়েছে: *{message_text}*\n\n"
+            f"✅ সাইজ সেভ হয়েছে: {md_bold(message_text[:ECHO_LIMIT])}\n\n"
             "🔗 *এখন ডাউনলোড লিংক দিন:*\n"
             "উদাহরণ: https://drive.google.com/...\n\n"
             "⚠️ ভ্যালিড লিংক দিন!",
@@ -907,7 +3416,7 @@ async def handle_upload_message(update: Update, context: ContextTypes.DEFAULT_TY
 # ==================== অ্যাডমিন কমান্ড ====================
 async def admin_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    role = db.get_user_role(user_id)
+    role = await adb.get_user_role(user_id)
     
     if role != 'admin':
         await update.message.reply_text("❌ আপনার অ্যাডমিন এক্সেস নেই!", parse_mode='Markdown')
@@ -919,15 +3428,18 @@ async def admin_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
 /addagent <id> - নতুন এজেন্ট অ্যাড
 /removeagent <id> - এজেন্ট রিমুভ
 /stats - স্ট্যাটিস্টিকস
-/delete <movie_id> - মুভি ডিলিট
+/stats detailed - দৈনিক ও এজেন্ট ভিত্তিক স্ট্যাটস
+/delete <movie\_id> - মুভি ডিলিট
 /agents - এজেন্ট লিস্ট
+/deadlinks - ডেড ডাউনলোড লিংক
+/checklinks - এখনই লিংক চেক
 """
     
     await update.message.reply_text(text, parse_mode='Markdown')
 
 async def add_agent_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    role = db.get_user_role(user_id)
+    role = await adb.get_user_role(user_id)
     
     if role != 'admin':
         await update.message.reply_text("❌ আপনার অ্যাডমিন এক্সেস নেই!", parse_mode='Markdown')
@@ -939,7 +3451,7 @@ async def add_agent_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     try:
         agent_id = int(context.args[0])
-        success = db.add_agent(agent_id, user_id)
+        success = await adb.add_agent(agent_id, user_id)
         
         if success:
             await update.message.reply_text(f"✅ এজেন্ট `{agent_id}` সফলভাবে অ্যাড করা হয়েছে!", parse_mode='Markdown')
@@ -950,7 +3462,7 @@ async def add_agent_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def remove_agent_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    role = db.get_user_role(user_id)
+    role = await adb.get_user_role(user_id)
     
     if role != 'admin':
         await update.message.reply_text("❌ আপনার অ্যাডমিন এক্সেস নেই!", parse_mode='Markdown')
@@ -962,7 +3474,7 @@ async def remove_agent_command(update: Update, context: ContextTypes.DEFAULT_TYP
     
     try:
         agent_id = int(context.args[0])
-        success = db.remove_agent(agent_id)
+        success = await adb.remove_agent(agent_id)
         
         if success:
             await update.message.reply_text(f"✅ এজেন্ট `{agent_id}` রিমুভ করা হয়েছে!", parse_mode='Markdown')
@@ -972,12 +3484,21 @@ async def remove_agent_command(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text("❌ ভ্যালিড আইডি দিন!", parse_mode='Markdown')
 
 # ==================== মেইন ফাংশন ====================
-def main():
-    # বট টোকেন
-    BOT_TOKEN = "5649845146:AAGuL82r0Ib-vN2YkRl2HzqFBZjQtWcjTps"
-    
+def build_application():
     # অ্যাপ্লিকেশন তৈরি
-    application = Application.builder().token(BOT_TOKEN).build()
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .update_queue(asyncio.Queue(maxsize=UPDATE_QUEUE_SIZE))
+        .concurrent_updates(update_processor)
+        .rate_limiter(outbox)
+        .persistence(SQLitePersistence(adb))
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+    )
+    if BOT_API_URL:
+        builder = builder.base_url(f"{BOT_API_URL}/bot").base_file_url(f"{BOT_API_URL}/file/bot")
+    application = builder.build()
     
     # কমান্ড হ্যান্ডলার
     application.add_handler(CommandHandler("start", start))
@@ -986,11 +3507,16 @@ def main():
     application.add_handler(CommandHandler("removeagent", remove_agent_command))
     application.add_handler(CommandHandler("stats", show_stats_command))
     application.add_handler(CommandHandler("agents", show_agents_command))
+    application.add_handler(CommandHandler("deadlinks", dead_links_command))
+    application.add_handler(CommandHandler("checklinks", check_links_command))
     application.add_handler(CommandHandler("cancel", cancel_command))
     
     # বাটন হ্যান্ডলার
     application.add_handler(CallbackQueryHandler(button_handler))
     
+    # ইনলাইন সার্চ (BotFather এ /setinline চালু থাকতে হবে)
+    application.add_handler(InlineQueryHandler(inline_search))
+    
     # মেসেজ হ্যান্ডলার (টেক্সট + ফটো)
     application.add_handler(MessageHandler(
         filters.TEXT & ~filters.COMMAND, 
@@ -1001,6 +3527,37 @@ def main():
         handle_message
     ))
     
+    # প্রতিটি হ্যান্ডলারের লেটেন্সি/এরর ও চলমান আপডেট সংখ্যা
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            if isinstance(handler, CommandHandler):
+                name = '/' + sorted(handler.commands)[0]
+            else:
+                name = handler.callback.__name__
+            handler.callback = instrument_handler(name, handler.callback)
+    
+    return application
+
+# হ্যান্ডলার টাইপ -> টেলিগ্রাম আপডেট টাইপ
+HANDLER_UPDATE_TYPES = {
+    CommandHandler: Update.MESSAGE,
+    MessageHandler: Update.MESSAGE,
+    CallbackQueryHandler: Update.CALLBACK_QUERY,
+    InlineQueryHandler: Update.INLINE_QUERY,
+}
+
+def allowed_updates(application):
+    # শুধু যেসব আপডেট আমরা হ্যান্ডেল করি, টেলিগ্রাম সেগুলোই পাঠাবে
+    types = set()
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            types.add(HANDLER_UPDATE_TYPES[type(handler)])
+    return sorted(types)
+
+def main():
+    application = build_application()
+    updates = allowed_updates(application)
+    
     # বট শুরু
     print("=" * 50)
     print("✅ Movie Bot চালু হয়েছে! (থাম্বনেল ফিক্সড)")
@@ -1011,19 +3568,44 @@ def main():
     print("🖼️ থাম্বনেল: কাজ করবে")
     print("👥 এজেন্ট ম্যানেজ: কাজ করবে")
     print("🔍 সার্চ: কাজ করবে")
+    print(f"🌐 মোড: {'ওয়েবহুক' if WEBHOOK_URL else 'পোলিং'} ({', '.join(updates)})")
     print("=" * 50)
     
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if WEBHOOK_URL:
+        if not WEBHOOK_SECRET:
+            logger.warning("WEBHOOK_SECRET is not set; anyone who finds the URL can post updates")
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET or None,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=updates,
+        )
+    else:
+        application.run_polling(allowed_updates=updates)
 
 async def show_stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    role = db.get_user_role(user_id)
+    role = await adb.get_user_role(user_id)
     
     if role != 'admin':
         await update.message.reply_text("❌ আপনার অ্যাডমিন এক্সেস নেই!", parse_mode='Markdown')
         return
     
-    stats = db.get_stats()
+    if context.args and context.args[0].lower() == 'detailed':
+        await show_detailed_stats(update)
+        return
+    
+    stats = await adb.get_stats()
+    role_cache = db.role_cache.stats()
+    search_cache = adb.search_cache.stats()
+    outbound = outbox.stats()
+    links = await adb.get_link_health()
+    last_sweep = link_checker.last_run
+    sweep = (f", শেষ চেক {last_sweep['finished']} ({last_sweep['checked']} লিংক, {last_sweep['rate']:.0f}/s)"
+             if last_sweep else '')
     
     text = f"""
 📊 *ডিটেইলড স্ট্যাটিস্টিকস*
@@ -1032,21 +3614,48 @@ async def show_stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 🎬 *মোট মুভি:* {stats['movies']}
 👷 *এজেন্ট সংখ্যা:* {stats['agents']}
 📝 *পেন্ডিং রিকোয়েস্ট:* {stats['pending_requests']}
+⚡ *রোল ক্যাশ:* {role_cache['hits']} hit / {role_cache['misses']} miss ({role_cache['hit_rate']:.0%})
+🔎 *সার্চ ক্যাশ:* {search_cache['hits']} hit / {search_cache['misses']} miss ({search_cache['hit_rate']:.0%}), {search_cache['size']} কুয়েরি, {search_cache['bytes'] / 1048576:.1f} MB
+📤 *আউটবক্স:* কিউ {outbound['queue_depth']} (সর্বোচ্চ {outbound['max_depth']}), অপেক্ষা p50 {outbound['wait_p50'] * 1000:.0f}ms / p95 {outbound['wait_p95'] * 1000:.0f}ms, রিট্রাই {outbound['retries']}
+🔗 *লিংক:* {links.get('ok', 0)} ok / {links.get('dead', 0)} dead / {links.get('error', 0)} error / {links.get('unchecked', 0)} unchecked{sweep}
 
 🕐 *সিস্টেম টাইম:* {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
     
     await update.message.reply_text(text, parse_mode='Markdown')
 
+async def show_detailed_stats(update: Update):
+    stats = await adb.get_detailed_stats()
+    
+    text = "📈 *ডিটেইলড স্ট্যাটস (শেষ ৭ দিন)*\n\n"
+    
+    text += "📅 *দিন অনুযায়ী:* (নতুন ইউজার / রিকোয়েস্ট / আপলোড)\n"
+    days = sorted(set(stats['new_users_per_day']) | set(stats['requests_per_day']) | set(stats['uploads_per_day']),
+                  reverse=True)
+    for day in days:
+        text += (f"• {day}: {stats['new_users_per_day'].get(day, 0)} / "
+                 f"{stats['requests_per_day'].get(day, 0)} / {stats['uploads_per_day'].get(day, 0)}\n")
+    if not days:
+        text += "📭 কোন ডাটা নেই\n"
+    
+    text += "\n📤 *এজেন্ট অনুযায়ী আপলোড:*\n"
+    for uploader_id, username, uploads in stats['uploads_per_agent']:
+        username_display = f"@{md(username)}" if username else "No Username"
+        text += f"• `{uploader_id}` - {username_display}: {uploads}\n"
+    if not stats['uploads_per_agent']:
+        text += "📭 কোন আপলোড নেই\n"
+    
+    await reply_view(update.message, text)
+
 async def show_agents_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    role = db.get_user_role(user_id)
+    role = await adb.get_user_role(user_id)
     
     if role != 'admin':
         await update.message.reply_text("❌ আপনার অ্যাডমিন এক্সেস নেই!", parse_mode='Markdown')
         return
     
-    agents = db.get_agents_with_details()
+    agents = await adb.get_agents_with_details()
     
     if not agents:
         await update.message.reply_text("📭 কোন এজেন্ট নেই!", parse_mode='Markdown')
@@ -1055,7 +3664,7 @@ async def show_agents_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     text = "📋 *এজেন্ট লিস্ট:*\n\n"
     
     for agent_id, username, added_date in agents:
-        username_display = f"@{username}" if username else "No Username"
+        username_display = f"@{md(username)}" if username else "No Username"
         text += f"🆔 *ID:* `{agent_id}`\n"
         text += f"👤 *Username:* {username_display}\n"
         text += f"📅 *যোগ দেওয়ার তারিখ:* {added_date[:10] if added_date else 'N/A'}\n"
@@ -1063,7 +3672,66 @@ async def show_agents_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     text += f"\n💰 *মোট এজেন্ট:* {len(agents)}"
     
-    await update.message.reply_text(text, parse_mode='Markdown')
+    await reply_view(update.message, text)
+
+async def dead_links_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    role = await adb.get_user_role(update.effective_user.id)
+    
+    if role != 'admin':
+        await update.message.reply_text("❌ আপনার অ্যাডমিন এক্সেস নেই!", parse_mode='Markdown')
+        return
+    
+    await reply_view(update.message, *await build_dead_links_view())
+
+async def check_links_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    role = await adb.get_user_role(update.effective_user.id)
+    
+    if role != 'admin':
+        await update.message.reply_text("❌ আপনার অ্যাডমিন এক্সেস নেই!", parse_mode='Markdown')
+        return
+    
+    if link_checker.running:
+        await update.message.reply_text("⏳ লিংক চেক আগে থেকেই চলছে!", parse_mode='Markdown')
+        return
+    
+    # /checklinks full - শেষ চেকের সময় না দেখে সব লিংক
+    recheck_hours = 0 if context.args and context.args[0].lower() == 'full' else LINK_RECHECK_HOURS
+    context.application.create_task(run_link_check(context.bot, recheck_hours), name='link_check_manual')
+    await update.message.reply_text("🔗 লিংক চেক শুরু হয়েছে - নতুন ডেড লিংক পেলে জানানো হবে।", parse_mode='Markdown')
+
+async def on_startup(application: Application):
+    if METRICS_PORT:
+        await metrics_server.start()
+    STARTUP_TIMINGS['initialized'] = time.perf_counter() - STARTUP_STARTED
+    log_event('startup', **{f'{phase}_ms': round(seconds * 1000, 1) for phase, seconds in STARTUP_TIMINGS.items()})
+    # ভারী কাজ পোলিং/ওয়েবহুক চালু হওয়ার পর; post_init তখনো start() এর আগে, তাই সাধারণ টাস্ক
+    global warm_up_task, link_check_task
+    warm_up_task = asyncio.create_task(warm_up(application), name='warm_up')
+    if LINK_CHECK_INTERVAL > 0:
+        link_check_task = asyncio.create_task(link_check_loop(application), name='link_check')
+
+async def warm_up(application: Application):
+    while not application.running:
+        await asyncio.sleep(0.05)
+    STARTUP_TIMINGS['serving'] = time.perf_counter() - STARTUP_STARTED
+    started = time.perf_counter()
+    roles = await adb.warm_role_cache()
+    await get_view(('latest', None, False), build_latest_view)
+    # ফাজি ইনডেক্স তৈরির আগে টাইপো সার্চ আংশিক ইনডেক্সে চলে (FTS সার্চে প্রভাব নেই)
+    await adb.build_fuzzy_index()
+    STARTUP_TIMINGS['warm'] = time.perf_counter() - STARTUP_STARTED
+    log_event('warm_up', roles=roles, fuzzy_titles=len(db.fuzzy),
+              ms=round((time.perf_counter() - started) * 1000, 1),
+              serving_ms=round(STARTUP_TIMINGS['serving'] * 1000, 1))
+
+async def on_shutdown(application: Application):
+    for task in (warm_up_task, link_check_task):
+        if task is not None and not task.done():
+            task.cancel()
+    await metrics_server.stop()
+    # পেন্ডিং রাইট শেষ করে ডাটাবেস থ্রেড বন্ধ
+    await adb.flush()
+    adb.close()
 
 async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data.clear()